@@ -0,0 +1,260 @@
+"""
+Batch Ingest module for loading many CVs in one run.
+Parses a directory, zip archive or list of uploads across the CV parse pool,
+streams per-file results as NDJSON records and writes profiles in bulk.
+"""
+import argparse
+import json
+import logging
+import re
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from pathlib import Path, PurePosixPath
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.cv_parser import CVParseError, CVParser
+from app.cv_pool import CVParsePool, CVParsePoolFull, HeaderTable
+from app.profile_manager import ProfileData, ProfileManager
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SUFFIXES = {'.pdf', '.docx'}
+MAX_FILE_BYTES = 50 * 1024 * 1024  # Skip anything larger than a plausible CV
+PROFILE_WRITE_BATCH = 500  # Profiles per ProfileManager save
+
+# (name, content) pairs; content is None (too large) or an exception when the
+# file was rejected before parsing
+CVSourceItem = Tuple[str, Union[bytes, Exception, None]]
+
+def iter_directory(directory: Union[str, Path]) -> Iterator[CVSourceItem]:
+    """Yield supported CV files below a directory, in a stable order"""
+    root = Path(directory).expanduser()
+    for path in sorted(root.rglob('*')):
+        if not path.is_file() or path.suffix.lower() not in SUPPORTED_SUFFIXES:
+            continue
+        name = str(path.relative_to(root))
+        if path.stat().st_size > MAX_FILE_BYTES:
+            yield name, None
+            continue
+        yield name, path.read_bytes()
+
+def iter_zip(archive: Union[str, Path]) -> Iterator[CVSourceItem]:
+    """Yield supported CV files stored in a zip archive"""
+    with zipfile.ZipFile(Path(archive).expanduser()) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or Path(info.filename).suffix.lower() not in SUPPORTED_SUFFIXES:
+                continue
+            if info.file_size > MAX_FILE_BYTES:
+                yield info.filename, None
+                continue
+            yield info.filename, zf.read(info)
+
+def iter_path(path: Union[str, Path]) -> Iterator[CVSourceItem]:
+    """Yield CV files from a directory or a .zip archive"""
+    path = Path(path).expanduser()
+    if path.is_dir():
+        return iter_directory(path)
+    if zipfile.is_zipfile(path):
+        return iter_zip(path)
+    raise CVParseError("Not a directory or zip archive: %s" % path)
+
+def user_id_from_filename(name: str) -> str:
+    """
+    Derive a profile user_id from a CV's path relative to the batch root:
+    each directory and the file name without its suffix, sanitized and
+    joined with '.', so partnerA/cv.pdf and partnerB/cv.pdf stay distinct
+    """
+    path = PurePosixPath(name.replace('\\', '/'))
+    parts = [re.sub(r'[^a-z0-9_-]+', '_', part.lower()).strip('_')
+             for part in path.with_suffix('').parts if part not in ('/', '.', '..')]
+    return '.'.join(part for part in parts if part) or 'cv'
+
+class BatchIngestor:
+    """Runs a batch of CVs through the parse pool and collects the outcome"""
+
+    def __init__(
+        self,
+        pool: CVParsePool,
+        profile_manager: Optional[ProfileManager] = None,
+        user_id_fn: Callable[[str], str] = user_id_from_filename
+    ):
+        """
+        Args:
+            pool: Parse pool to run the work on; its cache is used when set
+            profile_manager: When given, a profile is written for every parsed CV
+            user_id_fn: Maps a file name to the user_id of its profile; a
+                file whose user_id an earlier file of the batch already
+                took is reported as failed instead of overwriting it
+        """
+        self.pool = pool
+        self.profile_manager = profile_manager
+        self.user_id_fn = user_id_fn
+        # Leave room in the pool's queue for interactive uploads
+        self.window = max(1, min(pool.max_workers * 2, pool.max_queue))
+
+    def _submit(self, content: bytes, name: str, headers: HeaderTable) -> Future:
+        """Submit with backpressure instead of failing when the pool is full"""
+        while True:
+            try:
+                return self.pool.submit(content, name, headers)
+            except CVParsePoolFull:
+                # Slots are held by other callers of the shared pool
+                time.sleep(0.05)
+
+    def run(self, sources: Iterable[CVSourceItem]) -> Iterator[Dict]:
+        """
+        Parse every source and yield one result record per file, followed by
+        a summary record. A failing file is reported and never stops the batch.
+
+        Yields:
+            {'index', 'file', 'success', 'data' | 'error', 'truncated'?, 'user_id'?}
+            per file, then {'summary': {...}} with counts, throughput and failures
+        """
+        started = time.perf_counter()
+        in_flight: Deque = deque()
+        pending_profiles: List[ProfileData] = []
+        failures: List[Dict] = []
+        # user_id of each file still to finish, and the file each id was given to
+        user_ids: Dict[int, str] = {}
+        claimed: Dict[str, str] = {}
+        stats = {'files': 0, 'succeeded': 0, 'failed': 0, 'truncated': 0, 'cached': 0,
+                 'profiles_written': 0}
+
+        def finish(index: int, name: str, data: Optional[Dict] = None,
+                   error: Optional[str] = None) -> Dict:
+            stats['files'] += 1
+            if error is not None:
+                user_ids.pop(index, None)
+                stats['failed'] += 1
+                failures.append({'index': index, 'file': name, 'error': error})
+                return {'index': index, 'file': name, 'success': False, 'error': error}
+            stats['succeeded'] += 1
+            truncated = data.pop('truncated', [])
+            record = {'index': index, 'file': name, 'success': True, 'data': data}
+            if truncated:
+                stats['truncated'] += 1
+                record['truncated'] = truncated
+            if self.profile_manager is not None:
+                record['user_id'] = user_ids.pop(index)
+                pending_profiles.append(ProfileData(user_id=record['user_id'], cv_data=data))
+            return record
+
+        def collect(entry: Tuple) -> Dict:
+            index, name, future, key = entry
+            try:
+                data = future.result()
+            except Exception as e:
+                return finish(index, name, error=str(e))
+            if key is not None:
+                self.pool.store(key, data)
+            return finish(index, name, data)
+
+        def flush_profiles(force: bool = False) -> None:
+            if pending_profiles and (force or len(pending_profiles) >= PROFILE_WRITE_BATCH):
+                try:
+                    self.profile_manager.create_or_update_profiles(pending_profiles)
+                    stats['profiles_written'] += len(pending_profiles)
+                except Exception as e:
+                    for profile in pending_profiles:
+                        failures.append({'file': None, 'user_id': profile.user_id,
+                                         'error': "Profile write failed: %s" % str(e)})
+                pending_profiles.clear()
+
+        for index, (name, content) in enumerate(sources):
+            if self.profile_manager is not None:
+                # Claimed in source order, so the first file keeps the id
+                user_id = self.user_id_fn(name)
+                if user_id in claimed:
+                    yield finish(index, name, error="Duplicate user_id %r, already taken by %s" % (
+                        user_id, claimed[user_id]))
+                    continue
+                claimed[user_id] = name
+                user_ids[index] = user_id
+            if content is None:
+                yield finish(index, name, error="File exceeds %d bytes" % MAX_FILE_BYTES)
+                continue
+            if isinstance(content, Exception):
+                yield finish(index, name, error=str(content))
+                continue
+            key = None
+            headers = CVParser.header_table()
+            if self.pool.cache is not None:
+                key = self.pool.cache_key(content, headers=headers)
+                cached = self.pool.cache.get(key)
+                if cached is not None:
+                    stats['cached'] += 1
+                    yield finish(index, name, cached)
+                    flush_profiles()
+                    continue
+            # Yield finished parses before queueing more so memory stays bounded
+            while len(in_flight) >= self.window:
+                done, _ = wait([entry[2] for entry in in_flight], return_when=FIRST_COMPLETED)
+                for entry in [e for e in in_flight if e[2] in done]:
+                    in_flight.remove(entry)
+                    yield collect(entry)
+                flush_profiles()
+            try:
+                future = self._submit(content, name, headers)
+            except Exception as e:
+                yield finish(index, name, error=str(e))
+                continue
+            in_flight.append((index, name, future, key))
+
+        while in_flight:
+            yield collect(in_flight.popleft())
+        flush_profiles(force=True)
+
+        elapsed = time.perf_counter() - started
+        logger.info("Batch ingest finished: %d files, %d failed in %.2fs",
+                    stats['files'], stats['failed'], elapsed)
+        yield {'summary': {
+            **stats,
+            'seconds': round(elapsed, 3),
+            'files_per_second': round(stats['files'] / elapsed, 2) if elapsed else 0.0,
+            'failures': failures
+        }}
+
+def to_ndjson(records: Iterable[Dict]) -> Iterator[str]:
+    """Encode records as newline-delimited JSON"""
+    for record in records:
+        yield json.dumps(record) + '\n'
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point: python -m app.batch_ingest PATH"""
+    parser = argparse.ArgumentParser(description="Bulk-parse CVs from a directory or zip archive")
+    parser.add_argument('path', help="Directory or .zip archive of PDF/DOCX CVs")
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument('--create-profiles', action='store_true',
+                        help="Write a profile per CV, user_id taken from its relative path")
+    parser.add_argument('--storage-dir', default="~/profile_data", help="ProfileManager storage directory")
+    parser.add_argument('--output', default='-', help="NDJSON output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    pool = CVParsePool(max_workers=args.workers)
+    manager = ProfileManager(args.storage_dir) if args.create_profiles else None
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    summary: Dict = {}
+    try:
+        for line in to_ndjson(BatchIngestor(pool, manager).run(iter_path(args.path))):
+            out.write(line)
+            if line.startswith('{"summary"'):
+                summary = json.loads(line)['summary']
+    finally:
+        pool.shutdown()
+        if out is not sys.stdout:
+            out.close()
+    logger.info("Ingested %d files at %.2f files/s (%d failed)",
+                summary.get('files', 0), summary.get('files_per_second', 0.0), summary.get('failed', 0))
+    # Individual failures are in the output; only a batch with no successes is an error
+    return 1 if summary.get('files') and not summary.get('succeeded') else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
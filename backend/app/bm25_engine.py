@@ -0,0 +1,374 @@
+"""
+BM25 Engine module for scoring jobs by weighted term overlap with a CV.
+An alternative to the fixed TECH_CATEGORIES keyword lists: BM25Index keeps
+a sparse job x term frequency matrix over the catalog, fitted incrementally
+as jobs arrive (new rows, new vocabulary columns, document frequencies), and
+BM25Scorer scores a CV against every indexed job with one sparse matrix
+product. Rare terms weigh more than common ones, and score details keep the
+shape the tech-artistic scorer returns. The index shared by scorers keeps
+the most recently scored jobs only.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.job_text import job_text, tokenize
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# CV sections making up the query, reported as category scores
+SECTIONS = ('skills', 'experience', 'certifications')
+
+def job_key(job: Dict) -> str:
+    """Index key of a job: its id, or a digest of its text for jobs without one"""
+    job_id = job.get('id')
+    if job_id is not None:
+        return job_id
+    return 'text:' + hashlib.sha256(job_text(job).encode('utf-8')).hexdigest()[:16]
+
+class BM25Index:
+    """Incrementally fitted BM25 term matrix over a job catalog"""
+
+    def __init__(
+        self,
+        jobs: Optional[Iterable[Dict]] = None,
+        k1: Optional[float] = None,
+        b: Optional[float] = None,
+        max_jobs: int = 0
+    ):
+        """
+        Args:
+            jobs: Initial catalog
+            k1: Term frequency saturation (env BM25_K1, default 1.2)
+            b: Document length normalization (env BM25_B, default 0.75)
+            max_jobs: Jobs kept before the least recently added or scored
+                ones are dropped (default 0 = unbounded)
+        """
+        self.k1 = k1 if k1 is not None else float(os.getenv('BM25_K1', 1.2))
+        self.b = b if b is not None else float(os.getenv('BM25_B', 0.75))
+        self.max_jobs = max_jobs
+        self._lock = threading.RLock()
+        # Jobs live in matrix rows; removed rows stay as garbage until
+        # compaction, and a replaced job moves to a new row. Jobs are keyed
+        # by job_key
+        self._rows: Dict[str, int] = {}
+        # Keys from least to most recently added or scored
+        self._used: 'OrderedDict[str, None]' = OrderedDict()
+        self.evictions = 0
+        self._ids: List[Optional[str]] = []
+        self._jobs: List[Optional[Dict]] = []
+        self._texts: List[Optional[str]] = []
+        self._lengths: List[int] = []
+        self._vocabulary: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._df: List[int] = []
+        # Term frequencies: a built CSR matrix plus rows added since
+        self._tf = sparse.csr_matrix((0, 0), dtype=np.float64)
+        self._pending: List[Counter] = []
+        self._garbage = 0
+        self._weights: Optional[sparse.csr_matrix] = None
+        self._idf: Optional[np.ndarray] = None
+        # Bumped whenever the fitted weights change
+        self.version = 0
+        if jobs is not None:
+            self.add_jobs(jobs)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._rows
+
+    def __iter__(self) -> Iterator[Dict]:
+        return (job for job in self._jobs if job is not None)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return the indexed job, or None"""
+        row = self._rows.get(job_id)
+        return None if row is None else self._jobs[row]
+
+    def add_job(self, job: Dict) -> None:
+        """
+        Index a job, replacing any job with the same key; over max_jobs,
+        the least recently added or scored job is dropped
+        """
+        text = job_text(job)
+        counts = Counter(tokenize(text))
+        key = job_key(job)
+        with self._lock:
+            self.remove_job(key)
+            while self.max_jobs and len(self._rows) >= self.max_jobs:
+                self.remove_job(next(iter(self._used)))
+                self.evictions += 1
+            for term in counts:
+                column = self._vocabulary.get(term)
+                if column is None:
+                    column = self._vocabulary[term] = len(self._terms)
+                    self._terms.append(term)
+                    self._df.append(0)
+                self._df[column] += 1
+            self._rows[key] = len(self._ids)
+            self._used[key] = None
+            self._ids.append(key)
+            self._jobs.append(job)
+            self._texts.append(text)
+            self._lengths.append(sum(counts.values()))
+            self._pending.append(counts)
+            self._weights = None
+
+    def ensure_job(self, job: Dict) -> str:
+        """
+        Index a job unless the same version of it is already indexed
+
+        Returns:
+            The job's key in the index
+        """
+        key = job_key(job)
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None or self._texts[row] != job_text(job):
+                self.add_job(job)
+            else:
+                self._used.move_to_end(key)
+        return key
+
+    def add_jobs(self, jobs: Iterable[Dict]) -> int:
+        """Index several jobs; returns how many were added"""
+        count = 0
+        for job in jobs:
+            self.add_job(job)
+            count += 1
+        return count
+
+    def remove_job(self, job_id: str) -> bool:
+        """Drop a job from the index; returns False if it was not indexed"""
+        with self._lock:
+            row = self._rows.pop(job_id, None)
+            if row is None:
+                return False
+            del self._used[job_id]
+            built = self._tf.shape[0]
+            if row < built:
+                start, end = self._tf.indptr[row], self._tf.indptr[row + 1]
+                columns = self._tf.indices[start:end].tolist()
+            else:
+                columns = [self._vocabulary[term] for term in self._pending[row - built]]
+            for column in columns:
+                self._df[column] -= 1
+            self._ids[row] = self._jobs[row] = self._texts[row] = None
+            self._garbage += 1
+            self._weights = None
+            if self._garbage > len(self._ids) // 2:
+                self._compact()
+            return True
+
+    def _build_tf(self) -> None:
+        """Fold pending rows into the term frequency matrix"""
+        width = len(self._terms)
+        if self._tf.shape[1] != width:
+            self._tf.resize((self._tf.shape[0], width))
+        if not self._pending:
+            return
+        indptr = np.cumsum([0] + [len(counts) for counts in self._pending])
+        indices = np.fromiter((self._vocabulary[term] for counts in self._pending for term in counts),
+                              dtype=np.int32, count=indptr[-1])
+        data = np.fromiter((count for counts in self._pending for count in counts.values()),
+                           dtype=np.float64, count=indptr[-1])
+        block = sparse.csr_matrix((data, indices, indptr), shape=(len(self._pending), width))
+        self._tf = sparse.vstack([self._tf, block], format='csr')
+        self._pending = []
+
+    def _compact(self) -> None:
+        """Drop the rows of removed jobs"""
+        self._build_tf()
+        alive = [row for row, job_id in enumerate(self._ids) if job_id is not None]
+        self._tf = self._tf[alive]
+        self._ids = [self._ids[row] for row in alive]
+        self._jobs = [self._jobs[row] for row in alive]
+        self._texts = [self._texts[row] for row in alive]
+        self._lengths = [self._lengths[row] for row in alive]
+        self._rows = {job_id: row for row, job_id in enumerate(self._ids)}
+        self._garbage = 0
+
+    def _fit(self) -> None:
+        """Refit weights and idf after catalog changes"""
+        if self._weights is not None:
+            return
+        self._build_tf()
+        alive = np.array([job_id is not None for job_id in self._ids], dtype=bool)
+        lengths = np.array(self._lengths, dtype=np.float64)
+        count = int(alive.sum())
+        average = lengths[alive].mean() if count else 1.0
+        df = np.array(self._df, dtype=np.float64)
+        self._idf = np.log1p((count - df + 0.5) / (df + 0.5))
+        # Saturated, length-normalized term frequencies; idf goes on the query
+        weights = self._tf.copy()
+        row_lengths = np.repeat(lengths, np.diff(weights.indptr))
+        norm = self.k1 * (1 - self.b + self.b * row_lengths / max(average, 1e-9))
+        weights.data = weights.data * (self.k1 + 1) / (weights.data + norm)
+        self._weights = weights
+        self.version += 1
+
+    def snapshot(self, job_ids: Optional[List[str]] = None) -> Tuple[List[str], sparse.csr_matrix, np.ndarray, int]:
+        """
+        The fitted model, refitting after catalog changes
+
+        Args:
+            job_ids: Indexed jobs to select (default: every indexed job)
+
+        Returns:
+            (job IDs, job x term CSR matrix of their BM25 term weights
+            without idf, idf per vocabulary term, model version)
+        """
+        with self._lock:
+            self._fit()
+            if job_ids is None:
+                rows = [row for row, job_id in enumerate(self._ids) if job_id is not None]
+                job_ids = [self._ids[row] for row in rows]
+            else:
+                rows = [self._rows[job_id] for job_id in job_ids]
+            return job_ids, self._weights[rows], self._idf, self.version
+
+    def snapshot_jobs(self, jobs: List[Dict]) -> Tuple[List[str], sparse.csr_matrix, np.ndarray, int]:
+        """
+        Index the jobs not held in their current version, then snapshot them
+        (see snapshot); at most max_jobs jobs at a time, so none of them is
+        dropped before the snapshot
+        """
+        if self.max_jobs and len(jobs) > self.max_jobs:
+            raise ValueError("Cannot snapshot %d jobs in an index of at most %d" % (len(jobs), self.max_jobs))
+        with self._lock:
+            return self.snapshot([self.ensure_job(job) for job in jobs])
+
+    def columns(self, terms: Iterable[str]) -> List[int]:
+        """Vocabulary columns of the given terms, skipping unknown ones"""
+        return [self._vocabulary[term] for term in terms if term in self._vocabulary]
+
+    def term(self, column: int) -> str:
+        """The vocabulary term of a column"""
+        return self._terms[column]
+
+    def stats(self) -> Dict[str, int]:
+        """Index size counters"""
+        with self._lock:
+            self._build_tf()
+            return {
+                'jobs': len(self._rows),
+                'vocabulary': len(self._terms),
+                'nonzeros': int(self._tf.nnz),
+                'garbage_rows': self._garbage,
+                'evictions': self.evictions,
+                'version': self.version,
+            }
+
+class BM25Scorer:
+    """Scores jobs against a CV with BM25 over a shared job index"""
+
+    # total_score is the share (0-1) of the CV's attainable BM25 score a job
+    # reaches; these play the roles of JobMatcher.MIN_MATCH_SCORE and
+    # TechArtisticScorer.HIGH_PRIORITY_SCORE for this engine
+    MIN_MATCH_SCORE = float(os.getenv('BM25_MIN_MATCH_SCORE', 0.2))
+    HIGH_PRIORITY_SCORE = float(os.getenv('BM25_HIGH_PRIORITY_SCORE', 0.4))
+
+    def __init__(self, cv_data: Dict[str, List[str]], index: Optional[BM25Index] = None):
+        """
+        Args:
+            cv_data: Parsed CV sections
+            index: Job index to score against (the shared bm25_index by
+                default); jobs scored but not yet indexed are added to it
+        """
+        self.cv_data = cv_data
+        self.index = index if index is not None else bm25_index
+        self.section_terms = {
+            section: sorted({term for line in cv_data.get(section, []) for term in tokenize(line)})
+            for section in SECTIONS
+        }
+        self.terms = sorted({term for terms in self.section_terms.values() for term in terms})
+        self._query = None
+
+    @classmethod
+    def from_profile(cls, profile: Dict, index: Optional[BM25Index] = None) -> 'BM25Scorer':
+        """Build a scorer for a stored profile from its cv_data"""
+        return cls(profile['cv_data'], index)
+
+    def _query_matrix(self, idf: np.ndarray, version: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+        """
+        (term x (whole CV, each section) idf matrix, attainable score per
+        column, vocabulary columns and names of the CV terms), cached per
+        model version
+        """
+        if self._query is None or self._query[0] != version:
+            query = np.zeros((len(idf), 1 + len(SECTIONS)))
+            for position, terms in enumerate([self.terms] + [self.section_terms[s] for s in SECTIONS]):
+                columns = self.index.columns(terms)
+                query[columns, position] = idf[columns]
+            # A job holding each term once at average length scores sum(idf)
+            attainable = query.sum(axis=0)
+            columns = np.array(self.index.columns(self.terms), dtype=np.int64)
+            # CV terms in the index, alphabetical like self.terms
+            names = [self.index.term(column) for column in columns.tolist()]
+            self._query = (version, query, attainable, columns, names)
+        return self._query[1:]
+
+    def score_catalog(self) -> Dict[str, Dict]:
+        """Score every indexed job; returns job id -> score details"""
+        job_ids, weights, idf, version = self.index.snapshot()
+        return dict(zip(job_ids, self._score_rows(weights, idf, version)))
+
+    def score_jobs(self, jobs: List[Dict]) -> List[Dict]:
+        """
+        Score jobs, indexing any the index does not hold in this version
+
+        Adding jobs refits the model on the next score, so add a batch of
+        new jobs through one score_jobs or add_jobs call, not job by job.
+        With a bounded index, jobs are scored in chunks of at most max_jobs
+        so none of a chunk is dropped before it is scored.
+
+        Returns:
+            List of score details, aligned with jobs
+        """
+        size = max(self.index.max_jobs or len(jobs), 1)
+        results: List[Dict] = []
+        for start in range(0, len(jobs), size):
+            _, weights, idf, version = self.index.snapshot_jobs(jobs[start:start + size])
+            results.extend(self._score_rows(weights, idf, version))
+        return results
+
+    def score_job(self, job: Dict) -> Dict:
+        """Score a single job (see score_jobs)"""
+        return self.score_jobs([job])[0]
+
+    def _score_rows(self, weights: sparse.csr_matrix, idf: np.ndarray, version: int) -> List[Dict]:
+        query, attainable, columns, names = self._query_matrix(idf, version)
+        # One sparse product scores every row for the CV and each section
+        shares = np.asarray(weights @ query) / np.where(attainable > 0, attainable, 1)
+        shares = np.minimum(1.0, np.round(shares, 4))
+        present = weights[:, columns]
+        results = []
+        for row, row_shares in enumerate(shares.tolist()):
+            total = row_shares[0]
+            found = present.indices[present.indptr[row]:present.indptr[row + 1]].tolist()
+            results.append({
+                'total_score': total,
+                'category_scores': {section: share
+                                    for section, share in zip(SECTIONS, row_shares[1:]) if share > 0},
+                'matched_keywords': [names[position] for position in sorted(found)],
+                'cv_relevance': total,
+                'high_priority': total >= self.HIGH_PRIORITY_SCORE
+            })
+        return results
+
+# Shared by every BM25 scorer in the process, holding the jobs scored most
+# recently (env BM25_MAX_JOBS, default 50000)
+bm25_index = BM25Index(max_jobs=int(os.getenv('BM25_MAX_JOBS', 50000)))
@@ -0,0 +1,161 @@
+"""
+CV Cache module for reusing parse results of previously seen CV files.
+Keys results by the SHA-256 of the file content plus the parser version,
+with a size-bounded in-memory LRU tier and an optional on-disk tier.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from app.cv_parser import PARSER_VERSION
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def _copy_result(data: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Copy a parse result so callers cannot mutate the cached entry"""
+    return {key: list(value) if isinstance(value, list) else value for key, value in data.items()}
+
+class CVCache:
+    """Two-tier (memory LRU + optional disk) cache of parsed CV data"""
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        disk_dir: Optional[Union[str, Path]] = None,
+        parser_version: str = PARSER_VERSION
+    ):
+        """
+        Args:
+            max_bytes: Budget for the in-memory tier, measured on the JSON
+                encoding of each entry (env CV_CACHE_MAX_BYTES, default 64 MiB)
+            disk_dir: Directory for the on-disk tier, disabled when None
+            parser_version: Version mixed into every key so results from an
+                older parser are never served
+        """
+        self.max_bytes = max_bytes or int(os.getenv('CV_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        self.parser_version = parser_version
+        self.disk_dir = Path(disk_dir).expanduser() if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key_for(self, content: bytes, variant: str = '') -> str:
+        """
+        Build the cache key for a file's content
+
+        Args:
+            content: Raw file bytes
+            variant: Extra discriminator for parser options that change the output
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        return self.key_for_digest(digest, variant)
+
+    def key_for_digest(self, digest: str, variant: str = '') -> str:
+        """Build the cache key from an already computed SHA-256 hex digest"""
+        version = self.parser_version + ('-' + variant if variant else '')
+        return "%s-%s" % (version, digest)
+
+    def get(self, key: str) -> Optional[Dict[str, List[str]]]:
+        """Return a copy of the cached parse result, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy_result(entry[0])
+        data = self._read_disk(key)
+        if data is not None:
+            with self._lock:
+                self.hits += 1
+                self.disk_hits += 1
+            self._remember(key, data, len(json.dumps(data)))
+            return _copy_result(data)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, data: Dict[str, List[str]]) -> None:
+        """Store a parse result in both tiers"""
+        encoded = json.dumps(data)
+        self._remember(key, _copy_result(data), len(encoded))
+        self._write_disk(key, encoded)
+
+    def _remember(self, key: str, data: Dict[str, List[str]], size: int) -> None:
+        """Insert into the memory tier, evicting least recently used entries"""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (data, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        return self.disk_dir / ("%s.json" % key) if self.disk_dir else None
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, List[str]]]:
+        """Load an entry from the disk tier if present"""
+        path = self._disk_path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning("Ignoring unreadable CV cache entry %s: %s", path.name, str(e))
+            return None
+
+    def _write_disk(self, key: str, encoded: str) -> None:
+        """Write an entry to the disk tier; failures only cost a future miss"""
+        path = self._disk_path(key)
+        if path is None:
+            return
+        try:
+            tmp_path = path.with_name('%s.%d.%d.tmp' % (key, os.getpid(), threading.get_ident()))
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(encoded)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Could not write CV cache entry %s: %s", path.name, str(e))
+
+    def clear(self) -> None:
+        """Drop the memory tier and reset counters (disk entries are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and memory tier usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'disk_enabled': self.disk_dir is not None,
+                'parser_version': self.parser_version
+            }
@@ -2,14 +2,25 @@
 CV Parser module for extracting structured data from CV documents.
 Supports PDF and DOCX formats with section-based parsing.
 """
+import hashlib
+import io
 import json
 import logging
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import docx
 import PyPDF2
 
+if TYPE_CHECKING:
+    from app.cv_cache import CVCache
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -17,9 +28,107 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Bump whenever a change alters parse output so cached results are not reused
+PARSER_VERSION = "1"
+
+# A CV can be handed to the parser as a path, raw bytes or an open binary stream
+CVSource = Union[str, Path, bytes, BinaryIO]
+
 class CVParseError(Exception):
     """Custom exception for CV parsing errors"""
 
+class ParseLimits:
+    """Upper bounds on the work spent parsing a single CV (0 disables a limit)"""
+    
+    def __init__(
+        self,
+        max_pages: Optional[int] = None,
+        max_chars: Optional[int] = None,
+        max_seconds: Optional[float] = None
+    ):
+        """
+        Args:
+            max_pages: PDF pages to extract (env CV_MAX_PAGES, default 50)
+            max_chars: Characters of text to keep (env CV_MAX_CHARS, default 200000)
+            max_seconds: Wall time budget per CV (env CV_MAX_SECONDS, default 30)
+        """
+        self.max_pages = int(os.getenv('CV_MAX_PAGES', 50)) if max_pages is None else max_pages
+        self.max_chars = int(os.getenv('CV_MAX_CHARS', 200000)) if max_chars is None else max_chars
+        self.max_seconds = float(os.getenv('CV_MAX_SECONDS', 30)) if max_seconds is None else max_seconds
+    
+    def signature(self) -> str:
+        """Compact string identifying these limits, used in cache keys"""
+        return "p%d.c%d" % (self.max_pages, self.max_chars)
+    
+    def to_dict(self) -> Dict:
+        """Convert limits to dictionary format"""
+        return {
+            "max_pages": self.max_pages,
+            "max_chars": self.max_chars,
+            "max_seconds": self.max_seconds
+        }
+
+# Leading list numbering or bullets ("1.", "2)", "iv.", "-", "•") and any
+# surrounding punctuation are ignored when matching headers tolerantly
+_HEADER_NUMBERING = re.compile(r'^(?:[\W_]*(?:\d+|[ivx]+|[a-z])[.)]|[\W\d_])*\s*')
+_HEADER_TRAILING = re.compile(r'[\W_]+$')
+_WHITESPACE = re.compile(r'\s+')
+
+def _normalize_header(text: str) -> str:
+    """Lowercase a candidate header and strip numbering, bullets and punctuation"""
+    text = _HEADER_NUMBERING.sub('', text.lower().strip())
+    text = _HEADER_TRAILING.sub('', text)
+    return _WHITESPACE.sub(' ', text.replace('&', 'and'))
+
+def parse_variant(limits: ParseLimits, tolerant_headers: bool, headers: Optional[str] = None) -> str:
+    """
+    Cache key discriminator for the parser options that change the output
+
+    Args:
+        limits: Limits the parse runs under
+        tolerant_headers: Whether tolerant header matching is on
+        headers: Fingerprint of the section keyword table the parse uses
+            (default: CVParser's current one)
+    """
+    headers = headers or CVParser.header_table()[0]
+    return limits.signature() + ('.t' if tolerant_headers else '') + '.h' + headers
+
+_page_executor: Optional[ProcessPoolExecutor] = None
+_page_executor_workers = 0
+_page_executor_lock = threading.Lock()
+
+def _get_page_executor(workers: int) -> ProcessPoolExecutor:
+    """Shared pool for parallel page extraction, started on first use"""
+    global _page_executor, _page_executor_workers
+    with _page_executor_lock:
+        if _page_executor is None or _page_executor_workers != workers:
+            if _page_executor is not None:
+                _page_executor.shutdown(wait=False)
+            _page_executor = ProcessPoolExecutor(max_workers=workers)
+            _page_executor_workers = workers
+        return _page_executor
+
+def shutdown_page_workers() -> None:
+    """Stop the parallel page extraction pool"""
+    global _page_executor
+    with _page_executor_lock:
+        if _page_executor is not None:
+            _page_executor.shutdown(wait=True, cancel_futures=True)
+            _page_executor = None
+
+def _extract_page_range(content: bytes, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) in a worker process"""
+    reader = PyPDF2.PdfReader(io.BytesIO(content))
+    return [reader.pages[number].extract_text() for number in range(start, stop)]
+
+def _as_stream(source: CVSource) -> Union[Path, BinaryIO]:
+    """Wrap raw bytes in a stream; paths and file-like objects pass through"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if isinstance(source, str):
+        return Path(source)
+    return source
+
 class CVParser:
     """Parser for extracting structured data from CV documents"""
     SECTION_KEYWORDS = {
@@ -30,72 +139,265 @@ class CVParser:
         'certifications': ['certifications', 'certificates', 'professional certifications']
     }
     
-    def __init__(self):
-        self.current_section = None
-        self.parsed_data = {
-            'skills': [],
-            'experience': [],
-            'education': [],
-            'projects': [],
-            'certifications': [],
-            'raw_text': []
-        }
+    def __init__(
+        self,
+        cache: Optional['CVCache'] = None,
+        limits: Optional[ParseLimits] = None,
+        page_workers: Optional[int] = None,
+        parallel_min_pages: Optional[int] = None,
+        tolerant_headers: Optional[bool] = None
+    ):
+        """
+        Args:
+            cache: Optional result cache keyed by file content
+            limits: Page, character and time limits (defaults from the environment)
+            page_workers: Processes used to extract PDF pages in parallel
+                (env CV_PAGE_WORKERS, default 0 = always serial)
+            parallel_min_pages: PDFs with fewer pages than this are extracted
+                serially (env CV_PARALLEL_MIN_PAGES, default 20)
+            tolerant_headers: Also recognise headers wrapped in numbering or
+                punctuation such as "1. Skills:" (env CV_TOLERANT_HEADERS, default false)
+        """
+        self.cache = cache
+        self.limits = limits or ParseLimits()
+        self.page_workers = (int(os.getenv('CV_PAGE_WORKERS', 0))
+                             if page_workers is None else page_workers)
+        self.parallel_min_pages = (int(os.getenv('CV_PARALLEL_MIN_PAGES', 20))
+                                   if parallel_min_pages is None else parallel_min_pages)
+        self.tolerant_headers = (os.getenv('CV_TOLERANT_HEADERS', 'false').lower() == 'true'
+                                 if tolerant_headers is None else tolerant_headers)
+        self._reset()
+    
+    # Compiled header lookups per parser class:
+    # (fingerprint, exact, tolerant, max_len, digest, keywords snapshot)
+    _compiled_headers: Dict[type, Tuple] = {}
+    
+    @classmethod
+    def add_section_keywords(cls, section: str, keywords: List[str]) -> None:
+        """
+        Register extra header keywords at runtime, creating the section if needed.
+        The compiled classifier picks the change up on the next parse, and
+        the new header table fingerprint keys it apart in the parse cache.
+        """
+        existing = cls.SECTION_KEYWORDS.setdefault(section, [])
+        existing.extend(keyword for keyword in keywords if keyword not in existing)
+    
+    @classmethod
+    def header_table(cls) -> Tuple[str, Dict[str, List[str]]]:
+        """
+        Fingerprint and snapshot of the current SECTION_KEYWORDS
+
+        Returns:
+            (short hex digest of the keyword table, copy of the table); the
+            snapshot must not be modified
+        """
+        compiled = cls._compiled()
+        return compiled[4], compiled[5]
+    
+    @classmethod
+    def use_header_table(cls, table: Tuple[str, Dict[str, List[str]]]) -> None:
+        """Replace SECTION_KEYWORDS with a snapshot taken by header_table, unless it is already current"""
+        if cls.header_table()[0] != table[0]:
+            cls.SECTION_KEYWORDS = {section: list(keywords) for section, keywords in table[1].items()}
+    
+    @classmethod
+    def _compile_headers(cls) -> Tuple[Dict[str, str], Dict[str, str], int]:
+        """
+        Build (or reuse) the header lookup tables for SECTION_KEYWORDS.
+        Rebuilt whenever the keyword mapping has changed since the last build.
+        """
+        compiled = cls._compiled()
+        return compiled[1], compiled[2], compiled[3]
+    
+    @classmethod
+    def _compiled(cls) -> Tuple:
+        """The _compiled_headers entry for the current SECTION_KEYWORDS"""
+        fingerprint = tuple((section, tuple(keywords))
+                            for section, keywords in cls.SECTION_KEYWORDS.items())
+        compiled = cls._compiled_headers.get(cls)
+        if compiled is None or compiled[0] != fingerprint:
+            exact: Dict[str, str] = {}
+            tolerant: Dict[str, str] = {}
+            for section, keywords in cls.SECTION_KEYWORDS.items():
+                for keyword in keywords:
+                    # First section listing a keyword wins, as in a linear scan
+                    exact.setdefault(keyword, section)
+                    tolerant.setdefault(_normalize_header(keyword), section)
+            max_len = max((len(keyword) for keyword in exact), default=0)
+            # Section order matters (first listing wins), so it is part of the digest
+            digest = hashlib.sha256(json.dumps(fingerprint).encode('utf-8')).hexdigest()[:12]
+            snapshot = {section: list(keywords) for section, keywords in fingerprint}
+            compiled = (fingerprint, exact, tolerant, max_len, digest, snapshot)
+            cls._compiled_headers[cls] = compiled
+        return compiled
     
     def _detect_section(self, text: str) -> Optional[str]:
         """Detect which section a text belongs to based on keywords"""
         text_lower = text.lower().strip()
-        for section, keywords in self.SECTION_KEYWORDS.items():
-            if any(keyword == text_lower for keyword in keywords):
-                return section
-        return None
+        section = self._exact_headers.get(text_lower)
+        if section is None and self.tolerant_headers and len(text_lower) <= self._tolerant_max_len:
+            section = self._tolerant_headers.get(_normalize_header(text_lower))
+        return section
+    
+    def _reset(self) -> None:
+        """Clear state left over from a previous parse"""
+        self.current_section = None
+        self.truncated: List[str] = []
+        self._started = time.monotonic()
+        self._exact_headers, self._tolerant_headers, max_len = self._compile_headers()
+        # Leave room for numbering and trailing punctuation around a header
+        self._tolerant_max_len = max_len + 12
+        self.parsed_data = {section: [] for section in self.SECTION_KEYWORDS}
+        self.parsed_data['raw_text'] = []
     
-    def _parse_docx(self, file_path: Path) -> None:
-        """Parse DOCX file and extract structured data"""
+    def _parse_docx(self, source: CVSource) -> None:
+        """Parse DOCX content (path, bytes or binary stream) and extract structured data"""
         try:
-            doc = docx.Document(file_path)
-            for paragraph in doc.paragraphs:
-                text = paragraph.text.strip()
-                if not text:
-                    continue
-                self.parsed_data['raw_text'].append(text)
-                # Check if this is a section header
-                section = self._detect_section(text)
-                if section:
-                    self.current_section = section
-                    continue
-                # Add content to current section if we're in one
-                if self.current_section and text:
-                    self.parsed_data[self.current_section].append(text)
+            source = _as_stream(source)
+            doc = docx.Document(str(source) if isinstance(source, Path) else source)
+            self._collect(self._iter_section_events(self._limit_chars(self._iter_docx_lines(doc))))
         except Exception as e:
             raise CVParseError(f"Error parsing DOCX file: {str(e)}") from e
     
-    def _parse_pdf(self, file_path: Path) -> None:
-        """Parse PDF file and extract structured data"""
+    def _parse_pdf(self, source: CVSource) -> None:
+        """Parse PDF content (path, bytes or binary stream) and extract structured data"""
         try:
-            with open(file_path, 'rb', encoding=None) as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text = page.extract_text()
-                    if not text:
-                        continue
-                    # Split text into lines and process each line
-                    lines = text.split('\n')
-                    for line in lines:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        self.parsed_data['raw_text'].append(line)
-                        # Check if this is a section header
-                        section = self._detect_section(line)
-                        if section:
-                            self.current_section = section
-                            continue
-                        # Add content to current section if we're in one
-                        if self.current_section and line:
-                            self.parsed_data[self.current_section].append(line)
+            source = _as_stream(source)
+            if self.page_workers > 1:
+                # Workers re-open the document, so they need the raw bytes
+                if isinstance(source, Path):
+                    content = source.read_bytes()
+                else:
+                    content = source.read()
+                self._read_pdf(PyPDF2.PdfReader(io.BytesIO(content)), content)
+            elif isinstance(source, Path):
+                with open(source, 'rb') as file:
+                    self._read_pdf(PyPDF2.PdfReader(file))
+            else:
+                self._read_pdf(PyPDF2.PdfReader(source))
         except Exception as e:
             raise CVParseError(f"Error parsing PDF file: {str(e)}") from e
     
+    def _read_pdf(self, pdf_reader: PyPDF2.PdfReader, content: Optional[bytes] = None) -> None:
+        """Extract lines from an opened PDF and sort them into sections"""
+        page_count = len(pdf_reader.pages)
+        if self.limits.max_pages:
+            page_count = min(page_count, self.limits.max_pages)
+        if content is not None and self.page_workers > 1 and page_count >= self.parallel_min_pages:
+            pages = self._iter_pdf_pages_parallel(pdf_reader, content)
+        else:
+            pages = self._iter_pdf_pages(pdf_reader)
+        self._collect(self._iter_section_events(self._limit_chars(self._iter_page_lines(pages))))
+    
+    def _truncate(self, reason: str) -> None:
+        """Record that parsing stopped early and why"""
+        if reason not in self.truncated:
+            logger.warning("CV parse truncated: %s", reason)
+            self.truncated.append(reason)
+    
+    def _out_of_time(self) -> bool:
+        """Check the wall-time limit, recording a truncation when it is hit"""
+        if self.limits.max_seconds and time.monotonic() - self._started > self.limits.max_seconds:
+            self._truncate('max_seconds')
+            return True
+        return False
+    
+    def _iter_pdf_pages(self, pdf_reader: PyPDF2.PdfReader) -> Iterator[str]:
+        """Yield the text of each page, extracting lazily within the page and time limits"""
+        for page_number, page in enumerate(pdf_reader.pages):
+            if self.limits.max_pages and page_number >= self.limits.max_pages:
+                self._truncate('max_pages')
+                return
+            if self._out_of_time():
+                return
+            text = page.extract_text()
+            if text:
+                yield text
+    
+    def _iter_pdf_pages_parallel(self, pdf_reader: PyPDF2.PdfReader, content: bytes) -> Iterator[str]:
+        """
+        Same output as _iter_pdf_pages, but pages are extracted by worker
+        processes in contiguous chunks and yielded back in page order
+        """
+        total = len(pdf_reader.pages)
+        page_count = min(total, self.limits.max_pages) if self.limits.max_pages else total
+        # A few chunks per worker keeps them busy when page sizes vary
+        chunk = max(1, math.ceil(page_count / (self.page_workers * 2)))
+        executor = _get_page_executor(self.page_workers)
+        futures = [
+            executor.submit(_extract_page_range, content, start, min(start + chunk, page_count))
+            for start in range(0, page_count, chunk)
+        ]
+        try:
+            for future in futures:
+                if self._out_of_time():
+                    return
+                for text in future.result():
+                    if text:
+                        yield text
+            if page_count < total:
+                self._truncate('max_pages')
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    @staticmethod
+    def _iter_page_lines(pages: Iterable[str]) -> Iterator[str]:
+        """Split page text into stripped, non-empty lines"""
+        for text in pages:
+            for line in text.split('\n'):
+                line = line.strip()
+                if line:
+                    yield line
+    
+    def _iter_docx_lines(self, doc) -> Iterator[str]:
+        """Yield each non-empty paragraph of a DOCX document as one line"""
+        for paragraph in doc.paragraphs:
+            if self._out_of_time():
+                return
+            text = paragraph.text.strip()
+            if text:
+                yield text
+    
+    def _limit_chars(self, lines: Iterable[str]) -> Iterator[str]:
+        """Pass lines through until the extracted character budget is spent"""
+        budget = self.limits.max_chars
+        used = 0
+        for line in lines:
+            if budget:
+                used += len(line)
+                if used > budget:
+                    self._truncate('max_chars')
+                    return
+            yield line
+    
+    def _iter_section_events(self, lines: Iterable[str]) -> Iterator[Tuple[Optional[str], str, bool]]:
+        """
+        Classify lines into section events
+        
+        Yields:
+            (section, line, is_header) where section is the section the line
+            belongs to (None before the first header)
+        """
+        section = self.current_section
+        detect = self._detect_section
+        for line in lines:
+            header = detect(line)
+            if header:
+                section = header
+                yield section, line, True
+            else:
+                yield section, line, False
+    
+    def _collect(self, events: Iterable[Tuple[Optional[str], str, bool]]) -> None:
+        """Fold section events into parsed_data"""
+        raw_text = self.parsed_data['raw_text']
+        for section, line, is_header in events:
+            raw_text.append(line)
+            self.current_section = section
+            if not is_header and section:
+                self.parsed_data[section].append(line)
+    
     def parse_cv(self, file_path: Union[str, Path]) -> Dict[str, List[str]]:
         """
         Parse a CV file (PDF or DOCX) and return structured data
@@ -114,39 +416,94 @@ class CVParser:
             if not file_path.exists():
                 raise CVParseError(f"File not found: {file_path}")
             
-            # Reset parsed data
-            self.current_section = None
-            self.parsed_data = {
-                'skills': [],
-                'experience': [],
-                'education': [],
-                'projects': [],
-                'certifications': [],
-                'raw_text': []
-            }
-            
             logger.info("Parsing CV file: %s", file_path)
+            if self.cache is not None:
+                return self._parse_cached(file_path.read_bytes(), file_path.suffix)
+            return self._parse_source(file_path, file_path.suffix)
             
-            if file_path.suffix.lower() == '.docx':
-                self._parse_docx(file_path)
-            elif file_path.suffix.lower() == '.pdf':
-                self._parse_pdf(file_path)
-            else:
-                raise CVParseError("Unsupported file format: %s" % file_path.suffix)
+        except CVParseError:
+            raise
+        except Exception as e:
+            raise CVParseError(f"Unexpected error parsing CV: {str(e)}") from e
+    
+    def parse_cv_bytes(self, content: Union[bytes, BinaryIO], filename: str) -> Dict[str, List[str]]:
+        """
+        Parse CV content held in memory (PDF or DOCX) and return structured data
+        
+        Args:
+            content: Raw file bytes or a binary file-like object
+            filename: Original file name, used to pick the format from its suffix
             
-            logger.info("Successfully parsed CV")
-            return self.parsed_data
+        Returns:
+            Dictionary containing structured CV data
             
+        Raises:
+            CVParseError: If there's an error parsing the CV
+        """
+        try:
+            logger.info("Parsing CV upload: %s", filename)
+            if self.cache is not None:
+                if not isinstance(content, bytes):
+                    content = content.read()
+                return self._parse_cached(content, Path(filename).suffix)
+            return self._parse_source(content, Path(filename).suffix)
         except CVParseError:
             raise
         except Exception as e:
             raise CVParseError(f"Unexpected error parsing CV: {str(e)}") from e
+    
+    def _parse_cached(self, content: bytes, suffix: str) -> Dict[str, List[str]]:
+        """Serve repeated content from the cache, parsing and storing it otherwise"""
+        key = self.cache.key_for(content, parse_variant(
+            self.limits, self.tolerant_headers, self.header_table()[0]))
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info("CV served from cache")
+            self._reset()
+            self.parsed_data = cached
+            self.truncated = list(cached.get('truncated', []))
+            return cached
+        result = self._parse_source(content, suffix)
+        # A timed-out parse depends on machine load, so it is not worth keeping
+        if 'max_seconds' not in self.truncated:
+            self.cache.put(key, result)
+        return result
+    
+    def _parse_source(self, source: CVSource, suffix: str) -> Dict[str, List[str]]:
+        """Dispatch to the format-specific parser based on the file suffix"""
+        self._reset()
+        
+        if suffix.lower() == '.docx':
+            self._parse_docx(source)
+        elif suffix.lower() == '.pdf':
+            self._parse_pdf(source)
+        else:
+            raise CVParseError("Unsupported file format: %s" % suffix)
+        
+        if self.truncated:
+            # Reported alongside the data; API handlers pop it before storing cv_data
+            self.parsed_data['truncated'] = list(self.truncated)
+        logger.info("Successfully parsed CV")
+        return self.parsed_data
 
-def parse_cv(file_path: Union[str, Path]) -> Dict[str, List[str]]:
-    """Convenience function to parse a CV file"""
-    parser = CVParser()
+def parse_cv(
+    file_path: Union[str, Path],
+    cache: Optional['CVCache'] = None,
+    limits: Optional[ParseLimits] = None
+) -> Dict[str, List[str]]:
+    """Convenience function to parse a CV file, optionally through a CVCache"""
+    parser = CVParser(cache=cache, limits=limits)
     return parser.parse_cv(file_path)
 
+def parse_cv_bytes(
+    content: Union[bytes, BinaryIO],
+    filename: str,
+    limits: Optional[ParseLimits] = None
+) -> Dict[str, List[str]]:
+    """Convenience function to parse CV content held in memory"""
+    parser = CVParser(limits=limits)
+    return parser.parse_cv_bytes(content, filename)
+
 if __name__ == "__main__":
     try:
         # Example usage
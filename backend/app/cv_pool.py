@@ -0,0 +1,201 @@
+"""
+CV Parse Pool module for running CV parsing off the event loop.
+Dispatches in-memory CV uploads to a bounded pool of worker processes.
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from app.cv_cache import CVCache
+from app.cv_parser import CVParseError, CVParser, ParseLimits, parse_variant
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class CVParsePoolFull(CVParseError):
+    """Raised when the parse queue is at its depth limit"""
+
+# (fingerprint, snapshot) of a section keyword table, from CVParser.header_table
+HeaderTable = Tuple[str, Dict[str, List[str]]]
+
+def _parse_in_worker(content: bytes, filename: str, limits: ParseLimits,
+                     tolerant_headers: bool, headers: HeaderTable) -> Dict[str, List[str]]:
+    """Entry point executed inside a worker process"""
+    # Workers outlive keyword changes made in the parent, so each parse
+    # carries the table it was keyed under
+    CVParser.use_header_table(headers)
+    parser = CVParser(limits=limits, tolerant_headers=tolerant_headers)
+    return parser.parse_cv_bytes(content, filename)
+
+class CVParsePool:
+    """Bounded process pool for parsing CV uploads in parallel"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        cache: Optional[CVCache] = None,
+        limits: Optional[ParseLimits] = None,
+        tolerant_headers: Optional[bool] = None
+    ):
+        """
+        Args:
+            max_workers: Number of worker processes (env CV_PARSE_WORKERS, default CPU count)
+            max_queue: Maximum parses queued or running at once
+                (env CV_PARSE_MAX_QUEUE, default 4 per worker)
+            cache: Optional result cache consulted before dispatching to a worker
+            limits: Page, character and time limits applied to every parse
+            tolerant_headers: Match headers wrapped in numbering or punctuation
+                (env CV_TOLERANT_HEADERS, default false)
+        """
+        self.cache = cache
+        self.limits = limits or ParseLimits()
+        self.tolerant_headers = (os.getenv('CV_TOLERANT_HEADERS', 'false').lower() == 'true'
+                                 if tolerant_headers is None else tolerant_headers)
+        self.max_workers = max_workers or int(os.getenv('CV_PARSE_WORKERS', os.cpu_count() or 1))
+        self.max_queue = max_queue or int(os.getenv('CV_PARSE_MAX_QUEUE', self.max_workers * 4))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._broken = False
+        # Done callbacks run on the executor's management thread
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of parses currently queued or running"""
+        return self._pending
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start the worker processes on first use"""
+        if self._broken:
+            self._reset_executor()
+        if self._executor is None:
+            logger.info("Starting CV parse pool with %d workers", self.max_workers)
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _reset_executor(self) -> None:
+        """Drop a pool whose workers died so the next parse starts a fresh one"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._broken = False
+
+    def cache_key(self, content: bytes, digest: Optional[str] = None,
+                  headers: Optional[HeaderTable] = None) -> str:
+        """
+        Cache key for content parsed under this pool's options
+
+        Args:
+            content: Raw file bytes
+            digest: SHA-256 hex digest of content, if already computed
+            headers: Section keyword table the parse is submitted with
+                (default: CVParser's current one)
+        """
+        headers = headers or CVParser.header_table()
+        variant = parse_variant(self.limits, self.tolerant_headers, headers[0])
+        if digest is not None:
+            return self.cache.key_for_digest(digest, variant)
+        return self.cache.key_for(content, variant)
+
+    def store(self, key: str, result: Dict[str, List[str]]) -> None:
+        """Cache a worker result unless it was cut short by the time limit"""
+        if 'max_seconds' not in result.get('truncated', []):
+            self.cache.put(key, result)
+
+    def submit(self, content: bytes, filename: str,
+               headers: Optional[HeaderTable] = None) -> Future:
+        """
+        Queue a CV for parsing without waiting for the result
+
+        Args:
+            content: Raw file bytes
+            filename: Original file name, used to pick the format
+            headers: Section keyword table to parse with, as passed to
+                cache_key (default: CVParser's current one)
+
+        Raises:
+            CVParsePoolFull: If max_queue parses are already in flight
+        """
+        with self._lock:
+            if self._pending >= self.max_queue:
+                raise CVParsePoolFull(
+                    "CV parse queue is full (%d pending), try again later" % self._pending
+                )
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(
+                _parse_in_worker, content, filename, self.limits, self.tolerant_headers,
+                headers or CVParser.header_table()
+            )
+        except BrokenProcessPool:
+            self._release()
+            self._reset_executor()
+            raise CVParseError("CV parse workers unavailable, try again") from None
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _release(self) -> None:
+        """Give back one queue slot"""
+        with self._lock:
+            self._pending -= 1
+
+    def _on_done(self, future: Future) -> None:
+        """Release the queue slot held by a finished parse"""
+        self._release()
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            # Restarted lazily by the next submit, not from this callback thread
+            self._broken = True
+
+    async def parse(self, content: bytes, filename: str,
+                    digest: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        Parse CV content in a worker process without blocking the event loop
+
+        Args:
+            content: Raw file bytes
+            filename: Original file name, used to pick the format
+            digest: SHA-256 hex digest of content, if already computed
+
+        Returns:
+            Dictionary containing structured CV data
+
+        Raises:
+            CVParsePoolFull: If the queue depth limit has been reached
+            CVParseError: If the CV could not be parsed
+        """
+        key = None
+        # One snapshot for the key and the parse, so a concurrent keyword
+        # change cannot store a result under the wrong table
+        headers = CVParser.header_table()
+        if self.cache is not None:
+            key = self.cache_key(content, digest, headers)
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info("CV served from cache: %s", filename)
+                return cached
+        future = self.submit(content, filename, headers)
+        try:
+            result = await asyncio.wrap_future(future)
+        except BrokenProcessPool as e:
+            raise CVParseError("CV parse worker crashed while parsing %s" % filename) from e
+        if key is not None:
+            self.store(key, result)
+        return result
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,258 @@
+"""
+Job Dedup module for collapsing near-duplicate job listings.
+Aggregated feeds repeat the same role with small wording changes. Each job's
+title, company and description are shingled into word n-grams and summarized
+by a MinHash signature; an LSH index over signature bands finds candidates in
+constant time per job, and candidates whose estimated similarity reaches the
+threshold join the same cluster. Only one representative per cluster needs
+scoring or a notification. Past a size bound, the jobs seen least recently
+are dropped from the index.
+"""
+import functools
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.bm25_engine import job_key
+from app.job_text import tokenize
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 3  # Words per shingle
+FALSE_NEGATIVE_WEIGHT = 4
+_SHINGLE_BASE = np.uint64(1000003)
+
+def dedup_text(job: Dict) -> str:
+    """The text near-duplicates are compared on"""
+    return "%s %s %s" % (job.get('title', ''), job.get('company', ''), job.get('description', ''))
+
+@functools.lru_cache(maxsize=65536)
+def _word_hash(word: str) -> int:
+    # Stable across processes, unlike hash()
+    return zlib.crc32(word.encode('utf-8'))
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """
+    64-bit hashes of the word SHINGLE_SIZE-grams of text (repeats included);
+    texts shorter than a shingle are one shingle
+    """
+    words = np.fromiter(map(_word_hash, tokenize(text)), dtype=np.uint64)
+    width = min(SHINGLE_SIZE, len(words))
+    hashes = np.zeros(len(words) - width + 1 if len(words) else 0, dtype=np.uint64)
+    for offset in range(width):
+        # Polynomial combination keeps word order within a shingle
+        hashes = hashes * _SHINGLE_BASE + words[offset:offset + len(hashes)]
+    return hashes
+
+def lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    (bands, rows per band) minimizing the chance of missing a pair at or
+    above threshold plus the chance of proposing one below it; misses weigh
+    FALSE_NEGATIVE_WEIGHT times more, since proposed pairs are verified
+    """
+    # Midpoints of 200 similarity steps; the mean approximates the integral
+    steps = (np.arange(200) + 0.5) / 200
+    above = steps >= threshold
+    best = None
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            candidate = 1 - (1 - steps ** rows) ** bands
+            error = np.where(above, FALSE_NEGATIVE_WEIGHT * (1 - candidate), candidate).mean()
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+    return best[1], best[2]
+
+class JobDeduplicator:
+    """Incremental MinHash/LSH index grouping near-duplicate jobs into clusters"""
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        num_perm: Optional[int] = None,
+        seed: int = 1,
+        max_jobs: Optional[int] = None
+    ):
+        """
+        Args:
+            threshold: Estimated Jaccard similarity of shingles at which two
+                jobs are duplicates (env JOB_DEDUP_THRESHOLD, default 0.8)
+            num_perm: MinHash permutations per signature
+                (env JOB_DEDUP_PERMUTATIONS, default 128)
+            seed: Seed of the permutations; signatures only compare within
+                one seed
+            max_jobs: Jobs kept before the least recently seen ones are
+                dropped (env JOB_DEDUP_MAX_JOBS, default 100000; 0 = unbounded)
+        """
+        self.threshold = (float(os.getenv('JOB_DEDUP_THRESHOLD', 0.8))
+                          if threshold is None else threshold)
+        self.num_perm = (int(os.getenv('JOB_DEDUP_PERMUTATIONS', 128))
+                         if num_perm is None else num_perm)
+        self.max_jobs = (int(os.getenv('JOB_DEDUP_MAX_JOBS', 100000))
+                         if max_jobs is None else max_jobs)
+        self.bands, self.rows = lsh_bands(self.threshold, self.num_perm)
+        rng = np.random.RandomState(seed)
+        # Multiply-shift hash functions (odd a, any b), one per permutation
+        self._a = rng.randint(0, 1 << 63, size=self.num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.randint(0, 1 << 63, size=self.num_perm, dtype=np.uint64)
+        self._lock = threading.RLock()
+        # Indexed texts, from least to most recently seen
+        self._texts: 'OrderedDict[str, str]' = OrderedDict()
+        # Empty texts have no signature and never cluster
+        self._signatures: Dict[str, Optional[np.ndarray]] = {}
+        self._buckets: List[Dict[bytes, Set[str]]] = [defaultdict(set) for _ in range(self.bands)]
+        # job id -> cluster id; cluster id -> members in ingestion order,
+        # the first being the representative
+        self._cluster_of: Dict[str, int] = {}
+        self._members: Dict[int, List[str]] = {}
+        self._next_cluster = 0
+        self.duplicates_found = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of a text's shingles, or None for an empty text"""
+        hashes = shingle_hashes(text)
+        if not len(hashes):
+            return None
+        # High 32 bits of a*x + b mod 2^64, one row per shingle
+        permuted = (hashes[:, None] * self._a + self._b) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add_job(self, job: Dict) -> int:
+        """
+        Index a job, replacing an older version of it; over max_jobs, the
+        least recently seen job is dropped. Jobs without an id are keyed by
+        their text, as in the BM25 index (see job_key).
+
+        Returns:
+            The id of the job's cluster
+        """
+        job_id = job_key(job)
+        text = dedup_text(job)
+        with self._lock:
+            if self._texts.get(job_id) == text:
+                self._texts.move_to_end(job_id)
+                return self._cluster_of[job_id]
+            self.remove_job(job_id)
+            while self.max_jobs and len(self._texts) >= self.max_jobs:
+                self.remove_job(next(iter(self._texts)))
+                self.evictions += 1
+            signature = self.signature(text)
+            self._texts[job_id] = text
+            self._signatures[job_id] = signature
+            best: Optional[Tuple[float, str]] = None
+            if signature is not None:
+                # Jobs sharing a band are candidates; the signature agreement
+                # estimates their Jaccard similarity
+                keys = self._band_keys(signature)
+                candidates = set()
+                for band, key in enumerate(keys):
+                    candidates |= self._buckets[band].get(key, set())
+                for candidate in candidates:
+                    similarity = float(np.mean(self._signatures[candidate] == signature))
+                    if similarity >= self.threshold and (best is None or similarity > best[0]):
+                        best = (similarity, candidate)
+                for band, key in enumerate(keys):
+                    self._buckets[band][key].add(job_id)
+            if best is None:
+                cluster = self._next_cluster
+                self._next_cluster += 1
+                self._members[cluster] = [job_id]
+            else:
+                cluster = self._cluster_of[best[1]]
+                self._members[cluster].append(job_id)
+                self.duplicates_found += 1
+            self._cluster_of[job_id] = cluster
+            return cluster
+
+    def add_jobs(self, jobs: Iterable[Dict]) -> int:
+        """Index several jobs; returns how many were processed"""
+        count = 0
+        for job in jobs:
+            self.add_job(job)
+            count += 1
+        return count
+
+    def remove_job(self, job_id: str) -> bool:
+        """Drop a job from the index; returns False if it was not indexed"""
+        with self._lock:
+            if job_id not in self._texts:
+                return False
+            del self._texts[job_id]
+            signature = self._signatures.pop(job_id)
+            for band, key in enumerate(self._band_keys(signature) if signature is not None else []):
+                bucket = self._buckets[band].get(key)
+                if bucket is not None:
+                    bucket.discard(job_id)
+                    if not bucket:
+                        del self._buckets[band][key]
+            cluster = self._cluster_of.pop(job_id)
+            members = self._members[cluster]
+            members.remove(job_id)
+            if not members:
+                del self._members[cluster]
+            return True
+
+    def cluster_of(self, job_id: str) -> Optional[int]:
+        """Cluster id of an indexed job, or None"""
+        return self._cluster_of.get(job_id)
+
+    def members(self, cluster: int) -> List[str]:
+        """Job ids in a cluster; the first is its representative"""
+        return list(self._members.get(cluster, []))
+
+    def duplicates(self, job_id: str) -> List[str]:
+        """The other job ids in a job's cluster"""
+        with self._lock:
+            cluster = self._cluster_of.get(job_id)
+            return [member for member in self._members.get(cluster, []) if member != job_id]
+
+    def unique(self, jobs: List[Dict]) -> List[Dict]:
+        """
+        Index jobs and keep the first of each cluster, in order
+
+        Returns:
+            One job per cluster present in jobs
+        """
+        with self._lock:
+            # Clusters as assigned, since a batch over max_jobs evicts its own
+            # first jobs
+            clusters = [self.add_job(job) for job in jobs]
+            seen = set()
+            kept = []
+            for job, cluster in zip(jobs, clusters):
+                if cluster not in seen:
+                    seen.add(cluster)
+                    kept.append(job)
+        if len(kept) < len(jobs):
+            logger.info("Collapsed %d near-duplicate jobs", len(jobs) - len(kept))
+        return kept
+
+    def stats(self) -> Dict:
+        """Index and cluster counters"""
+        with self._lock:
+            return {
+                'jobs': len(self._signatures),
+                'clusters': len(self._members),
+                'duplicates_found': self.duplicates_found,
+                'evictions': self.evictions,
+                'threshold': self.threshold,
+                'num_perm': self.num_perm,
+                'bands': self.bands,
+                'rows': self.rows,
+            }
@@ -0,0 +1,259 @@
+"""
+Job Index module for retrieving candidate jobs without scanning the catalog.
+Keeps inverted indexes from each job's whitespace-separated chunks and word
+tokens to jobs, with incremental add and remove. Keyword lookups keep the
+substring semantics of category scoring: a keyword without whitespace occurs
+in a job exactly when it occurs inside one of the job's chunks, so keywords
+are resolved against the vocabulary, not the jobs, through an index of the
+character bigrams and trigrams of each vocabulary token. Relevance units
+(word n-grams) are looked up on the word token postings.
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.job_record import JobRecord, as_record
+from app.job_text import JobText, JobTextCache, job_text_cache
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def _grams(text: str, lengths: Tuple[int, ...]) -> Set[str]:
+    """Distinct substrings of text with the given lengths"""
+    return {text[start:start + length] for length in lengths for start in range(len(text) - length + 1)}
+
+class JobIndex:
+    """Incremental inverted index over a job catalog"""
+
+    # Lengths of the vocabulary token substrings indexed for term lookups
+    GRAM_LENGTHS = (2, 3)
+
+    def __init__(self, jobs: Optional[Iterable[Dict]] = None, job_texts: JobTextCache = job_text_cache):
+        """
+        Args:
+            jobs: Initial catalog
+            job_texts: Preprocessed job text cache (shared by default)
+        """
+        self.job_texts = job_texts
+        # Jobs live in numbered slots; postings hold slot numbers
+        self._slots: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._jobs: List[Optional[JobRecord]] = []
+        self._entries: List[Optional[JobText]] = []
+        self._tokens: List[Optional[Set[str]]] = []
+        self._order: List[int] = []
+        self._free: List[int] = []
+        self._sequence = 0
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._word_postings: Dict[str, Set[int]] = defaultdict(set)
+        # bigram or trigram -> vocabulary tokens containing it
+        self._gram_tokens: Dict[str, Set[str]] = defaultdict(set)
+        if jobs is not None:
+            self.add_jobs(jobs)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._slots
+
+    def __iter__(self) -> Iterator[JobRecord]:
+        return (self._jobs[slot] for slot in self._slots.values())
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        """Return the indexed job, or None"""
+        slot = self._slots.get(job_id)
+        return None if slot is None else self._jobs[slot]
+
+    def text(self, job_id: str) -> str:
+        """Lowercased title and description of an indexed job"""
+        return self._entries[self._slots[job_id]].text
+
+    def position(self, job_id: str) -> int:
+        """Insertion sequence number of a job; a replaced job keeps its position"""
+        return self._order[self._slots[job_id]]
+
+    def add_job(self, job: Dict) -> None:
+        """Index a job, replacing any job with the same id; jobs are kept as JobRecords"""
+        job = as_record(job)
+        job_id = job.id
+        slot = self._slots.get(job_id)
+        if slot is not None:
+            self._unindex(slot)
+        elif self._free:
+            slot = self._free.pop()
+            self._order[slot] = self._next_sequence()
+        else:
+            slot = len(self._ids)
+            for column in (self._ids, self._jobs, self._entries, self._tokens):
+                column.append(None)
+            self._order.append(self._next_sequence())
+        entry = self.job_texts.get(job)
+        tokens = set(entry.text.split())
+        self._slots[job_id] = slot
+        self._ids[slot] = job_id
+        self._jobs[slot] = job
+        self._entries[slot] = entry
+        self._tokens[slot] = tokens
+        for token in tokens:
+            postings = self._postings[token]
+            if not postings:
+                self._add_vocabulary(token)
+            postings.add(slot)
+        for word in entry.tokens:
+            self._word_postings[word].add(slot)
+
+    def add_jobs(self, jobs: Iterable[Dict]) -> int:
+        """Index several jobs; returns how many were added"""
+        count = 0
+        for job in jobs:
+            self.add_job(job)
+            count += 1
+        return count
+
+    def remove_job(self, job_id: str) -> bool:
+        """Drop a job from the index; returns False if it was not indexed"""
+        slot = self._slots.pop(job_id, None)
+        if slot is None:
+            return False
+        self._unindex(slot)
+        self._ids[slot] = self._jobs[slot] = self._entries[slot] = self._tokens[slot] = None
+        self._free.append(slot)
+        return True
+
+    def _next_sequence(self) -> int:
+        self._sequence += 1
+        return self._sequence
+
+    def _unindex(self, slot: int) -> None:
+        for token in self._tokens[slot]:
+            postings = self._postings[token]
+            postings.discard(slot)
+            if not postings:
+                del self._postings[token]
+                for gram in _grams(token, self.GRAM_LENGTHS):
+                    tokens = self._gram_tokens[gram]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._gram_tokens[gram]
+        for word in self._entries[slot].tokens:
+            postings = self._word_postings[word]
+            postings.discard(slot)
+            if not postings:
+                del self._word_postings[word]
+
+    def _add_vocabulary(self, token: str) -> None:
+        for gram in _grams(token, self.GRAM_LENGTHS):
+            self._gram_tokens[gram].add(token)
+
+    def _resolve(self, piece: str) -> Set[str]:
+        """Vocabulary tokens containing a whitespace-free piece of a term"""
+        if len(piece) in self.GRAM_LENGTHS:
+            return self._gram_tokens.get(piece, set())
+        if len(piece) < self.GRAM_LENGTHS[0]:
+            # A single character occurs in most of the vocabulary anyway
+            return {token for token in self._postings if piece in token}
+        # Tokens containing every trigram of the piece, verified in full
+        size = self.GRAM_LENGTHS[-1]
+        grams = sorted(
+            (self._gram_tokens.get(gram, set()) for gram in _grams(piece, (size,))),
+            key=len
+        )
+        candidates = grams[0].intersection(*grams[1:])
+        return {token for token in candidates if piece in token}
+
+    def _slots_with(self, term: str) -> Set[int]:
+        pieces = term.split()
+        if not pieces:
+            # Whitespace-only terms are not in the vocabulary
+            return {slot for slot in self._slots.values() if term in self._entries[slot].text}
+        if len(pieces) == 1 and pieces[0] == term:
+            return set().union(*(self._postings[token] for token in self._resolve(term)))
+        # Every piece occurs inside some token of a matching job; verify
+        # the candidates of the rarest piece against the full text
+        candidates = min(
+            (set().union(*(self._postings[token] for token in self._resolve(piece))) for piece in pieces),
+            key=len
+        )
+        return {slot for slot in candidates if term in self._entries[slot].text}
+
+    def _slots_with_unit(self, unit: str) -> Set[int]:
+        """Slots of jobs whose word n-grams include unit"""
+        words = unit.split()
+        postings = sorted((self._word_postings.get(word, set()) for word in words), key=len)
+        if len(words) == 1:
+            return postings[0]
+        slots = set(postings[0]).intersection(*postings[1:])
+        return {slot for slot in slots if self._entries[slot].has_unit(unit)}
+
+    def jobs_with(self, term: str) -> Set[str]:
+        """
+        IDs of jobs whose lowercased text contains term as a substring
+
+        Args:
+            term: Lowercase, non-empty search term
+        """
+        if not term:
+            raise ValueError("Cannot look up an empty term")
+        return {self._ids[slot] for slot in self._slots_with(term)}
+
+    def hit_matrix(self, terms: List[str], units: Optional[List[str]] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Look up several terms and n-gram units at once
+
+        Args:
+            terms: Lowercase substring terms; empty terms never count as hits
+            units: Word n-grams as built by app.job_text.phrase_units
+
+        Returns:
+            (candidate job IDs in catalog order, candidate x column uint8
+            matrix with one column per term and then one per unit, 1 where
+            the job contains it); the candidates are the jobs containing at
+            least one term or unit, as every other job's row would be zeros
+        """
+        units = units or []
+        lookups = [(term, self._slots_with) for term in terms] + [(unit, self._slots_with_unit) for unit in units]
+        columns = [lookup(term) if term else set() for term, lookup in lookups]
+        columns = [np.fromiter(slots, dtype=np.intp, count=len(slots)) for slots in columns]
+        # Rows only for the jobs some column hit, first in slot order so a
+        # column's slots map to rows by binary search, then in catalog order
+        candidates = np.sort(np.concatenate(columns)) if columns else np.zeros(0, dtype=np.intp)
+        if len(candidates):
+            candidates = candidates[np.concatenate(([True], candidates[1:] != candidates[:-1]))]
+        hits = np.zeros((len(candidates), len(columns)), dtype=np.uint8)
+        for column, slots in enumerate(columns):
+            hits[np.searchsorted(candidates, slots), column] = 1
+        candidates = candidates.tolist()
+        order = np.argsort([self._order[slot] for slot in candidates], kind='stable')
+        return [self._ids[candidates[row]] for row in order.tolist()], hits[order]
+
+    def term_hits(self, terms: Iterable[str]) -> Dict[str, Set[str]]:
+        """
+        Invert term lookups into per-job hits
+
+        Returns:
+            Job id -> the given terms its text contains, for every job
+            containing at least one of them
+        """
+        hits: Dict[str, Set[str]] = defaultdict(set)
+        for term in dict.fromkeys(terms):
+            if term:
+                for slot in self._slots_with(term):
+                    hits[self._ids[slot]].add(term)
+        return dict(hits)
+
+    def stats(self) -> Dict[str, int]:
+        """Index size counters"""
+        return {
+            'jobs': len(self._slots),
+            'vocabulary': len(self._postings),
+            'words': len(self._word_postings),
+            'postings': sum(len(postings) for postings in self._postings.values()),
+            'grams': len(self._gram_tokens),
+        }
@@ -2,9 +2,23 @@
 Job Matcher module for scoring and matching jobs based on tech-artistic criteria.
 Implements CV-based scoring and compliance-focused job matching.
 """
+import heapq
+import itertools
 import logging
+import os
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.bm25_engine import BM25Scorer
+from app.job_index import JobIndex
+from app.job_record import JobRecord, is_remote_location, parse_salary
+from app.job_text import JobText, JobTextCache, job_text_cache, unit_hashes
+from app.keyword_matcher import KeywordMatcher
+from app.profile_artifacts import ProfileArtifacts, profile_artifacts
+from app.taxonomy import Taxonomy, taxonomy_store
+from app.text_scan import TextScanner
 
 # Configure logging
 logging.basicConfig(
@@ -13,61 +27,131 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def job_salary(job: Dict) -> Optional[float]:
+    """
+    The salary figure the minimum-salary filter compares against: the lower
+    bound of the job's salary (see parse_salary). None when the job has no
+    usable salary, which never filters a job out.
+    """
+    if isinstance(job, JobRecord):
+        return job.salary_min
+    return parse_salary(job)[0]
+
+def job_currency(job: Dict) -> Optional[str]:
+    """Currency code of the job's salary (see parse_salary), or None when unknown"""
+    if isinstance(job, JobRecord):
+        return job.currency
+    return parse_salary(job)[2]
+
+def is_remote_job(job: Dict) -> bool:
+    """True if the job location mentions remote work"""
+    if isinstance(job, JobRecord):
+        return job.remote
+    return is_remote_location(job.get('location'))
+
 class TechArtisticScorer:
     """Scores jobs based on tech and artistic criteria, including CV data"""
     
-    TECH_CATEGORIES = {
-        'digital_art': ['digital art', 'creative technology', 'digital design', '3d modeling', 'animation'],
-        'ai_creative_tools': ['ai', 'machine learning', 'creative ai', 'generative ai', 'computer vision'],
-        'blockchain_creative': ['blockchain', 'web3', 'nft', 'smart contract', 'defi'],
-        'digital_assistance': ['automation', 'digital transformation', 'process optimization', 'workflow'],
-        'tech_innovation': ['innovation', 'emerging technology', 'digital strategy', 'technology leadership']
-    }
+    HIGH_PRIORITY_SCORE = 15
+    BATCH_CHUNK_SIZE = 2048  # Jobs per hit matrix in score_jobs, bounds memory
     
-    def __init__(self, cv_data: Dict[str, List[str]]):
+    def __init__(
+        self,
+        cv_data: Dict[str, List[str]],
+        job_texts: JobTextCache = job_text_cache,
+        taxonomy: Optional[Taxonomy] = None,
+        artifacts: Optional[ProfileArtifacts] = None
+    ):
+        """
+        Args:
+            cv_data: Parsed CV sections
+            job_texts: Preprocessed job text cache (shared by default)
+            taxonomy: Keyword taxonomy to score with (default: the current
+                one in taxonomy_store); the scorer keeps it for its lifetime
+            artifacts: State precomputed from cv_data for taxonomy (see
+                profile_artifacts); derived from cv_data if omitted
+        """
         self.cv_data = cv_data
-        self._process_cv_data()
+        self.job_texts = job_texts
+        self.taxonomy = taxonomy or taxonomy_store.current()
+        self._process_cv_data(artifacts)
+    
+    @classmethod
+    def from_profile(cls, profile: Dict, taxonomy: Optional[Taxonomy] = None) -> 'TechArtisticScorer':
+        """
+        Build a scorer for a stored profile from the artifacts ProfileManager
+        stored with it, rebuilding them if they are stale
+
+        Args:
+            profile: Profile dictionary as stored by ProfileManager
+            taxonomy: Keyword taxonomy to score with (default: the current
+                one in taxonomy_store)
+        """
+        taxonomy = taxonomy or taxonomy_store.current()
+        return cls(profile['cv_data'], taxonomy=taxonomy, artifacts=profile_artifacts(profile, taxonomy))
+    
+    def __getstate__(self) -> Dict:
+        """Pickle the compiled CV state only; job text caches and batch plans stay per process"""
+        state = self.__dict__.copy()
+        state.pop('job_texts', None)
+        state.pop('_plan', None)
+        return state
+    
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self.job_texts = job_text_cache
+    
+    def keyword_matcher(self) -> KeywordMatcher:
+        """Return the compiled matcher of the scorer's taxonomy categories"""
+        return self.taxonomy.keyword_matcher
     
-    def _process_cv_data(self) -> None:
+    def _process_cv_data(self, artifacts: Optional[ProfileArtifacts] = None) -> None:
         """
         Process CV data to extract relevant keywords and experience.
         Initializes cv_keywords set with processed terms from skills,
-        experience, and certifications sections.
+        experience, and certifications sections, taking them from artifacts
+        when given.
         """
-        self.cv_keywords = set()
-        # Extract keywords from skills
-        for skill in self.cv_data.get('skills', []):
-            self.cv_keywords.update(skill.lower().split())
-        
-        # Extract keywords from experience
-        for exp in self.cv_data.get('experience', []):
-            self.cv_keywords.update(exp.lower().split())
-        
-        # Extract keywords from certifications
-        for cert in self.cv_data.get('certifications', []):
-            self.cv_keywords.update(cert.lower().split())
+        if artifacts is None or artifacts.taxonomy_version != self.taxonomy.version:
+            artifacts = ProfileArtifacts.build(self.cv_data, self.taxonomy)
+        self.cv_keywords = artifacts.cv_keywords
+        
+        # Category-specific bonuses the taxonomy grants for certifications
+        self.category_bonuses = artifacts.category_bonuses
+        
+        # Terms looked up by the relevance score, matched against job word
+        # tokens: the n-gram units of each skill phrase, and the tokens longer
+        # than 3 characters of each certification and experience line
+        self.skill_units = artifacts.skill_units
+        self.certification_tokens = artifacts.certification_tokens
+        self.experience_tokens = artifacts.experience_tokens
+        # Highest cv_relevance any job can earn against this CV
+        self.max_relevance = (
+            min(3, sum(1 for units in self.skill_units if units))
+            + min(2, sum(1 for tokens in self.certification_tokens if tokens))
+            + min(3, sum(1 for tokens in self.experience_tokens if tokens))
+        )
     
     def _score_category(self, job_description: str, category: str, keywords: List[str]) -> int:
         """Score a job for a specific category"""
         description_lower = job_description.lower()
-        
+        hits = [keyword for keyword in keywords if keyword in description_lower]
+        return self._score_hits(category, hits)
+    
+    def _score_hits(self, category: str, hits: List[str]) -> int:
+        """Score a category from the keywords of it found in the job description"""
         # Base score from job description
-        base_score = sum(1 for keyword in keywords if keyword in description_lower)
+        base_score = len(hits)
         
         # Bonus points for CV matches
-        cv_bonus = sum(1 for keyword in keywords 
-                      if keyword in self.cv_keywords and keyword in description_lower)
-        
-        # Category-specific scoring rules
-        if category == 'tech_innovation' and any(cert for cert in self.cv_data.get('certifications', [])
-                                               if 'innovation' in cert.lower()):
-            cv_bonus += 2
-            
-        if category == 'blockchain_creative' and any(cert for cert in self.cv_data.get('certifications', [])
-                                                   if 'blockchain' in cert.lower()):
-            cv_bonus += 2
+        cv_bonus = sum(1 for keyword in hits if keyword in self.cv_keywords)
+        cv_bonus += self._category_bonus(category)
         
-        return min(4, base_score + cv_bonus)  # Cap at 4 points per category
+        return min(self.taxonomy.category_cap, base_score + cv_bonus)  # Cap points per category
+    
+    def _category_bonus(self, category: str) -> int:
+        """Category-specific bonus points earned by the CV's certifications"""
+        return self.category_bonuses.get(category, 0)
     
     def score_job(self, job: Dict) -> Dict:
         """
@@ -76,22 +160,23 @@ class TechArtisticScorer:
         Returns:
             Dict containing score details and matched categories
         """
-        description = f"{job.get('title', '')} {job.get('description', '')}"
+        entry = self.job_texts.get(job)
         scores = {}
         matched_keywords = set()
         
-        # Score each category
-        for category, keywords in self.TECH_CATEGORIES.items():
-            score = self._score_category(description, category, keywords)
+        # Score each category from a single pass over the description
+        category_hits = self.keyword_matcher().scan(entry.text)
+        for category, hits in category_hits.items():
+            score = self._score_hits(category, hits)
             if score > 0:
                 scores[category] = score
-                matched_keywords.update(kw for kw in keywords if kw in description.lower())
+                matched_keywords.update(hits)
         
         # Calculate total score
         total_score = sum(scores.values())
         
         # Add CV-specific bonus points
-        cv_relevance = self._calculate_cv_relevance(description)
+        cv_relevance = self._relevance(entry)
         total_score += cv_relevance
         
         return {
@@ -99,29 +184,238 @@ class TechArtisticScorer:
             'category_scores': scores,
             'matched_keywords': list(matched_keywords),
             'cv_relevance': cv_relevance,
-            'high_priority': total_score >= 15
+            'high_priority': total_score >= self.HIGH_PRIORITY_SCORE,
+            'taxonomy_version': self.taxonomy.version
         }
     
+    def score_jobs(self, jobs: List[Dict]) -> List[Dict]:
+        """
+        Score a whole catalog in one call
+        
+        Category keywords and CV relevance units are collected into one
+        job x column hit matrix, BATCH_CHUNK_SIZE jobs at a time: ASCII job
+        texts are searched together by a TextScanner, others one at a time
+        as in score_job. Category caps, CV bonuses, relevance, totals and
+        high-priority flags are then array operations over the matrix. Each
+        result is identical to score_job(job).
+        
+        Returns:
+            List of score details, aligned with jobs
+        """
+        plan = self._batch_plan()
+        keyword_matcher = plan['keyword_matcher']
+        keyword_columns = plan['keyword_columns']
+        keyword_count = plan['keyword_count']
+        hashes = plan['unit_hashes']
+        results = []
+        for start in range(0, len(jobs), self.BATCH_CHUNK_SIZE):
+            chunk = jobs[start:start + self.BATCH_CHUNK_SIZE]
+            hits = np.zeros((len(chunk), keyword_count + len(hashes)), dtype=np.int32)
+            texts = self.job_texts.texts(chunk)
+            scanned = [row for row, text in enumerate(texts) if text.isascii()]
+            rows, columns = plan['scanner'].scan([texts[row] for row in scanned])
+            hits[np.array(scanned, dtype=np.int64)[rows], columns] = 1
+            # Texts with non-ASCII characters go through the per-job path
+            for row in sorted(set(range(len(chunk))).difference(scanned)):
+                entry = self.job_texts.get(chunk[row])
+                found = [keyword_columns[keyword] for keyword in keyword_matcher.find(entry.text)]
+                if found:
+                    hits[row, found] = 1
+                hits[row, keyword_count:] = entry.contains(hashes)
+            results.extend(self._score_matrix(hits))
+        return results
+    
+    def batch_columns(self) -> Tuple[List[str], List[str]]:
+        """
+        The columns of a hit matrix for score_hit_matrix
+        
+        Returns:
+            (category keywords, matched as substrings of the job text;
+            relevance n-gram units, matched against the job's n-grams)
+        """
+        plan = self._batch_plan()
+        return plan['keywords'], plan['units']
+    
+    def score_hit_matrix(self, hits: np.ndarray) -> List[Dict]:
+        """
+        Score jobs from a job x column hit matrix
+        
+        Args:
+            hits: One row per job; one column per category keyword followed
+                by one per relevance unit, as listed by batch_columns();
+                non-zero where the job contains the keyword or unit
+            
+        Returns:
+            List of score details, aligned with the rows of hits
+        """
+        results = []
+        for start in range(0, hits.shape[0], self.BATCH_CHUNK_SIZE):
+            chunk = hits[start:start + self.BATCH_CHUNK_SIZE]
+            results.extend(self._score_matrix((chunk != 0).astype(np.int32)))
+        return results
+    
+    def score_totals(self, hits: np.ndarray) -> np.ndarray:
+        """Total scores only, for a job x column hit matrix as in score_hit_matrix"""
+        totals = [self._score_arrays((hits[start:start + self.BATCH_CHUNK_SIZE] != 0).astype(np.int32))[2]
+                  for start in range(0, hits.shape[0], self.BATCH_CHUNK_SIZE)]
+        return np.concatenate(totals) if totals else np.zeros(0, dtype=np.int64)
+    
+    def category_totals(self, texts: List[str]) -> np.ndarray:
+        """
+        Sum of the category scores of each job text, without CV relevance
+        
+        Args:
+            texts: Lowercased job texts (see app.job_text.job_text)
+        """
+        plan = self._batch_plan()
+        keyword_columns = plan['keyword_columns']
+        keyword_count = plan['keyword_count']
+        hits = np.zeros((len(texts), keyword_count), dtype=np.int32)
+        for row, text in enumerate(texts):
+            found = [keyword_columns[keyword] for keyword in plan['keyword_matcher'].find(text)]
+            if found:
+                hits[row, found] = 1
+        category_scores = np.minimum(
+            self.taxonomy.category_cap,
+            hits @ plan['membership'][:keyword_count] + hits @ plan['cv_membership'][:keyword_count]
+            + plan['category_bonus']
+        )
+        return np.where(category_scores > 0, category_scores, 0).sum(axis=1)
+    
+    def _score_arrays(self, hits: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(category scores, cv relevance, totals) for a 0/1 int32 job x column hit matrix"""
+        plan = self._batch_plan()
+        # One product for every matrix; the counts are small integers, exact
+        # in float64, which goes through BLAS where int32 does not
+        counts = (hits @ plan['weights']).astype(np.int32)
+        categories, skills, certifications, experience = np.split(counts, plan['weight_splits'], axis=1)
+        category_scores = np.minimum(self.taxonomy.category_cap, categories + plan['category_bonus'])
+        category_scores = np.where(category_scores > 0, category_scores, 0)
+        # A skill matches when the job has every one of its units
+        skill_hits = (skills == plan['skill_units_needed']) & (plan['skill_units_needed'] > 0)
+        relevance = (
+            np.minimum(3, skill_hits.sum(axis=1))
+            + np.minimum(2, (certifications > 0).sum(axis=1))
+            + np.minimum(3, (experience > 0).sum(axis=1))
+        )
+        totals = category_scores.sum(axis=1) + relevance
+        return category_scores, relevance, totals
+    
+    def _score_matrix(self, hits: np.ndarray) -> List[Dict]:
+        """Score details for a 0/1 int32 job x column hit matrix"""
+        plan = self._batch_plan()
+        categories = plan['categories']
+        keywords = plan['keywords']
+        category_scores, relevance, totals = self._score_arrays(hits)
+        high_priority = totals >= self.HIGH_PRIORITY_SCORE
+        
+        # Category keywords are the leading columns; any hit makes its
+        # category score positive, so every keyword hit is reported
+        found_keywords: List[List[str]] = [[] for _ in range(hits.shape[0])]
+        for row, column in zip(*np.nonzero(hits[:, :plan['keyword_count']])):
+            found_keywords[row].append(keywords[column])
+        
+        return [
+            {
+                'total_score': total,
+                # Scores are never negative, so compress keeps the positive ones
+                'category_scores': dict(itertools.compress(zip(categories, row_scores), row_scores)),
+                'matched_keywords': found,
+                'cv_relevance': row_relevance,
+                'high_priority': priority,
+                'taxonomy_version': self.taxonomy.version
+            }
+            for row_scores, found, total, row_relevance, priority in zip(
+                category_scores.tolist(), found_keywords, totals.tolist(),
+                relevance.tolist(), high_priority.tolist()
+            )
+        ]
+    
+    def _batch_plan(self) -> Dict:
+        """
+        Matrices used by the batch scoring paths, built once per scorer.
+        Columns are the category keywords
+        followed by every relevance unit of the CV; each relevance matrix
+        maps unit columns to the CV entries they satisfy.
+        """
+        plan = getattr(self, '_plan', None)
+        if plan is not None:
+            return plan
+        keyword_matcher = self.keyword_matcher()
+        
+        keywords = keyword_matcher.keywords
+        units = list(dict.fromkeys(
+            [unit for skill in self.skill_units for unit in skill]
+            + [token for tokens in self.certification_tokens + self.experience_tokens for token in tokens]
+        ))
+        # A unit that is also a keyword still gets its own column
+        keyword_columns = {keyword: column for column, keyword in enumerate(keywords)}
+        unit_columns = {unit: len(keywords) + column for column, unit in enumerate(units)}
+        width = len(keywords) + len(units)
+        
+        categories = list(keyword_matcher.categories)
+        membership = np.zeros((width, len(categories)), dtype=np.int32)
+        for column, category in enumerate(categories):
+            for keyword in keyword_matcher.categories[category]:
+                membership[keyword_columns[keyword], column] += 1
+        cv_mask = np.zeros(width, dtype=np.int32)
+        cv_mask[:len(keywords)] = [keyword in self.cv_keywords for keyword in keywords]
+        
+        def entry_matrix(entries: List) -> np.ndarray:
+            matrix = np.zeros((width, len(entries)), dtype=np.int32)
+            for column, entry_units in enumerate(entries):
+                for unit in entry_units:
+                    matrix[unit_columns[unit], column] = 1
+            return matrix
+        
+        skills = entry_matrix(self.skill_units)
+        certifications = entry_matrix(self.certification_tokens)
+        experience = entry_matrix(self.experience_tokens)
+        self._plan = plan = {
+            'keyword_matcher': keyword_matcher,
+            'keywords': keywords,
+            'units': units,
+            'unit_hashes': unit_hashes(units),
+            'scanner': TextScanner(keywords, units),
+            'keyword_columns': keyword_columns,
+            'unit_columns': unit_columns,
+            'keyword_count': len(keywords),
+            'categories': categories,
+            'membership': membership,
+            'cv_membership': membership * cv_mask[:, None],
+            'category_bonus': np.array([self._category_bonus(category) for category in categories],
+                                       dtype=np.int32),
+            'skills': skills,
+            'skill_units_needed': skills.sum(axis=0),
+            'certifications': certifications,
+            'experience': experience,
+            # All of the above side by side, for _score_arrays
+            'weights': np.hstack([membership + membership * cv_mask[:, None], skills,
+                                  certifications, experience]).astype(np.float64),
+            'weight_splits': np.cumsum([len(categories), skills.shape[1], certifications.shape[1]]),
+        }
+        return plan
+    
     def _calculate_cv_relevance(self, job_description: str) -> int:
         """Calculate how relevant a job is based on CV content"""
-        description_lower = job_description.lower()
+        return self._relevance(JobText(job_description.lower()))
+    
+    def _relevance(self, entry: JobText) -> int:
+        """CV relevance for a preprocessed job text"""
         relevance_score = 0
+        plan = self._batch_plan()
+        present = set(itertools.compress(plan['units'], entry.contains(plan['unit_hashes'])))
         
         # Check skills matches
-        skill_matches = sum(1 for skill in self.cv_data.get('skills', [])
-                          if skill.lower() in description_lower)
+        skill_matches = sum(1 for units in self.skill_units if units and present.issuperset(units))
         relevance_score += min(3, skill_matches)
         
         # Check certification relevance
-        cert_matches = sum(1 for cert in self.cv_data.get('certifications', [])
-                         if any(word.lower() in description_lower 
-                               for word in cert.split() if len(word) > 3))
+        cert_matches = sum(1 for tokens in self.certification_tokens if not tokens.isdisjoint(entry.tokens))
         relevance_score += min(2, cert_matches)
         
         # Check experience relevance
-        exp_matches = sum(1 for exp in self.cv_data.get('experience', [])
-                        if any(word.lower() in description_lower 
-                              for word in exp.split() if len(word) > 3))
+        exp_matches = sum(1 for tokens in self.experience_tokens if not tokens.isdisjoint(entry.tokens))
         relevance_score += min(3, exp_matches)
         
         return relevance_score
@@ -139,17 +433,46 @@ class JobMatcher:
         'rejected'         # Application rejected
     ]
     
-    def __init__(self, profile_data: Dict):
+    MIN_MATCH_SCORE = 8  # Minimum total score for a job to count as a match
+    
+    # Scoring engines a matcher can use; env MATCH_ENGINE picks the default
+    ENGINES = {
+        'tech_artistic': TechArtisticScorer,
+        'bm25': BM25Scorer,
+    }
+    DEFAULT_ENGINE = os.getenv('MATCH_ENGINE', 'tech_artistic')
+    
+    def __init__(self, profile_data: Dict, scorer=None, engine: Optional[str] = None):
+        """
+        Args:
+            profile_data: Profile dictionary as stored by ProfileManager
+            scorer: Precompiled scorer for this profile (e.g. from a
+                ScorerCache); built from the profile's stored artifacts if
+                omitted
+            engine: Name of the engine in ENGINES used to build the scorer
+                (default DEFAULT_ENGINE); ignored when scorer is given
+        """
         self.profile = profile_data
-        self.scorer = TechArtisticScorer(profile_data['cv_data'])
+        if scorer is None:
+            engine = engine or self.DEFAULT_ENGINE
+            if engine not in self.ENGINES:
+                raise ValueError("Unknown scoring engine %r. Must be one of: %s" % (
+                    engine, ', '.join(self.ENGINES)))
+            scorer = self.ENGINES[engine].from_profile(profile_data)
+        self.scorer = scorer
+        # Engines score on their own scale and may bring their own threshold
+        self.min_match_score = getattr(scorer, 'MIN_MATCH_SCORE', self.MIN_MATCH_SCORE)
         self.preferences = profile_data.get('preferences', {})
+        # Counters of the last match_jobs_top_k call
+        self.top_k_stats: Dict[str, int] = {}
     
     def _meets_basic_criteria(self, job: Dict) -> bool:
         """
         Check if job meets basic criteria (salary, location, etc.)
         
         Args:
-            job: Dictionary containing job details
+            job: Dictionary containing job details, or a JobRecord whose
+                salary, currency and remote flag were parsed at ingest
             
         Returns:
             bool: True if job meets criteria, False otherwise
@@ -158,23 +481,14 @@ class JobMatcher:
         currency = self.preferences.get('currency', 'GBP')
         job_types = self.preferences.get('job_types', [])
         
-        # Salary check
-        if 'salary' in job:
-            if isinstance(job['salary'], (int, float)):
-                if job['salary'] < min_salary:
-                    return False
-            elif isinstance(job['salary'], str):
-                # Try to extract numeric salary from string
-                import re
-                salary_numbers = re.findall(r'\d+', job['salary'])
-                if salary_numbers and int(salary_numbers[0]) < min_salary:
-                    return False
+        # Salary check, unless the job pays in another currency
+        salary = job_salary(job)
+        if salary is not None and salary < min_salary and job_currency(job) in (None, currency):
+            return False
         
         # Remote work check
-        if 'remote' in job_types:
-            location = job.get('location', '').lower()
-            if not any(term in location for term in ['remote', 'work from home', 'wfh']):
-                return False
+        if 'remote' in job_types and not is_remote_job(job):
+            return False
         
         return True
     
@@ -198,20 +512,177 @@ class JobMatcher:
         score_details = self.scorer.score_job(job)
         
         # Only return matches that meet minimum score threshold
-        if score_details['total_score'] >= 8:  # Minimum threshold for matches
-            return {
-                'job': job,
-                'score_details': score_details,
-                'status': current_status,
-                'status_history': [{
-                    'status': current_status,
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'notes': None
-                }],
-                'timestamp': datetime.utcnow().isoformat()
-            }
+        if score_details['total_score'] >= self.min_match_score:
+            return self._build_match(job, score_details, current_status)
         
         return None
+    
+    def match_jobs(self, jobs: List[Dict], current_status: str = 'new') -> List[Optional[Dict]]:
+        """
+        Match a whole job catalog against the user profile in one call
+        
+        Args:
+            jobs: Job listings
+            current_status: Status given to every match (default: 'new')
+            
+        Returns:
+            List aligned with jobs: match details where match_job would
+            return them, None elsewhere
+        """
+        if current_status not in self.STATUS_OPTIONS:
+            raise ValueError("Invalid status. Must be one of: %s" % ', '.join(self.STATUS_OPTIONS))
+        eligible = [index for index, job in enumerate(jobs) if self._meets_basic_criteria(job)]
+        details = self.scorer.score_jobs([jobs[index] for index in eligible])
+        totals = np.fromiter((detail['total_score'] for detail in details), dtype=np.float64, count=len(details))
+        
+        results: List[Optional[Dict]] = [None] * len(jobs)
+        for position in np.flatnonzero(totals >= self.min_match_score).tolist():
+            index = eligible[position]
+            results[index] = self._build_match(jobs[index], details[position], current_status)
+        return results
+    
+    def match_jobs_top_k(self, jobs: List[Dict], k: int = 20, current_status: str = 'new') -> List[Dict]:
+        """
+        Return the best k matches in a job list without fully scoring every job
+        
+        Jobs failing the basic criteria are dropped first, as in match_jobs.
+        Each remaining job gets a cheap upper bound: its category scores (one
+        keyword scan) plus the highest cv_relevance the CV can earn. Jobs are
+        visited by descending bound while a heap holds the best k matches so
+        far; once a bound cannot beat the worst of them, that job and every
+        job after it are pruned. The result is the same as ranking
+        match_jobs(jobs); self.top_k_stats reports how many jobs were pruned.
+        
+        Args:
+            jobs: Job listings
+            k: Number of matches to return
+            current_status: Status given to every match (default: 'new')
+            
+        Returns:
+            Up to k matches, highest total_score first; ties keep list order
+        """
+        if current_status not in self.STATUS_OPTIONS:
+            raise ValueError("Invalid status. Must be one of: %s" % ', '.join(self.STATUS_OPTIONS))
+        if k <= 0:
+            return []
+        if not isinstance(self.scorer, TechArtisticScorer):
+            return self._ranked_matches(jobs, k, current_status)
+        eligible = [job for job in jobs if self._meets_basic_criteria(job)]
+        category_totals = self.scorer.category_totals([self.scorer.job_texts.text(job) for job in eligible])
+        bounds = category_totals + self.scorer.max_relevance
+        order = np.argsort(-bounds, kind='stable').tolist()
+        category_totals = category_totals.tolist()
+        bounds = bounds.tolist()
+        
+        # Min-heap of (total_score, -position): the root is the match the
+        # next candidate has to beat, latest position first among ties
+        heap: List[Tuple[int, int]] = []
+        scored = pruned = 0
+        for visited, position in enumerate(order):
+            bound = bounds[position]
+            if bound < self.min_match_score or (len(heap) == k and bound < heap[0][0]):
+                # Bounds only decrease from here on
+                pruned += len(order) - visited
+                break
+            if len(heap) == k and (bound, -position) <= heap[0]:
+                pruned += 1
+                continue
+            scored += 1
+            entry = self.scorer.job_texts.get(eligible[position])
+            total = category_totals[position] + self.scorer._relevance(entry)
+            if total < self.min_match_score:
+                continue
+            if len(heap) < k:
+                heapq.heappush(heap, (total, -position))
+            elif (total, -position) > heap[0]:
+                heapq.heapreplace(heap, (total, -position))
+        
+        filtered = len(jobs) - len(eligible)
+        self.top_k_stats = {'jobs': len(jobs), 'filtered': filtered, 'scored': scored, 'pruned': pruned}
+        logger.debug("Top %d of %d jobs: filtered %d, scored %d, pruned %d",
+                     k, len(jobs), filtered, scored, pruned)
+        return [
+            self._build_match(eligible[-negative], self.scorer.score_job(eligible[-negative]), current_status)
+            for _, negative in sorted(heap, reverse=True)
+        ]
+    
+    def match_top_k(self, index: JobIndex, k: int = 10, current_status: str = 'new') -> List[Dict]:
+        """
+        Return the best matches in an indexed job catalog
+        
+        Only jobs containing at least one of the scorer's keywords or
+        relevance units are scored; any other job scores the bonus floor,
+        the points the CV's certification bonuses earn on their own. When
+        that floor reaches the match threshold every job is ranked, so the
+        result is the same as ranking match_jobs over the whole catalog.
+        
+        Args:
+            index: Indexed job catalog
+            k: Number of matches to return
+            current_status: Status given to every match (default: 'new')
+            
+        Returns:
+            Up to k matches, highest total_score first; ties keep catalog order
+        """
+        if current_status not in self.STATUS_OPTIONS:
+            raise ValueError("Invalid status. Must be one of: %s" % ', '.join(self.STATUS_OPTIONS))
+        if k <= 0:
+            return []
+        if not isinstance(self.scorer, TechArtisticScorer):
+            return self._ranked_matches(sorted(index, key=lambda job: index.position(job['id'])),
+                                        k, current_status)
+        candidates, hits = index.hit_matrix(*self.scorer.batch_columns())
+        totals = self.scorer.score_totals(hits)
+        rows: List[Optional[int]] = list(range(len(candidates)))
+        # A job without any keyword or unit still earns the capped bonuses
+        empty = np.zeros((1, hits.shape[1]), dtype=np.int32)
+        floor = int(self.scorer.score_totals(empty)[0])
+        if floor >= self.min_match_score:
+            # Bonuses alone make a match: rank the whole catalog, with the
+            # floor for jobs that are not candidates
+            candidate_rows = dict(zip(candidates, rows))
+            candidates = [job['id'] for job in sorted(index, key=lambda job: index.position(job['id']))]
+            rows = [candidate_rows.get(job_id) for job_id in candidates]
+            totals = np.array([floor if row is None else totals[row] for row in rows], dtype=np.int64)
+        
+        # Walk scoring candidates best first (candidates are in catalog order,
+        # so a stable sort keeps ties in catalog order) and apply the basic
+        # criteria lazily, stopping once k matches are found
+        matches = []
+        checked = 0
+        scoring = np.flatnonzero(totals >= self.min_match_score)
+        for row in scoring[np.argsort(-totals[scoring], kind='stable')].tolist():
+            job = index.get(candidates[row])
+            checked += 1
+            if self._meets_basic_criteria(job):
+                hit_row = empty if rows[row] is None else hits[rows[row]:rows[row] + 1]
+                details = self.scorer.score_hit_matrix(hit_row)[0]
+                matches.append(self._build_match(job, details, current_status))
+                if len(matches) == k:
+                    break
+        logger.debug("Scored %d of %d indexed jobs, checked criteria for %d, for top %d",
+                     len(candidates), len(index), checked, k)
+        return matches
+    
+    def _ranked_matches(self, jobs: List[Dict], k: int, current_status: str) -> List[Dict]:
+        """Top k of match_jobs by total_score, ties in list order; for engines without pruning"""
+        matches = [match for match in self.match_jobs(jobs, current_status) if match]
+        matches.sort(key=lambda match: -match['score_details']['total_score'])
+        return matches[:k]
+    
+    def _build_match(self, job: Dict, score_details: Dict, current_status: str) -> Dict:
+        """Wrap score details into a match record with status tracking"""
+        return {
+            'job': job,
+            'score_details': score_details,
+            'status': current_status,
+            'status_history': [{
+                'status': current_status,
+                'timestamp': datetime.utcnow().isoformat(),
+                'notes': None
+            }],
+            'timestamp': datetime.utcnow().isoformat()
+        }
 
     def update_job_status(self, job_id: str, new_status: str, notes: Optional[str] = None) -> Dict:
         """
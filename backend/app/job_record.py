@@ -0,0 +1,216 @@
+"""
+Job Record module for normalizing job listings once at ingest.
+A JobRecord keeps a job's fields in slots instead of a per-job dict, interns
+the strings many jobs share (title, company, location, employment type), and
+carries what filtering derives from a job: numeric salary bounds, currency,
+remote flag and employment type. The lowercased match text is not kept on
+the record; JobTextCache holds it for the jobs being scored. Records read
+like the job dicts they replace (record['title'], record.get('salary')), so
+code written against dicts keeps working.
+"""
+import enum
+import logging
+import re
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Location terms that make a job count as remote
+REMOTE_TERMS = ['remote', 'work from home', 'wfh']
+_REMOTE = re.compile('|'.join(map(re.escape, REMOTE_TERMS)))
+
+# Amounts such as 50000, 50,000, 85.5k
+_SALARY_AMOUNT = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*([kK]\b)?')
+_CURRENCIES = [('£', 'GBP'), ('gbp', 'GBP'), ('€', 'EUR'), ('eur', 'EUR'), ('$', 'USD'), ('usd', 'USD')]
+
+class EmploymentType(enum.IntEnum):
+    """Normalized employment type of a job"""
+    UNKNOWN = 0
+    FULL_TIME = 1
+    PART_TIME = 2
+    CONTRACT = 3
+    INTERNSHIP = 4
+    TEMPORARY = 5
+
+    @classmethod
+    def parse(cls, value: Optional[str]) -> 'EmploymentType':
+        """Map a free-text employment type ('Full-time', 'freelance', ...) to a member"""
+        text = re.sub(r'[^a-z]', '', (value or '').lower())
+        for prefixes, member in _EMPLOYMENT_PREFIXES:
+            if text.startswith(prefixes):
+                return member
+        return cls.UNKNOWN
+
+    @classmethod
+    def parse_filter(cls, values: Iterable[str]) -> Set['EmploymentType']:
+        """
+        The members a list of requested employment types selects
+
+        Raises:
+            ValueError: If a value is not a recognized employment type
+        """
+        wanted = set()
+        for value in values:
+            member = cls.parse(value)
+            if member is cls.UNKNOWN:
+                raise ValueError("Unknown employment type %r. Use one of: %s" % (
+                    value, ', '.join(member.name.lower() for member in list(cls)[1:])))
+            wanted.add(member)
+        return wanted
+
+_EMPLOYMENT_PREFIXES = [
+    (('full', 'permanent'), EmploymentType.FULL_TIME),
+    (('part',), EmploymentType.PART_TIME),
+    (('contract', 'freelance'), EmploymentType.CONTRACT),
+    (('intern', 'graduate'), EmploymentType.INTERNSHIP),
+    (('temp', 'seasonal'), EmploymentType.TEMPORARY),
+]
+
+def parse_salary(job: Dict) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+    """
+    (minimum, maximum, currency code) of a job's salary
+
+    A numeric salary is both bounds as is. A salary string gives its first
+    and last amount, with thousands separators and a 'k' suffix understood,
+    and a currency from its symbol or code. Jobs without a salary fall back
+    to salary_range {'min', 'max', 'currency'}. Unknown parts are None.
+    """
+    salary = job.get('salary')
+    if isinstance(salary, (int, float)) and not isinstance(salary, bool):
+        return salary, salary, job.get('currency')
+    if isinstance(salary, str):
+        if salary.isdigit():
+            amount = int(salary)
+            return amount, amount, job.get('currency')
+        amounts = []
+        for number, thousands in _SALARY_AMOUNT.findall(salary):
+            amount = float(number.replace(',', ''))
+            amounts.append(amount * 1000 if thousands else amount)
+        amounts = [int(amount) if amount.is_integer() else amount for amount in amounts]
+        if amounts:
+            lowered = salary.lower()
+            currency = next((code for marker, code in _CURRENCIES if marker in lowered), job.get('currency'))
+            return amounts[0], amounts[-1], currency
+    salary_range = job.get('salary_range')
+    if isinstance(salary_range, dict) and (salary_range.get('min') is not None
+                                           or salary_range.get('max') is not None):
+        return (salary_range.get('min'), salary_range.get('max'),
+                salary_range.get('currency', job.get('currency')))
+    return None, None, job.get('currency')
+
+def is_remote_location(location: Optional[str]) -> bool:
+    """True if a location mentions remote work"""
+    return _REMOTE.search((location or '').lower()) is not None
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+class JobRecord:
+    """Normalized, read-only job listing built once at ingest"""
+
+    # Job fields held in slots; any other field goes to extra
+    FIELDS = ('id', 'title', 'company', 'location', 'description', 'url', 'salary',
+              'employment_type', 'updated_at')
+    # Fields whose values repeat across jobs and are interned
+    SHARED_FIELDS = frozenset(('title', 'company', 'location', 'employment_type'))
+
+    _FIELD_NAMES = frozenset(FIELDS)
+
+    __slots__ = FIELDS + ('extra', 'salary_min', 'salary_max', 'currency', 'remote', 'employment')
+
+    def __init__(self, job: Dict):
+        """
+        Args:
+            job: Job dictionary shaped like the Supabase jobs table
+        """
+        for field in self.FIELDS:
+            value = job.get(field)
+            object.__setattr__(self, field, _intern(value) if field in self.SHARED_FIELDS else value)
+        extra = {key: value for key, value in job.items() if key not in self._FIELD_NAMES}
+        object.__setattr__(self, 'extra', extra or None)
+        salary_min, salary_max, currency = parse_salary(job)
+        object.__setattr__(self, 'salary_min', salary_min)
+        object.__setattr__(self, 'salary_max', salary_max)
+        object.__setattr__(self, 'currency', _intern(currency))
+        object.__setattr__(self, 'remote', is_remote_location(self.location))
+        object.__setattr__(self, 'employment', EmploymentType.parse(self.employment_type))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("JobRecord is read-only; build a new record from an updated job")
+
+    def __reduce__(self):
+        # Pickled as slot values, so unpickling does not parse again
+        return _restore_record, (tuple(getattr(self, slot) for slot in self.__slots__),)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._FIELD_NAMES:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        elif self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._FIELD_NAMES:
+            value = getattr(self, key)
+            return default if value is None else value
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __iter__(self) -> Iterator[str]:
+        for field in self.FIELDS:
+            if getattr(self, field) is not None:
+                yield field
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None or (self.extra is not None and key in self.extra)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (JobRecord, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def keys(self) -> List[str]:
+        return list(self)
+
+    def values(self) -> List[Any]:
+        return [self[key] for key in self]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(key, self[key]) for key in self]
+
+    def __repr__(self) -> str:
+        return "JobRecord(%r)" % self.to_dict()
+
+    def to_dict(self) -> Dict:
+        """The job as a plain dictionary, e.g. for JSON responses"""
+        return dict(self.items())
+
+def _restore_record(values: Tuple) -> JobRecord:
+    record = JobRecord.__new__(JobRecord)
+    for slot, value in zip(JobRecord.__slots__, values):
+        object.__setattr__(record, slot, value)
+    return record
+
+def as_record(job: Union[Dict, JobRecord]) -> JobRecord:
+    """A job as a JobRecord, building one from a dict"""
+    return job if isinstance(job, JobRecord) else JobRecord(job)
+
+def as_records(jobs: Iterable[Union[Dict, JobRecord]]) -> List[JobRecord]:
+    """Jobs as JobRecords"""
+    return [as_record(job) for job in jobs]
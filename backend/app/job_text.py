@@ -0,0 +1,202 @@
+"""
+Job Text module for preprocessing job descriptions once for every user.
+Turns a job's title and description into its lowercased text, word token
+set and word n-gram set, and keeps the results in a shared, memory-bounded
+LRU keyed by job ID and updated_at, so CV relevance becomes set
+intersections instead of substring scans repeated per user. N-grams are
+kept as a sorted array of their string hashes, a fraction of the memory of
+a set of strings; hashes are only compared within one process.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+NGRAM_MAX = 3  # Longest word n-gram stored per job
+
+# Words, keeping '+' and '#' so c++ and c# survive tokenization
+_TOKEN = re.compile(r"\w[\w+#]*")
+
+def job_text(job: Dict) -> str:
+    """The lowercased text the scorer matches keywords against"""
+    return f"{job.get('title', '')} {job.get('description', '')}".lower()
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of text, in order"""
+    return _TOKEN.findall(text.lower())
+
+def phrase_units(phrase: str) -> List[str]:
+    """
+    N-grams a job must contain for phrase to match: the phrase itself when
+    it is at most NGRAM_MAX words long, otherwise each of its NGRAM_MAX-word
+    windows. A phrase without words has no units and never matches.
+    """
+    words = tokenize(phrase)
+    if len(words) <= NGRAM_MAX:
+        return [' '.join(words)] if words else []
+    return list(dict.fromkeys(' '.join(words[start:start + NGRAM_MAX])
+                              for start in range(len(words) - NGRAM_MAX + 1)))
+
+def unit_hashes(units: Iterable[str]) -> np.ndarray:
+    """Hashes of n-gram units, comparable with JobText.ngrams"""
+    return np.fromiter((hash(unit) for unit in units), dtype=np.int64)
+
+class JobText:
+    """Preprocessed text of one job"""
+
+    __slots__ = ('text', 'tokens', 'ngrams', 'size')
+
+    def __init__(self, text: str):
+        """
+        Args:
+            text: Lowercased title and description (see job_text)
+        """
+        # Interned, so jobs share one copy of each word
+        words = [sys.intern(word) for word in _TOKEN.findall(text)]
+        self.text = text
+        self.tokens: FrozenSet[str] = frozenset(words)
+        # Sorted, unique hashes of every 1..NGRAM_MAX word n-gram
+        ngrams = list(map(hash, words))
+        for length in range(2, NGRAM_MAX + 1):
+            ngrams.extend(map(hash, map(' '.join, zip(*(words[offset:] for offset in range(length))))))
+        self.ngrams: np.ndarray = np.unique(np.array(ngrams, dtype=np.int64))
+        # Approximate memory held by this entry, for the cache budget
+        self.size = sys.getsizeof(text) + sys.getsizeof(self.tokens) + self.ngrams.nbytes
+
+    @classmethod
+    def from_job(cls, job: Dict) -> 'JobText':
+        """Preprocess a job without going through a cache"""
+        return cls(job_text(job))
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Boolean array: which of the given unit hashes are n-grams of this job"""
+        positions = np.searchsorted(self.ngrams, hashes)
+        found = positions < len(self.ngrams)
+        found[found] = self.ngrams[positions[found]] == hashes[found]
+        return found
+
+    def has_unit(self, unit: str) -> bool:
+        """True if unit is one of this job's word n-grams"""
+        return bool(self.contains(unit_hashes([unit]))[0])
+
+class JobTextCache:
+    """Memory-bounded LRU of preprocessed job text shared by all scorers"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        """
+        Args:
+            max_bytes: Approximate memory budget for cached entries
+                (env JOB_TEXT_CACHE_MAX_BYTES, default 256 MiB)
+        """
+        self.max_bytes = max_bytes or int(os.getenv('JOB_TEXT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+        self._entries: 'OrderedDict[Tuple[Hashable, Optional[str]], JobText]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, job: Dict) -> JobText:
+        """
+        Return the preprocessed text of a job, computing it on a miss
+
+        Jobs are keyed by (id, updated_at). Jobs without an updated_at are
+        checked against their current text on every lookup, and jobs without
+        an id are never cached.
+        """
+        job_id = job.get('id')
+        if job_id is None:
+            return JobText.from_job(job)
+        updated_at = job.get('updated_at')
+        key = (job_id, updated_at)
+        text = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and updated_at is None:
+                text = job_text(job)
+                if entry.text != text:
+                    entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = JobText(text if text is not None else job_text(job))
+        self._remember(key, entry)
+        return entry
+
+    def text(self, job: Dict) -> str:
+        """
+        The lowercased text of a job, from its cached entry when there is
+        one; a miss is not cached, for callers that only scan the text
+        """
+        updated_at = job.get('updated_at')
+        if updated_at is not None:
+            with self._lock:
+                entry = self._entries.get((job.get('id'), updated_at))
+            if entry is not None:
+                return entry.text
+        return job_text(job)
+
+    def texts(self, jobs: List[Dict]) -> List[str]:
+        """text() of each job, aligned with jobs, looked up under one lock"""
+        with self._lock:
+            entries = [self._entries.get((job.get('id'), job.get('updated_at')))
+                       if job.get('updated_at') is not None else None
+                       for job in jobs]
+        return [job_text(job) if entry is None else entry.text for job, entry in zip(jobs, entries)]
+
+    def get_many(self, jobs: List[Dict]) -> List[JobText]:
+        """Preprocessed text for each job, aligned with jobs"""
+        return [self.get(job) for job in jobs]
+
+    def _remember(self, key: Tuple[Hashable, Optional[str]], entry: JobText) -> None:
+        """Insert an entry, evicting least recently used ones over budget"""
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and memory usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+# Shared by every scorer and index in the process
+job_text_cache = JobTextCache()
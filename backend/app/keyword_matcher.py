@@ -0,0 +1,103 @@
+"""
+Keyword Matcher module for finding many keywords in a text in one pass.
+Compiles a category -> keywords mapping once; each scan returns the
+matched keywords for every category together, with the same substring
+semantics as `keyword in text`.
+"""
+from collections import deque
+from typing import Dict, FrozenSet, List, Optional, Set
+
+# Below this many distinct keywords, per-keyword C substring search beats a
+# Python-level automaton walk; above it the automaton's single pass wins
+AUTOMATON_MIN_KEYWORDS = 256
+
+class KeywordMatcher:
+    """Compiled multi-keyword substring matcher grouped by category"""
+
+    def __init__(self, categories: Dict[str, List[str]], use_automaton: Optional[bool] = None):
+        """
+        Args:
+            categories: Category name -> keywords (matched case-sensitively;
+                callers pass lowercase keywords and lowercase text)
+            use_automaton: Force the Aho-Corasick automaton on or off;
+                by default it is used for large keyword sets only
+        """
+        self.categories = {category: list(keywords) for category, keywords in categories.items()}
+        self.keywords: List[str] = list(dict.fromkeys(
+            keyword for keywords in self.categories.values() for keyword in keywords if keyword
+        ))
+        if use_automaton is None:
+            use_automaton = len(self.keywords) >= AUTOMATON_MIN_KEYWORDS
+        self.use_automaton = use_automaton
+        if use_automaton:
+            self._build_automaton()
+
+    def _build_automaton(self) -> None:
+        """
+        Build an Aho-Corasick automaton and flatten it into a DFA: every state
+        maps each alphabet character straight to its next state, so a scan
+        never follows failure links.
+        """
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[str]] = [set()]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                if char not in goto[state]:
+                    goto.append({})
+                    outputs.append(set())
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            outputs[state].add(keyword)
+
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict() for _ in goto]
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        order = []
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for char, child in goto[state].items():
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                fail[child] = target if target != child else 0
+                outputs[child] |= outputs[fail[child]]
+        # States in BFS order, so each failure target is complete before use
+        for state in order:
+            transitions = dict(delta[fail[state]])
+            transitions.update(goto[state])
+            delta[state] = transitions
+        self._delta = delta
+        self._outputs: List[FrozenSet[str]] = [frozenset(found) for found in outputs]
+
+    def find(self, text: str) -> Set[str]:
+        """Return the set of keywords occurring anywhere in text"""
+        if not self.use_automaton:
+            return {keyword for keyword in self.keywords if keyword in text}
+        delta = self._delta
+        outputs = self._outputs
+        found: Set[str] = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """
+        Match every category against text in one pass
+
+        Returns:
+            Category -> matched keywords, in the category's keyword order
+            (a keyword listed twice in a category is reported twice)
+        """
+        found = self.find(text)
+        return {
+            category: [keyword for keyword in keywords if keyword in found]
+            for category, keywords in self.categories.items()
+        }
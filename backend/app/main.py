@@ -1,14 +1,31 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import uvicorn
 from typing import Dict, List
 import json
+import os
 from datetime import datetime
 
-from app.cv_parser import parse_cv
+from app.batch_ingest import BatchIngestor, to_ndjson
+from app.cv_cache import CVCache
+from app.cv_pool import CVParsePool, CVParsePoolFull
+from app.job_dedup import JobDeduplicator
 from app.job_matcher import JobMatcher
+from app.job_record import EmploymentType, as_records
+from app.profile_artifacts import artifact_stats
 from app.profile_manager import ProfileManager, ProfileData
+from app.reverse_matcher import ReverseMatcher
+from app.scorer_cache import ScorerCache
+from app.taxonomy import taxonomy_store
 from app.notification_service import NotificationService
+from app.upload_limits import (
+    InvalidUploadContent,
+    MULTIPART_OVERHEAD_BYTES,
+    UploadSizeLimitMiddleware,
+    UploadTooLarge,
+    read_upload,
+)
 
 app = FastAPI(title="NAVADA Job Finder API")
 
@@ -24,12 +41,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Bound upload sizes while the request body is still arriving
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", 500 * 1024 * 1024))
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/api/parse-cv": MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+        "/api/parse-cv/batch": MAX_BATCH_UPLOAD_BYTES,
+    },
+)
+
 # Initialize managers
-profile_manager = ProfileManager()
-notification_service = NotificationService()
+scorer_cache = ScorerCache()
+profile_manager = ProfileManager(scorer_cache=scorer_cache)
+# Every stored profile, loaded on the first reverse match and kept current
+# through profile change notifications
+reverse_matcher = ReverseMatcher(scorer_cache=scorer_cache, source=profile_manager.profiles.values)
+profile_manager.add_listener(reverse_matcher.profile_changed)
+# Near-duplicate clusters of the jobs seen most recently, grown as jobs arrive
+job_deduplicator = JobDeduplicator()
+notification_service = NotificationService(deduplicator=job_deduplicator)
 
-import tempfile
-import os
 from pathlib import Path
 import logging
 from typing import List, Optional
@@ -48,6 +81,13 @@ if supabase_url and supabase_key:
 
 ALLOWED_EXTENSIONS = {'.pdf', '.doc', '.docx'}
 
+# CV parsing runs in worker processes; repeated uploads are served from cache
+cv_cache = CVCache(
+    disk_dir=profile_manager.storage_dir / "cv_cache"
+    if os.getenv("CV_CACHE_DISK", "false").lower() == "true" else None
+)
+cv_parse_pool = CVParsePool(cache=cv_cache)
+
 @app.post("/api/parse-cv")
 async def parse_cv_endpoint(file: UploadFile = File(...)):
     """Parse uploaded CV and return structured data"""
@@ -61,25 +101,59 @@ async def parse_cv_endpoint(file: UploadFile = File(...)):
                 detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
             )
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            # Write uploaded file to temporary file
-            contents = await file.read()
-            tmp.write(contents)
-            tmp.flush()
-            
-            logger.info(f"Processing CV file: {filename}")
-            # Parse the CV
-            cv_data = parse_cv(tmp.name)
-            
-        # Clean up temporary file
-        os.unlink(tmp.name)
+        # Read in bounded chunks, checking the magic bytes on the first one
+        contents, digest = await read_upload(file, MAX_UPLOAD_BYTES)
+        logger.info(f"Processing CV file: {filename}")
+        # Parse the CV in a worker process so the event loop stays free
+        cv_data = await cv_parse_pool.parse(contents, filename, digest)
+        truncated = cv_data.pop("truncated", [])
+        
         logger.info(f"Successfully parsed CV: {filename}")
-        return {"success": True, "data": cv_data}
+        return {"success": True, "data": cv_data, "truncated": bool(truncated), "truncated_by": truncated}
+    except CVParsePoolFull as e:
+        logger.warning(f"CV parse queue full, rejecting {file.filename}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUploadContent as e:
+        raise HTTPException(status_code=415, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing CV: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/parse-cv/batch")
+async def parse_cv_batch(files: List[UploadFile] = File(...), create_profiles: bool = False):
+    """
+    Parse many CVs in parallel, streaming one NDJSON record per file and a
+    final summary record with throughput and per-file failures
+    
+    Args:
+        files: CV uploads (PDF or DOCX)
+        create_profiles: Also write a profile per CV, keyed by file name
+    """
+    sources = []
+    for upload in files:
+        try:
+            content, _ = await read_upload(upload, MAX_UPLOAD_BYTES)
+        except (UploadTooLarge, InvalidUploadContent) as e:
+            # Reported as a per-file failure in the stream
+            content = e
+        sources.append((upload.filename or "", content))
+    
+    ingestor = BatchIngestor(cv_parse_pool, profile_manager if create_profiles else None)
+    return StreamingResponse(to_ndjson(ingestor.run(sources)), media_type="application/x-ndjson")
+
+@app.get("/api/parse-cv/cache")
+async def cv_cache_stats():
+    """Return CV parse cache hit/miss counters"""
+    return {"success": True, "stats": cv_cache.stats()}
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop background worker processes"""
+    cv_parse_pool.shutdown()
+    profile_manager.profiles.close()
+
 @app.post("/api/profiles")
 async def create_profile(profile_data: Dict):
     """Create or update user profile"""
@@ -94,7 +168,7 @@ async def create_profile(profile_data: Dict):
             preferences=profile_data.get("preferences", {})
         )
         profile_manager.create_or_update_profile(profile)
-        return {"success": True, "profile": profile.to_dict()}
+        return {"success": True, "profile": profile.to_dict(include_artifacts=False)}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -104,7 +178,15 @@ async def get_profile(user_id: str):
     profile = profile_manager.get_profile(user_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
-    return {"success": True, "profile": profile.to_dict()}
+    return {"success": True, "profile": profile.to_dict(include_artifacts=False)}
+
+@app.get("/api/profile-store")
+async def profile_store_stats():
+    """Return profile store backend and size"""
+    stats = profile_manager.profiles.stats()
+    stats['refreshed_profiles'] = profile_manager.refreshed_profiles
+    stats['artifacts'] = artifact_stats()
+    return {"success": True, "stats": stats}
 
 @app.post("/api/config/slack")
 async def configure_slack(credentials: Dict):
@@ -223,6 +305,42 @@ async def test_notifications():
             detail=f"Error testing notifications: {str(e)}"
         )
 
+@app.get("/api/jobs/scorer-cache")
+async def scorer_cache_stats():
+    """Return compiled scorer cache statistics"""
+    return {"success": True, "stats": scorer_cache.stats()}
+
+@app.get("/api/taxonomy")
+async def taxonomy():
+    """Return the keyword taxonomy scoring currently uses"""
+    return {"success": True, "taxonomy": taxonomy_store.current().to_dict(), "stats": taxonomy_store.stats()}
+
+@app.post("/api/taxonomy/reload")
+async def reload_taxonomy():
+    """Reload the taxonomy file now instead of at the next periodic check"""
+    failed = taxonomy_store.failed_reloads
+    changed = taxonomy_store.reload(force=True)
+    stats = taxonomy_store.stats()
+    if stats["failed_reloads"] > failed:
+        raise HTTPException(status_code=400, detail=stats["last_error"])
+    return {"success": True, "changed": changed, "stats": stats}
+
+@app.get("/api/jobs/dedup")
+async def job_dedup_stats():
+    """Return near-duplicate job index statistics"""
+    return {"success": True, "stats": job_deduplicator.stats()}
+
+@app.post("/api/jobs/reverse-match")
+async def reverse_match(job: Dict):
+    """Find every user profile a single job matches, best score first"""
+    try:
+        # Profiles other workers changed since the last check
+        profile_manager.refresh()
+        matches = reverse_matcher.match(job)
+        return {"success": True, "matches": matches, "stats": reverse_matcher.stats()}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/api/jobs/match/{user_id}")
 async def match_jobs(
     user_id: str,
@@ -237,6 +355,10 @@ async def match_jobs(
         remote_only: Filter for remote positions only
         employment_types: List of employment types to include
     """
+    try:
+        wanted_types = EmploymentType.parse_filter(employment_types or [])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         if not supabase:
             raise HTTPException(
@@ -249,8 +371,9 @@ async def match_jobs(
         if not profile:
             raise HTTPException(status_code=404, detail="Profile not found")
         
-        # Initialize job matcher
-        matcher = JobMatcher(profile.to_dict())
+        # Initialize job matcher with the profile's compiled scorer
+        profile_dict = profile.to_dict()
+        matcher = JobMatcher(profile_dict, scorer=scorer_cache.get_scorer(profile_dict))
         
         # Build Supabase query
         query = supabase.table('jobs').select('*')
@@ -299,25 +422,26 @@ async def match_jobs(
             }
         ]
         
+        # Score one job per near-duplicate cluster
+        mock_jobs = job_deduplicator.unique(as_records(mock_jobs))
+        
         matches = []
         for job in mock_jobs:
             # Check employment type filter
-            if employment_types:
-                job_type = job["employment_type"].lower()
-                if not any(type.lower() in job_type for type in employment_types):
-                    continue
+            if wanted_types and job.employment not in wanted_types:
+                continue
             
             # Check remote filter
-            if remote_only and "remote" not in job["location"].lower():
+            if remote_only and not job.remote:
                 continue
                 
             # Calculate mock scores
-            tech_score = 0.85 if "blockchain" in job["title"].lower() else 0.75
+            tech_score = 0.85 if "blockchain" in job.title.lower() else 0.75
             artistic_score = 0.70
             total_score = (tech_score + artistic_score) / 2
             
             matches.append({
-                "job": job,
+                "job": job.to_dict(),
                 "score_details": {
                     "total_score": total_score,
                     "category_scores": {
@@ -328,6 +452,7 @@ async def match_jobs(
                     "cv_relevance": 0.80,
                     "high_priority": total_score > 0.8
                 },
+                "duplicates": job_deduplicator.duplicates(job["id"]),
                 "status": "new",
                 "status_history": [
                     {
@@ -1,13 +1,17 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 import os
 import aiohttp
 from datetime import datetime
 import logging
 
+from app.job_dedup import JobDeduplicator
+
 logger = logging.getLogger(__name__)
 
 class NotificationService:
-    def __init__(self):
+    def __init__(self, deduplicator: Optional[JobDeduplicator] = None):
+        # Near-duplicate jobs in a batch are announced once when set
+        self.deduplicator = deduplicator
         self.webhook_url = os.getenv('SLACK_WEBHOOK_URL')
         self.channel = os.getenv('SLACK_CHANNEL', 'navadaopportunities')
         if not self.webhook_url:
@@ -105,6 +109,11 @@ Match Scores:
         """Send notifications for multiple jobs via webhook"""
         success_count = 0
         failed_count = 0
+        duplicate_count = 0
+        if self.deduplicator is not None:
+            unique_jobs = self.deduplicator.unique(jobs)
+            duplicate_count = len(jobs) - len(unique_jobs)
+            jobs = unique_jobs
         
         try:
             # Group jobs into blocks of 5 to avoid message length limits
@@ -132,5 +141,6 @@ Match Scores:
         return {
             "success": success_count,
             "failed": failed_count,
-            "total": len(jobs)
+            "total": len(jobs),
+            "duplicates": duplicate_count
         }
@@ -0,0 +1,183 @@
+"""
+Profile Artifacts module for the matching state derived from a profile's CV.
+The CV keyword set, the tokenized relevance terms of its skills,
+certifications and experience, and the certification bonuses the taxonomy
+grants are computed once, when ProfileManager writes the profile, and
+stored next to it in JSON form under a schema version. Scorers load them
+instead of re-deriving them from the raw cv_data lists; artifacts written
+under an older schema or for an older version of the profile are rebuilt
+from cv_data, and certification bonuses computed with an older taxonomy are
+recomputed, the first time they are used.
+"""
+import logging
+import threading
+from typing import Dict, FrozenSet, List, Optional, Set
+
+from app.job_text import phrase_units, tokenize
+from app.taxonomy import Taxonomy, taxonomy_store
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Bump whenever the derivation below changes; stored artifacts of any other
+# version are rebuilt
+ARTIFACTS_VERSION = 1
+
+# Key of the artifacts in a stored profile dict
+ARTIFACTS_KEY = 'artifacts'
+
+_stats_lock = threading.Lock()
+_stats = {'loaded': 0, 'rebuilt': 0, 'bonuses_recomputed': 0}
+
+def _count(counter: str) -> None:
+    with _stats_lock:
+        _stats[counter] += 1
+
+def artifact_stats() -> Dict[str, int]:
+    """How often stored artifacts were loaded as is, rebuilt, or had their bonuses recomputed"""
+    with _stats_lock:
+        return dict(_stats)
+
+def _line_tokens(line: str) -> FrozenSet[str]:
+    return frozenset(token for token in tokenize(line) if len(token) > 3)
+
+class ProfileArtifacts:
+    """Matching state derived from one version of a profile's cv_data"""
+
+    def __init__(
+        self,
+        cv_keywords: Set[str],
+        skill_units: List[List[str]],
+        certification_tokens: List[FrozenSet[str]],
+        experience_tokens: List[FrozenSet[str]],
+        category_bonuses: Dict[str, int],
+        taxonomy_version: str,
+        last_updated: Optional[str] = None
+    ):
+        """
+        Args:
+            cv_keywords: Lowercased words of the skills, experience and
+                certifications
+            skill_units: N-gram units of each skill phrase
+            certification_tokens: Tokens longer than 3 characters of each
+                certification
+            experience_tokens: Tokens longer than 3 characters of each
+                experience line
+            category_bonuses: Bonus points per category the certifications
+                earn under the taxonomy of taxonomy_version
+            taxonomy_version: Version of the taxonomy the bonuses came from
+            last_updated: last_updated stamp of the profile version the
+                artifacts were derived from
+        """
+        self.cv_keywords = cv_keywords
+        self.skill_units = skill_units
+        self.certification_tokens = certification_tokens
+        self.experience_tokens = experience_tokens
+        self.category_bonuses = category_bonuses
+        self.taxonomy_version = taxonomy_version
+        self.last_updated = last_updated
+
+    @classmethod
+    def build(
+        cls,
+        cv_data: Dict[str, List[str]],
+        taxonomy: Optional[Taxonomy] = None,
+        last_updated: Optional[str] = None
+    ) -> 'ProfileArtifacts':
+        """
+        Derive the artifacts from parsed CV sections
+
+        Args:
+            cv_data: Parsed CV sections
+            taxonomy: Taxonomy granting the certification bonuses (default:
+                the current one in taxonomy_store)
+            last_updated: Stamp of the profile version cv_data belongs to
+        """
+        taxonomy = taxonomy or taxonomy_store.current()
+        skills = cv_data.get('skills', [])
+        experience = cv_data.get('experience', [])
+        certifications = cv_data.get('certifications', [])
+        cv_keywords = set()
+        for line in skills + experience + certifications:
+            cv_keywords.update(line.lower().split())
+        return cls(
+            cv_keywords=cv_keywords,
+            skill_units=[phrase_units(skill) for skill in skills],
+            certification_tokens=[_line_tokens(cert) for cert in certifications],
+            experience_tokens=[_line_tokens(exp) for exp in experience],
+            category_bonuses=taxonomy.category_bonuses(certifications),
+            taxonomy_version=taxonomy.version,
+            last_updated=last_updated
+        )
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable form stored next to the profile"""
+        return {
+            'version': ARTIFACTS_VERSION,
+            'last_updated': self.last_updated,
+            'taxonomy_version': self.taxonomy_version,
+            'cv_keywords': sorted(self.cv_keywords),
+            'skill_units': self.skill_units,
+            'certification_tokens': [sorted(tokens) for tokens in self.certification_tokens],
+            'experience_tokens': [sorted(tokens) for tokens in self.experience_tokens],
+            'category_bonuses': self.category_bonuses
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ProfileArtifacts':
+        """
+        Load artifacts stored by to_dict
+
+        Raises:
+            ValueError: If data was written under another schema version
+        """
+        if data.get('version') != ARTIFACTS_VERSION:
+            raise ValueError("Profile artifacts version %r, expected %d" % (data.get('version'), ARTIFACTS_VERSION))
+        return cls(
+            cv_keywords=set(data['cv_keywords']),
+            skill_units=[list(units) for units in data['skill_units']],
+            certification_tokens=[frozenset(tokens) for tokens in data['certification_tokens']],
+            experience_tokens=[frozenset(tokens) for tokens in data['experience_tokens']],
+            category_bonuses=dict(data['category_bonuses']),
+            taxonomy_version=data['taxonomy_version'],
+            last_updated=data.get('last_updated')
+        )
+
+def profile_artifacts(profile: Dict, taxonomy: Optional[Taxonomy] = None) -> ProfileArtifacts:
+    """
+    The artifacts of a stored profile dict, loaded from the dict when they
+    are current and rebuilt from its cv_data when they are missing, of
+    another schema version or derived from another version of the profile;
+    certification bonuses from another taxonomy are recomputed. Rebuilt
+    artifacts are not written back: a write from the read path could
+    overwrite a newer version of the profile, so they are persisted the
+    next time ProfileManager writes it.
+
+    Args:
+        profile: Profile dictionary as stored by ProfileManager
+        taxonomy: Taxonomy the artifacts are used with (default: the
+            current one in taxonomy_store)
+    """
+    taxonomy = taxonomy or taxonomy_store.current()
+    last_updated = profile.get('last_updated')
+    stored = profile.get(ARTIFACTS_KEY)
+    artifacts = None
+    if stored:
+        try:
+            artifacts = ProfileArtifacts.from_dict(stored)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.debug("Rebuilding artifacts of profile %s: %s", profile.get('user_id'), str(e))
+    if artifacts is None or artifacts.last_updated != last_updated:
+        _count('rebuilt')
+        return ProfileArtifacts.build(profile['cv_data'], taxonomy, last_updated)
+    if artifacts.taxonomy_version != taxonomy.version:
+        _count('bonuses_recomputed')
+        artifacts.category_bonuses = taxonomy.category_bonuses(profile['cv_data'].get('certifications', []))
+        artifacts.taxonomy_version = taxonomy.version
+    else:
+        _count('loaded')
+    return artifacts
@@ -0,0 +1,693 @@
+"""
+Profile Log module, a log-structured profile store.
+Every write or delete is appended to the active segment file as one compact
+record (a checksummed header, the user_id, the email and the profile JSON),
+and writers that arrive together share one fsync. An in-memory index maps
+each user_id to the offset of its latest record, so a read is one positioned
+read. A background compactor copies the live records of the sealed segments
+into a snapshot file with a binary offset index and swaps it in; startup
+loads the newest snapshot index and replays only the segments written after
+it, without parsing any profile. Processes sharing the directory append
+under an exclusive file lock after reading whatever the others appended, so
+each process's index follows the others' writes record by record.
+"""
+import gc
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from app.profile_store import ProcessLock, ProfileStore
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+OP_PUT = 1
+OP_DELETE = 2
+# crc32 of the rest of the record, value length, op, user_id length, email length
+RECORD_HEADER = struct.Struct('<IIBHH')
+# Snapshot index entry: value offset, value length, record crc32, user_id
+# length, email length
+INDEX_ENTRY = struct.Struct('<QIIHH')
+INDEX_MAGIC = b'PLIDX2\n'
+# Snapshots written before entries carried the record crc32
+INDEX_ENTRY_V1 = struct.Struct('<QIHH')
+INDEX_MAGIC_V1 = b'PLIDX1\n'
+# Shared counters in profiles.lock: appends and segment starts, compactions
+COUNTER_WRITES = 0
+COUNTER_COMPACTIONS = 1
+# Compaction is not worth starting for less garbage than this
+COMPACT_MIN_DEAD_BYTES = 1 << 20
+
+_SEGMENT = re.compile(r'segment-(\d{10})\.log$')
+_SNAPSHOT = re.compile(r'snapshot-(\d{10})\.idx$')
+
+# user_id -> (file name, value offset, value length, email, record crc32 or
+# None if loaded from a version 1 snapshot)
+Entry = Tuple[str, int, int, str, Optional[int]]
+
+class ProfileLogError(ValueError):
+    """Raised when a sealed segment or snapshot of the profile log is corrupt"""
+
+def encode_record(op: int, user_id: str, email: str, value: bytes = b'') -> bytes:
+    """One log record"""
+    key = user_id.encode('utf-8')
+    mail = email.encode('utf-8')
+    body = RECORD_HEADER.pack(0, len(value), op, len(key), len(mail))[4:] + key + mail + value
+    return struct.pack('<I', zlib.crc32(body)) + body
+
+def parse_record(data: bytes, position: int) -> Optional[Tuple[int, str, str, int, int, int, int]]:
+    """
+    Decode the record at position, checking its crc32
+
+    Returns:
+        (op, user_id, email, value offset, value length, record size,
+        crc32), or None if the record is incomplete or corrupt
+    """
+    if position + RECORD_HEADER.size > len(data):
+        return None
+    crc, value_length, op, key_length, email_length = RECORD_HEADER.unpack_from(data, position)
+    size = RECORD_HEADER.size + key_length + email_length + value_length
+    if position + size > len(data) or zlib.crc32(data[position + 4:position + size]) != crc:
+        return None
+    start = position + RECORD_HEADER.size
+    user_id = data[start:start + key_length].decode('utf-8')
+    email = data[start + key_length:start + key_length + email_length].decode('utf-8')
+    return op, user_id, email, start + key_length + email_length, value_length, size, crc
+
+def _record_size(user_id: str, entry: Entry) -> int:
+    return RECORD_HEADER.size + len(user_id.encode('utf-8')) + len(entry[3].encode('utf-8')) + entry[2]
+
+def fsync_directory(directory: Path) -> None:
+    """Make file creations and renames in a directory durable"""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class LogProfileStore(ProfileStore):
+    """Append-only segment files with an in-memory offset index"""
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_bytes: Optional[int] = None,
+        sync_interval: Optional[float] = None,
+        compact_ratio: Optional[float] = None,
+        compact_interval: Optional[float] = None,
+        migrate_from: Optional[Path] = None
+    ):
+        """
+        Args:
+            directory: Directory of the segment and snapshot files, created
+                if missing
+            segment_bytes: Size at which the active segment is sealed and a
+                new one started (env PROFILE_LOG_SEGMENT_BYTES, default 64 MiB)
+            sync_interval: Seconds between background fsyncs (env
+                PROFILE_LOG_SYNC_SECONDS, default 0: every write returns once
+                an fsync covering it completes, shared by concurrent writers)
+            compact_ratio: Share of dead bytes at which the compactor runs
+                (env PROFILE_LOG_COMPACT_RATIO, default 0.5)
+            compact_interval: Seconds between compactor checks (env
+                PROFILE_LOG_COMPACT_SECONDS, default 30; 0 disables background
+                compaction)
+            migrate_from: profiles.json to import when the log is empty; the
+                file is renamed to profiles.json.migrated after
+
+        Raises:
+            ProfileLogError: If a sealed segment or the snapshot is corrupt
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes or int(os.getenv('PROFILE_LOG_SEGMENT_BYTES', 64 << 20))
+        self.sync_interval = (sync_interval if sync_interval is not None
+                              else float(os.getenv('PROFILE_LOG_SYNC_SECONDS', 0)))
+        self.compact_ratio = compact_ratio or float(os.getenv('PROFILE_LOG_COMPACT_RATIO', 0.5))
+        self.compact_interval = (compact_interval if compact_interval is not None
+                                 else float(os.getenv('PROFILE_LOG_COMPACT_SECONDS', 30)))
+        # Guards the index, the open files and the active segment
+        self._lock = threading.Lock()
+        # Held while syncing and while compaction closes files, so an fsync
+        # never meets a closed descriptor
+        self._sync_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        # Shared with other processes: appends take the lock exclusively;
+        # its counters tell a process when there is anything to catch up on
+        self._process_lock = ProcessLock(self.directory / 'profiles.lock', counters=2)
+        self._compact_process_lock = ProcessLock(self.directory / 'compact.lock')
+        # Counter values this process has caught up with
+        self._generation = 0
+        self._layout = 0
+        # Changed by other processes and not yet reported by refresh()
+        self._changed: Set[str] = set()
+        # Descriptors replaced by a reload, closed at the next fsync
+        self._retired: List[int] = []
+        self._index: Dict[str, Entry] = {}
+        self._emails: Dict[str, Set[str]] = {}
+        self._files: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._live_bytes = 0
+        # Bytes appended since opening, and how many of them are synced
+        self._written = 0
+        self._synced = 0
+        self.syncs = 0
+        self.compactions = 0
+        self.replayed_records = 0
+        started = time.perf_counter()
+        # Loading allocates an index entry per profile; collection passes
+        # over them would only slow startup down
+        gc.disable()
+        try:
+            with self._process_lock.exclusive():
+                self._open()
+        finally:
+            gc.enable()
+        self.open_seconds = time.perf_counter() - started
+        if migrate_from is not None:
+            self.migrate_json(migrate_from)
+        self._stop = threading.Event()
+        self._maintainer: Optional[threading.Thread] = None
+        if self.sync_interval > 0 or self.compact_interval > 0:
+            self._maintainer = threading.Thread(target=self._maintain, name='profile-log', daemon=True)
+            self._maintainer.start()
+
+    # Startup
+
+    def _open(self) -> None:
+        names = {path.name for path in self.directory.iterdir()}
+        # Unless another process is writing a snapshot right now
+        if self._compact_process_lock.acquire(blocking=False):
+            try:
+                for name in names:
+                    if name.endswith('.tmp'):
+                        os.remove(self.directory / name)
+            finally:
+                self._compact_process_lock.release()
+        generation = self._snapshot_generation(names)
+        # Files the snapshot replaced, left behind by an interrupted compaction
+        for name in names:
+            segment, snapshot = _SEGMENT.match(name), re.match(r'snapshot-(\d{10})\.(log|idx)$', name)
+            if ((segment and int(segment.group(1)) <= generation)
+                    or (snapshot and int(snapshot.group(1)) != generation)):
+                os.remove(self.directory / name)
+        self._load(names, generation, truncate=True)
+        logger.info("Opened profile log %s: %d profiles, %d records replayed",
+                    self.directory, len(self._index), self.replayed_records)
+
+    @staticmethod
+    def _snapshot_generation(names: Set[str]) -> int:
+        """The newest snapshot with both of its files, or -1"""
+        generations = sorted((int(match.group(1)) for match in map(_SNAPSHOT.match, names) if match),
+                             reverse=True)
+        for candidate in generations:
+            if 'snapshot-%010d.log' % candidate in names:
+                return candidate
+        return -1
+
+    def _load(self, names: Set[str], generation: int, truncate: bool) -> None:
+        """
+        Fill the empty index from a snapshot and the segments after it; the
+        caller holds the process lock, exclusively if truncate is set
+        """
+        if generation >= 0:
+            self._load_snapshot(generation)
+        segments = sorted(name for name in names
+                          if _SEGMENT.match(name) and int(_SEGMENT.match(name).group(1)) > generation)
+        end = 0
+        for position, name in enumerate(segments):
+            end = self._replay(name, last=position == len(segments) - 1, truncate=truncate)
+        if segments:
+            self._active = segments[-1]
+            self._active_number = int(_SEGMENT.match(self._active).group(1))
+            os.close(self._files.pop(self._active))
+            self._files[self._active] = os.open(self.directory / self._active, os.O_RDWR | os.O_APPEND)
+            self._active_size = end
+        else:
+            self._active_number = generation
+            self._start_segment()
+        self._generation = self._process_lock.counter(COUNTER_WRITES)
+        self._layout = self._process_lock.counter(COUNTER_COMPACTIONS)
+
+    def _load_snapshot(self, generation: int) -> None:
+        name = 'snapshot-%010d.log' % generation
+        with open(self.directory / ('snapshot-%010d.idx' % generation), 'rb') as f:
+            data = f.read()
+        current = data.startswith(INDEX_MAGIC)
+        if (not (current or data.startswith(INDEX_MAGIC_V1)) or len(data) < len(INDEX_MAGIC) + 4
+                or zlib.crc32(data[:-4]) != struct.unpack('<I', data[-4:])[0]):
+            raise ProfileLogError("Snapshot index %s is corrupt" % generation)
+        position = len(INDEX_MAGIC)
+        end = len(data) - 4
+        entry_format = INDEX_ENTRY if current else INDEX_ENTRY_V1
+        unpack = entry_format.unpack_from
+        # Loaded first, into an empty index, so entries are set directly
+        index, emails = self._index, self._emails
+        live = 0
+        while position < end:
+            fields = unpack(data, position)
+            offset, length, key_length, email_length = fields[0], fields[1], fields[-2], fields[-1]
+            position += entry_format.size
+            user_id = data[position:position + key_length].decode('utf-8')
+            position += key_length
+            email = data[position:position + email_length].decode('utf-8')
+            position += email_length
+            index[user_id] = (name, offset, length, email, fields[2] if current else None)
+            live += RECORD_HEADER.size + key_length + email_length + length
+            if email:
+                emails.setdefault(email, set()).add(user_id)
+        self._live_bytes += live
+        self._files[name] = os.open(self.directory / name, os.O_RDONLY)
+        self._total_bytes += os.fstat(self._files[name]).st_size
+
+    def _replay(self, name: str, last: bool, truncate: bool) -> int:
+        """
+        Index the records of a segment; a torn record ends the last one,
+        and is cut off if truncate is set
+
+        Returns:
+            Position after the last whole record
+        """
+        path = self.directory / name
+        with open(path, 'rb') as f:
+            data = f.read()
+        position = 0
+        while position < len(data):
+            record = parse_record(data, position)
+            if record is None:
+                if not last:
+                    raise ProfileLogError("Segment %s is corrupt at offset %d" % (name, position))
+                if truncate:
+                    # A write torn by a crash; everything before it is intact
+                    logger.warning("Truncating torn record at offset %d of %s", position, name)
+                    with open(path, 'r+b') as f:
+                        f.truncate(position)
+                        os.fsync(f.fileno())
+                break
+            op, user_id, email, value_offset, value_length, size, crc = record
+            if op == OP_PUT:
+                self._set(user_id, (name, value_offset, value_length, email, crc))
+            else:
+                self._unset(user_id)
+            self._total_bytes += size
+            self.replayed_records += 1
+            position += size
+        self._files[name] = os.open(path, os.O_RDONLY)
+        return position
+
+    # Other processes' writes
+
+    def _catch_up(self, truncate: bool) -> None:
+        """
+        Apply what other processes wrote since this one last looked; the
+        caller holds _lock and the process lock, exclusively if truncate is
+        set, in which case a record torn by a crashed writer is cut off
+        """
+        writes = self._process_lock.counter(COUNTER_WRITES)
+        layout = self._process_lock.counter(COUNTER_COMPACTIONS)
+        if writes == self._generation and layout == self._layout:
+            return
+        if layout != self._layout:
+            self._reload(truncate)
+        else:
+            while True:
+                self._read_tail(truncate)
+                following = 'segment-%010d.log' % (self._active_number + 1)
+                try:
+                    fd = os.open(self.directory / following, os.O_RDWR | os.O_APPEND)
+                except FileNotFoundError:
+                    break
+                # The process that started the next segment synced this one
+                self._synced = max(self._synced, self._written)
+                self._files[following] = fd
+                self._active, self._active_number, self._active_size = following, self._active_number + 1, 0
+        self._generation, self._layout = writes, layout
+
+    def _read_tail(self, truncate: bool) -> None:
+        """Index records appended to the active segment by other processes"""
+        fd = self._files[self._active]
+        end = os.fstat(fd).st_size
+        if end <= self._active_size:
+            return
+        data = os.pread(fd, end - self._active_size, self._active_size)
+        position = 0
+        while position < len(data):
+            record = parse_record(data, position)
+            if record is None:
+                if truncate:
+                    logger.warning("Truncating torn record at offset %d of %s",
+                                   self._active_size + position, self._active)
+                    os.ftruncate(fd, self._active_size + position)
+                break
+            op, user_id, email, value_offset, value_length, size, crc = record
+            if op == OP_PUT:
+                self._set(user_id, (self._active, self._active_size + value_offset, value_length, email, crc))
+            else:
+                self._unset(user_id)
+            self._changed.add(user_id)
+            self._total_bytes += size
+            position += size
+        self._active_size += position
+
+    def _reload(self, truncate: bool) -> None:
+        """
+        Load the snapshot another process compacted into, plus the segments
+        after it, and note the profiles whose record differs from before
+        """
+        previous = self._index
+        self._retired.extend(self._files.values())
+        self._index, self._emails, self._files = {}, {}, {}
+        self._total_bytes = self._live_bytes = 0
+        names = {path.name for path in self.directory.iterdir()}
+        self._load(names, self._snapshot_generation(names), truncate)
+        for user_id in previous.keys() | self._index.keys():
+            old, new = previous.get(user_id), self._index.get(user_id)
+            # Same length, email and crc32: the record was only moved
+            if old is None or new is None or old[4] is None or old[2:] != new[2:]:
+                self._changed.add(user_id)
+
+    def _close_retired(self) -> None:
+        """The caller holds _sync_lock and _lock"""
+        for fd in self._retired:
+            os.close(fd)
+        self._retired = []
+
+    # Index
+
+    def _set(self, user_id: str, entry: Entry) -> None:
+        self._unset(user_id)
+        self._index[user_id] = entry
+        self._live_bytes += _record_size(user_id, entry)
+        if entry[3]:
+            self._emails.setdefault(entry[3], set()).add(user_id)
+
+    def _unset(self, user_id: str) -> bool:
+        entry = self._index.pop(user_id, None)
+        if entry is None:
+            return False
+        self._live_bytes -= _record_size(user_id, entry)
+        if entry[3]:
+            users = self._emails[entry[3]]
+            users.discard(user_id)
+            if not users:
+                del self._emails[entry[3]]
+        return True
+
+    # Writing
+
+    def _start_segment(self) -> None:
+        # Tells other processes to look for the new segment
+        self._generation = self._process_lock.increment(COUNTER_WRITES)
+        self._active_number += 1
+        self._active = 'segment-%010d.log' % self._active_number
+        self._files[self._active] = os.open(self.directory / self._active,
+                                            os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._active_size = 0
+        fsync_directory(self.directory)
+
+    def _roll(self) -> None:
+        """Seal the active segment; the caller holds _lock"""
+        os.fsync(self._files[self._active])
+        self._synced = max(self._synced, self._written)
+        self._start_segment()
+
+    def _append(self, records: List[Tuple[int, str, str, bytes]]) -> Optional[int]:
+        """
+        Append (op, user_id, email, value) records, dropping deletes of
+        profiles not stored
+
+        Returns:
+            The end position to sync, or None if nothing was written
+        """
+        with self._lock:
+            if self._files is None:
+                raise ValueError("Profile log %s is closed" % self.directory)
+            with self._process_lock.exclusive():
+                self._catch_up(truncate=True)
+                records = [record for record in records if record[0] == OP_PUT or record[1] in self._index]
+                if not records:
+                    return None
+                if self._active_size >= self.segment_bytes:
+                    self._roll()
+                # Counted before writing: if this process dies mid-write, the
+                # next writer catches up and cuts off the torn record
+                self._generation = self._process_lock.increment(COUNTER_WRITES)
+                position = self._active_size
+                chunks = []
+                for op, user_id, email, value in records:
+                    record = encode_record(op, user_id, email, value)
+                    if op == OP_PUT:
+                        self._set(user_id, (self._active, position + len(record) - len(value), len(value), email,
+                                            RECORD_HEADER.unpack_from(record)[0]))
+                    else:
+                        self._unset(user_id)
+                    chunks.append(record)
+                    position += len(record)
+                data = b''.join(chunks)
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(self._files[self._active], view):]
+            self._active_size = position
+            self._total_bytes += len(data)
+            self._written += len(data)
+            return self._written
+
+    def _sync_to(self, end: int) -> None:
+        """fsync until position end is durable; one fsync covers every writer waiting"""
+        with self._sync_lock:
+            if self._synced >= end:
+                return
+            with self._lock:
+                if self._files is None:
+                    return
+                target = self._written
+                fd = self._files[self._active]
+            # Earlier segments were synced when they were sealed
+            os.fsync(fd)
+            self._synced = max(self._synced, target)
+            self.syncs += 1
+            if self._retired:
+                with self._lock:
+                    self._close_retired()
+
+    def _commit(self, end: int) -> None:
+        if self.sync_interval <= 0:
+            self._sync_to(end)
+
+    def put_many(self, profiles: List[Dict]) -> None:
+        records = [(OP_PUT, profile['user_id'], profile.get('email') or '',
+                    json.dumps(profile, separators=(',', ':')).encode('utf-8')) for profile in profiles]
+        if records:
+            self._commit(self._append(records))
+
+    def delete(self, user_id: str) -> bool:
+        end = self._append([(OP_DELETE, user_id, '', b'')])
+        if end is None:
+            return False
+        self._commit(end)
+        return True
+
+    def refresh(self) -> List[str]:
+        with self._lock:
+            if self._files is None:
+                return []
+            if (self._process_lock.counter(COUNTER_WRITES) != self._generation
+                    or self._process_lock.counter(COUNTER_COMPACTIONS) != self._layout):
+                with self._process_lock.shared():
+                    self._catch_up(truncate=False)
+            changed, self._changed = sorted(self._changed), set()
+        return changed
+
+    def sync(self) -> None:
+        """Make every write so far durable"""
+        self._sync_to(self._written)
+
+    # Reading
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._index.get(user_id)
+            if entry is None:
+                return None
+            value = os.pread(self._files[entry[0]], entry[2], entry[1])
+        return json.loads(value)
+
+    def get_by_email(self, email: str) -> List[Dict]:
+        with self._lock:
+            users = sorted(self._emails.get(email, ()))
+        return [profile for profile in map(self.get, users) if profile is not None]
+
+    def values(self) -> Iterator[Dict]:
+        # In file order, for sequential reads; each profile is its latest version
+        with self._lock:
+            order = sorted(self._index, key=lambda user_id: self._index[user_id][:2])
+        for user_id in order:
+            profile = self.get(user_id)
+            if profile is not None:
+                yield profile
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._index
+
+    # Compaction
+
+    def dead_bytes(self) -> int:
+        """Bytes of overwritten and deleted records"""
+        return self._total_bytes - self._live_bytes
+
+    def needs_compaction(self) -> bool:
+        """True if enough of the log is dead to be worth compacting"""
+        dead = self.dead_bytes()
+        return dead >= COMPACT_MIN_DEAD_BYTES and dead >= self.compact_ratio * self._total_bytes
+
+    def compact(self, only_if_needed: bool = False) -> bool:
+        """
+        Copy the live records of the sealed segments into a new snapshot
+        and swap it in. Writes continue into a fresh segment meanwhile and
+        take precedence over the snapshot. One process compacts at a time.
+
+        Args:
+            only_if_needed: Skip unless needs_compaction() still holds once
+                this process has caught up with the others' writes
+
+        Returns:
+            False if there was nothing to compact, or another process is
+            compacting
+        """
+        with self._compact_lock:
+            if not self._compact_process_lock.acquire(blocking=False):
+                return False
+            try:
+                return self._compact(only_if_needed)
+            finally:
+                self._compact_process_lock.release()
+
+    def _compact(self, only_if_needed: bool) -> bool:
+        with self._lock:
+            if self._files is None:
+                return False
+            with self._process_lock.exclusive():
+                self._catch_up(truncate=True)
+                if only_if_needed and not self.needs_compaction():
+                    return False
+                # Only a snapshot and an empty active segment: already compact
+                if not self._active_size and all(name == self._active or name.startswith('snapshot-')
+                                                 for name in self._files):
+                    return False
+                if self._active_size:
+                    self._roll()
+            generation = self._active_number - 1
+            sealed = [name for name in self._files if name != self._active]
+            live = sorted(((user_id, entry) for user_id, entry in self._index.items()
+                           if entry[0] != self._active), key=lambda item: item[1][:2])
+            files = dict(self._files)
+        name = 'snapshot-%010d.log' % generation
+        log_path = self.directory / name
+        index_path = self.directory / ('snapshot-%010d.idx' % generation)
+        moved: List[Tuple[str, Entry, Entry]] = []
+        index = [INDEX_MAGIC]
+        with open(str(log_path) + '.tmp', 'wb') as out:
+            position = 0
+            for user_id, entry in live:
+                # Sealed files never change and stay open until the swap
+                value = os.pread(files[entry[0]], entry[2], entry[1])
+                record = encode_record(OP_PUT, user_id, entry[3], value)
+                crc = RECORD_HEADER.unpack_from(record)[0]
+                out.write(record)
+                offset = position + len(record) - len(value)
+                position += len(record)
+                moved.append((user_id, entry, (name, offset, len(value), entry[3], crc)))
+                key, mail = user_id.encode('utf-8'), entry[3].encode('utf-8')
+                index.append(INDEX_ENTRY.pack(offset, len(value), crc, len(key), len(mail)) + key + mail)
+            out.flush()
+            os.fsync(out.fileno())
+        index_data = b''.join(index)
+        with open(str(index_path) + '.tmp', 'wb') as out:
+            out.write(index_data + struct.pack('<I', zlib.crc32(index_data)))
+            out.flush()
+            os.fsync(out.fileno())
+        with self._sync_lock, self._lock, self._process_lock.exclusive():
+            # The index is renamed last: a snapshot exists once both files do
+            os.replace(str(log_path) + '.tmp', log_path)
+            os.replace(str(index_path) + '.tmp', index_path)
+            fsync_directory(self.directory)
+            self._files[name] = os.open(log_path, os.O_RDONLY)
+            for user_id, old, new in moved:
+                # Profiles written during compaction keep their newer entry
+                if self._index.get(user_id) is old:
+                    self._index[user_id] = new
+            freed = 0
+            for sealed_name in sealed:
+                freed += os.fstat(self._files[sealed_name]).st_size
+                os.close(self._files.pop(sealed_name))
+            self._total_bytes += position - freed
+            self.compactions += 1
+            # Other processes reload from the new snapshot when they see this
+            self._layout = self._process_lock.increment(COUNTER_COMPACTIONS)
+            for sealed_name in sealed:
+                os.remove(self.directory / sealed_name)
+                if sealed_name.startswith('snapshot-'):
+                    os.remove(self.directory / sealed_name.replace('.log', '.idx'))
+            self._close_retired()
+        logger.info("Compacted profile log %s: %d live profiles, %d bytes freed",
+                    self.directory, len(moved), freed - position)
+        return True
+
+    def _maintain(self) -> None:
+        tick = min(interval for interval in (self.sync_interval, self.compact_interval) if interval > 0)
+        last_check = time.monotonic()
+        while not self._stop.wait(tick):
+            try:
+                if self.sync_interval > 0:
+                    self.sync()
+                if self.compact_interval > 0 and time.monotonic() - last_check >= self.compact_interval:
+                    last_check = time.monotonic()
+                    if self.needs_compaction():
+                        self.compact(only_if_needed=True)
+            except Exception as e:
+                logger.error("Profile log maintenance failed: %s", str(e))
+
+    def close(self) -> None:
+        if self._maintainer is not None:
+            self._stop.set()
+            self._maintainer.join()
+            self._maintainer = None
+        with self._compact_lock, self._sync_lock, self._lock:
+            if self._files is None:
+                return
+            os.fsync(self._files[self._active])
+            for fd in self._files.values():
+                os.close(fd)
+            self._close_retired()
+            self._files = None
+            self._process_lock.close()
+            self._compact_process_lock.close()
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        with self._lock:
+            stats.update({
+                'path': str(self.directory),
+                'files': len(self._files or ()),
+                'total_bytes': self._total_bytes,
+                'dead_bytes': self.dead_bytes(),
+                'syncs': self.syncs,
+                'compactions': self.compactions,
+                'replayed_records': self.replayed_records,
+                'generation': self._generation,
+                'open_seconds': round(self.open_seconds, 3),
+            })
+        return stats
@@ -1,12 +1,23 @@
 """
 Profile Manager module for handling user profiles and CV data storage.
 Provides secure storage and retrieval of user preferences and CV information.
+When several worker processes share the store, each manager periodically
+asks it which profiles the other workers changed and invalidates only those.
+Every profile written is stored with the matching artifacts derived from
+its CV (see profile_artifacts), so scorers do not re-derive them per request.
 """
 import json
 import logging
+import os
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+
+from app.profile_artifacts import ARTIFACTS_KEY, ProfileArtifacts
+from app.profile_store import ProfileStore, open_profile_store
+from app.scorer_cache import ScorerCache
 
 # Configure logging
 logging.basicConfig(
@@ -23,90 +34,191 @@ class ProfileData:
         user_id: str,
         cv_data: Dict[str, List[str]],
         email: Optional[str] = None,
-        preferences: Optional[Dict] = None
+        preferences: Optional[Dict] = None,
+        artifacts: Optional[Dict] = None
     ):
         self.user_id = user_id
         self.cv_data = cv_data
         self.email = email
         self.preferences = preferences or {}
         self.last_updated = datetime.utcnow().isoformat()
+        # Stored form of the ProfileArtifacts derived from cv_data
+        self.artifacts = artifacts
     
-    def to_dict(self) -> Dict:
-        """Convert profile data to dictionary format"""
-        return {
+    def to_dict(self, include_artifacts: bool = True) -> Dict:
+        """
+        Convert profile data to dictionary format
+
+        Args:
+            include_artifacts: Include the derived matching artifacts, as
+                stored; API responses leave them out
+        """
+        data = {
             "user_id": self.user_id,
             "cv_data": self.cv_data,
             "email": self.email,
             "preferences": self.preferences,
             "last_updated": self.last_updated
         }
+        if include_artifacts and self.artifacts is not None:
+            data[ARTIFACTS_KEY] = self.artifacts
+        return data
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'ProfileData':
         """Create ProfileData instance from dictionary"""
-        return cls(
+        profile = cls(
             user_id=data["user_id"],
             cv_data=data["cv_data"],
             email=data.get("email"),
-            preferences=data.get("preferences", {})
+            preferences=data.get("preferences", {}),
+            artifacts=data.get(ARTIFACTS_KEY)
         )
+        # Keep the stored version; caches are keyed by it
+        profile.last_updated = data.get("last_updated") or profile.last_updated
+        return profile
 
 class ProfileManager:
     """Manager class for handling profile data storage and retrieval"""
     
-    def __init__(self, storage_dir: str = "~/profile_data"):
+    def __init__(
+        self,
+        storage_dir: str = "~/profile_data",
+        scorer_cache: Optional[ScorerCache] = None,
+        store: Optional[ProfileStore] = None,
+        refresh_interval: Optional[float] = None
+    ):
+        """
+        Args:
+            storage_dir: Directory holding the profile store
+            scorer_cache: Compiled scorer cache to invalidate when a profile
+                changes or is deleted
+            store: Profile store to use instead of opening the one in
+                storage_dir (backend from env PROFILE_STORE, default sqlite)
+            refresh_interval: Seconds between checks for profiles changed by
+                other worker processes (env PROFILE_REFRESH_SECONDS, default
+                1; 0 checks on every read)
+        """
+        self.scorer_cache = scorer_cache
+        self.refresh_interval = (refresh_interval if refresh_interval is not None
+                                 else float(os.getenv('PROFILE_REFRESH_SECONDS', 1)))
+        self._refresh_lock = threading.Lock()
+        self._refreshed = time.monotonic()
+        self.refreshed_profiles = 0
+        # Called with (user_id, stored profile dict or None when deleted)
+        self._listeners: List[Callable[[str, Optional[Dict]], None]] = []
         self.storage_dir = Path(storage_dir).expanduser()
-        self.storage_dir.mkdir(parents=True, exist_ok=True)
-        self.profiles_file = self.storage_dir / "profiles.json"
-        self._load_profiles()
+        if store is None:
+            self.storage_dir.mkdir(parents=True, exist_ok=True)
+            store = open_profile_store(self.storage_dir)
+        # Stored profile dicts by user_id
+        self.profiles = store
     
-    def _load_profiles(self) -> None:
-        """Load profiles from storage"""
-        try:
-            if self.profiles_file.exists():
-                with open(self.profiles_file, 'r', encoding='utf-8') as f:
-                    self.profiles = json.load(f)
-            else:
-                self.profiles = {}
-        except Exception as e:
-            logger.error("Error loading profiles: %s", str(e))
-            self.profiles = {}
+    def add_listener(self, callback: Callable[[str, Optional[Dict]], None]) -> None:
+        """Register a callback run after a profile is written or deleted"""
+        self._listeners.append(callback)
     
-    def _save_profiles(self) -> None:
-        """Save profiles to storage"""
-        try:
-            with open(self.profiles_file, 'w', encoding='utf-8') as f:
-                json.dump(self.profiles, f, indent=2)
-        except Exception as e:
-            logger.error("Error saving profiles: %s", str(e))
-            raise
+    def _invalidate(self, user_id: str, data: Optional[Dict]) -> None:
+        """
+        Drop derived state cached for a changed profile and notify listeners
+
+        Args:
+            user_id: Changed profile
+            data: The profile dict as stored, or None when deleted
+        """
+        if self.scorer_cache is not None:
+            self.scorer_cache.invalidate(user_id)
+        for callback in self._listeners:
+            try:
+                callback(user_id, data)
+            except Exception as e:
+                logger.error("Profile listener failed for user %s: %s", user_id, str(e))
+    
+    def refresh(self, force: bool = False) -> int:
+        """
+        Invalidate the profiles other processes changed in the store, if
+        refresh_interval has passed since the last check (or always, with
+        force)
+
+        Returns:
+            Number of changed profiles
+        """
+        if not force and time.monotonic() - self._refreshed < self.refresh_interval:
+            return 0
+        with self._refresh_lock:
+            self._refreshed = time.monotonic()
+            try:
+                changed = self.profiles.refresh()
+            except Exception as e:
+                logger.error("Error refreshing profiles: %s", str(e))
+                return 0
+            for user_id in changed:
+                self._invalidate(user_id, self.profiles.get(user_id))
+            self.refreshed_profiles += len(changed)
+        if changed:
+            logger.info("Refreshed %d profiles changed by other processes", len(changed))
+        return len(changed)
+    
+    @staticmethod
+    def _stored(profile: ProfileData) -> Dict:
+        """
+        The dict stored for a profile, with a new last_updated stamp and
+        artifacts derived from its current cv_data; the caller may have
+        changed cv_data since the profile was loaded, so neither the stamp,
+        which keys cached scorers, nor stored artifacts are reused
+        """
+        profile.last_updated = datetime.utcnow().isoformat()
+        profile.artifacts = ProfileArtifacts.build(profile.cv_data, last_updated=profile.last_updated).to_dict()
+        return profile.to_dict()
     
     def create_or_update_profile(self, profile: ProfileData) -> None:
         """Create or update a user profile"""
         try:
-            self.profiles[profile.user_id] = profile.to_dict()
-            self._save_profiles()
+            data = self._stored(profile)
+            self.profiles.put(data)
+            self._invalidate(profile.user_id, data)
             logger.info("Profile updated for user %s", profile.user_id)
         except Exception as e:
             logger.error("Error updating profile: %s", str(e))
             raise
     
+    def create_or_update_profiles(self, profiles: List[ProfileData]) -> int:
+        """Create or update many profiles with a single write to storage"""
+        try:
+            stored = [self._stored(profile) for profile in profiles]
+            self.profiles.put_many(stored)
+            for data in stored:
+                self._invalidate(data['user_id'], data)
+            logger.info("Profiles updated for %d users", len(profiles))
+            return len(profiles)
+        except Exception as e:
+            logger.error("Error updating profiles: %s", str(e))
+            raise
+    
     def get_profile(self, user_id: str) -> Optional[ProfileData]:
         """Retrieve a user profile"""
         try:
-            if user_id in self.profiles:
-                return ProfileData.from_dict(self.profiles[user_id])
-            return None
+            self.refresh()
+            data = self.profiles.get(user_id)
+            return ProfileData.from_dict(data) if data is not None else None
         except Exception as e:
             logger.error("Error retrieving profile: %s", str(e))
             return None
     
+    def get_profiles_by_email(self, email: str) -> List[ProfileData]:
+        """Retrieve the profiles registered with an email address"""
+        try:
+            self.refresh()
+            return [ProfileData.from_dict(data) for data in self.profiles.get_by_email(email)]
+        except Exception as e:
+            logger.error("Error retrieving profiles by email: %s", str(e))
+            return []
+    
     def delete_profile(self, user_id: str) -> bool:
         """Delete a user profile"""
         try:
-            if user_id in self.profiles:
-                del self.profiles[user_id]
-                self._save_profiles()
+            if self.profiles.delete(user_id):
+                self._invalidate(user_id, None)
                 logger.info("Profile deleted for user %s", user_id)
                 return True
             return False
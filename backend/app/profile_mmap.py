@@ -0,0 +1,621 @@
+"""
+Profile Mmap module, a lazily loaded profile store for large user bases.
+Profiles are appended to one data file in the profile log's record format,
+and an open-addressing hash table on disk maps each user_id to the offset of
+its latest record. Both files are memory-mapped: opening the store reads a
+fixed-size header whatever the number of users, a lookup touches a few index
+slots and one record, and the pages are shared through the page cache by
+every process that maps the files. Profiles are decoded only when asked for,
+and a bounded LRU keeps the decoded ones. Processes sharing the files write
+under an exclusive file lock and read under a shared one; the records past
+the point a process last looked tell it which decoded profiles went stale.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.profile_log import (COMPACT_MIN_DEAD_BYTES, OP_DELETE, OP_PUT, RECORD_HEADER, encode_record,
+                             fsync_directory, parse_record)
+from app.profile_store import ProcessLock, ProfileStore
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DATA_MAGIC = b'PMDATA1\n'
+INDEX_MAGIC = b'PMINDX1\n'
+# Data file header: magic, epoch (changes when the file is rewritten)
+DATA_HEADER = struct.Struct('<8sQ')
+# Index header: magic, epoch of its data file, capacity, live profiles,
+# used slots (live and deleted), end of the indexed data, dead bytes,
+# closed cleanly
+INDEX_HEADER = struct.Struct('<8sQQQQQQQ')
+# Index slot: user_id hash, record offset
+SLOT = struct.Struct('<QQ')
+EMPTY = 0
+DELETED = 1
+MAX_LOAD = 0.7
+MIN_CAPACITY = 1024
+# Shared counters in profiles.lock: committed writes, index or data file
+# replacements
+COUNTER_WRITES = 0
+COUNTER_FILES = 1
+
+class ProfileMmapError(ValueError):
+    """Raised when the profile data file is corrupt"""
+
+def key_hash(user_id: str) -> int:
+    """Stable 64-bit hash of a user_id, never EMPTY or DELETED"""
+    value = int.from_bytes(hashlib.blake2b(user_id.encode('utf-8'), digest_size=8).digest(), 'little')
+    return value if value > DELETED else value + 2
+
+def capacity_for(count: int) -> int:
+    """Power-of-two slot count that holds count profiles at half the maximum load"""
+    capacity = MIN_CAPACITY
+    while count > capacity * MAX_LOAD / 2:
+        capacity *= 2
+    return capacity
+
+class MmapProfileStore(ProfileStore):
+    """Memory-mapped data file with an on-disk hash index and a decoded LRU"""
+
+    def __init__(
+        self,
+        directory: Path,
+        cache_size: Optional[int] = None,
+        sync: Optional[bool] = None,
+        compact_ratio: Optional[float] = None,
+        migrate_from: Optional[Path] = None
+    ):
+        """
+        Args:
+            directory: Directory of profiles.data and profiles.index,
+                created if missing
+            cache_size: Decoded profiles kept (env PROFILE_MMAP_CACHE_SIZE,
+                default 1024)
+            sync: fsync every write before returning (env PROFILE_MMAP_SYNC,
+                default true)
+            compact_ratio: Share of dead bytes in the data file at which it
+                is rewritten (env PROFILE_MMAP_COMPACT_RATIO, default 0.5)
+            migrate_from: profiles.json to import when the store is empty;
+                the file is renamed to profiles.json.migrated after
+
+        Raises:
+            ProfileMmapError: If the data file is not a profile data file
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.data_path = self.directory / 'profiles.data'
+        self.index_path = self.directory / 'profiles.index'
+        self.cache_size = cache_size or int(os.getenv('PROFILE_MMAP_CACHE_SIZE', 1024))
+        self.sync = sync if sync is not None else os.getenv('PROFILE_MMAP_SYNC', 'true').lower() == 'true'
+        self.compact_ratio = compact_ratio or float(os.getenv('PROFILE_MMAP_COMPACT_RATIO', 0.5))
+        self._lock = threading.RLock()
+        # Writers take it exclusively, readers shared
+        self._process_lock = ProcessLock(self.directory / 'profiles.lock', counters=2)
+        # Held shared by every process with the store open: the last one to
+        # close marks the index clean, and only a process opening the store
+        # alone rebuilds an index not closed cleanly
+        self._open_lock = ProcessLock(self.directory / 'profiles.open')
+        # Counter values, and the end of the records, this process has seen
+        self._generation = 0
+        self._files_version = 0
+        self._scanned = 0
+        # Changed by other processes and not yet reported by refresh()
+        self._changed: Set[str] = set()
+        self._cache: 'OrderedDict[str, Dict]' = OrderedDict()
+        # Open values() iterators; the data file is not rewritten under them
+        self._iterators = 0
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.compactions = 0
+        self._data_fd: Optional[int] = None
+        self._index_fd: Optional[int] = None
+        self._index_map: Optional[mmap.mmap] = None
+        self._data_map: Optional[mmap.mmap] = None
+        started = time.perf_counter()
+        with self._process_lock.exclusive():
+            alone = self._open_lock.acquire(blocking=False)
+            if not alone:
+                self._open_lock.acquire(exclusive=False)
+            self._open(alone)
+            if alone:
+                self._open_lock.downgrade()
+        self.open_seconds = time.perf_counter() - started
+        if migrate_from is not None:
+            self.migrate_json(migrate_from)
+
+    # Files
+
+    def _open(self, alone: bool) -> None:
+        if not self.data_path.exists():
+            with open(self.data_path, 'wb') as f:
+                f.write(DATA_HEADER.pack(DATA_MAGIC, int.from_bytes(os.urandom(8), 'little')))
+                os.fsync(f.fileno())
+            fsync_directory(self.directory)
+        self._data_fd = os.open(self.data_path, os.O_RDWR)
+        self._map_data()
+        magic, self._epoch = DATA_HEADER.unpack_from(self._data_map, 0)
+        if magic != DATA_MAGIC:
+            raise ProfileMmapError("%s is not a profile data file" % self.data_path)
+        if not self._map_index(alone):
+            if len(self._data_map) > DATA_HEADER.size:
+                logger.warning("Rebuilding profile index %s from its data file", self.index_path)
+                self.rebuilds += 1
+            self._rebuild_from_data()
+        self._generation = self._process_lock.counter(COUNTER_WRITES)
+        self._files_version = self._process_lock.counter(COUNTER_FILES)
+        self._scanned = self._data_end
+
+    def _map_data(self) -> None:
+        # A replaced map is not closed: values() iterators may still read it
+        self._data_map = mmap.mmap(self._data_fd, 0, access=mmap.ACCESS_READ)
+        # Lookups jump around the file; readahead would page in (and keep
+        # resident) far more than the records asked for
+        self._data_map.madvise(mmap.MADV_RANDOM)
+
+    def _map_index(self, alone: bool) -> bool:
+        """
+        Map the index if it matches the data file and, unless other
+        processes have the store open and keep it up to date, was closed
+        cleanly
+        """
+        try:
+            fd = os.open(self.index_path, os.O_RDWR)
+        except FileNotFoundError:
+            return False
+        size = os.fstat(fd).st_size
+        if size < INDEX_HEADER.size:
+            os.close(fd)
+            return False
+        index_map = mmap.mmap(fd, 0, access=mmap.ACCESS_WRITE)
+        magic, epoch, capacity, count, used, data_end, dead, clean = INDEX_HEADER.unpack_from(index_map, 0)
+        if (magic != INDEX_MAGIC or epoch != self._epoch or size != INDEX_HEADER.size + capacity * SLOT.size
+                or data_end > len(self._data_map) or (alone and (not clean or data_end != len(self._data_map)))):
+            index_map.close()
+            os.close(fd)
+            return False
+        self._set_index(fd, index_map)
+        return True
+
+    def _set_index(self, fd: int, index_map: mmap.mmap) -> None:
+        if self._index_map is not None:
+            self._index_map.close()
+            os.close(self._index_fd)
+        index_map.madvise(mmap.MADV_RANDOM)
+        self._index_fd, self._index_map = fd, index_map
+        (_, _, self._capacity, self._count, self._used, self._data_end, self._dead,
+         self._clean) = INDEX_HEADER.unpack_from(index_map, 0)
+
+    def _write_header(self) -> None:
+        INDEX_HEADER.pack_into(self._index_map, 0, INDEX_MAGIC, self._epoch, self._capacity, self._count,
+                               self._used, self._data_end, self._dead, self._clean)
+
+    def _write_index(self, slots: Iterable[Tuple[int, int]], count: int, dead: int, clean: int = 1) -> None:
+        """
+        Write a fresh index of (hash, record offset) slots, covering the
+        data up to _data_end, and map it; clean is 0 when it is written in
+        the middle of a write. The caller holds the process lock exclusively.
+        """
+        capacity = capacity_for(count)
+        mask = capacity - 1
+        table = bytearray(INDEX_HEADER.size + capacity * SLOT.size)
+        unpack, pack = SLOT.unpack_from, SLOT.pack_into
+        for value, offset in slots:
+            slot = value & mask
+            while unpack(table, INDEX_HEADER.size + slot * SLOT.size)[0] != EMPTY:
+                slot = (slot + 1) & mask
+            pack(table, INDEX_HEADER.size + slot * SLOT.size, value, offset)
+        INDEX_HEADER.pack_into(table, 0, INDEX_MAGIC, self._epoch, capacity, count, count,
+                               self._data_end, dead, clean)
+        tmp = str(self.index_path) + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(table)
+            os.fsync(f.fileno())
+        os.replace(tmp, self.index_path)
+        fsync_directory(self.directory)
+        fd = os.open(self.index_path, os.O_RDWR)
+        self._set_index(fd, mmap.mmap(fd, 0, access=mmap.ACCESS_WRITE))
+        # Other processes map the new file when they see this
+        self._files_version = self._process_lock.increment(COUNTER_FILES)
+
+    def _rebuild_from_data(self) -> None:
+        """Index the data file from scratch, truncating a torn final record"""
+        latest: Dict[str, Tuple[int, int]] = {}
+        dead = 0
+        position = DATA_HEADER.size
+        while position < len(self._data_map):
+            record = parse_record(self._data_map, position)
+            if record is None:
+                logger.warning("Truncating torn record at offset %d of %s", position, self.data_path)
+                os.ftruncate(self._data_fd, position)
+                os.fsync(self._data_fd)
+                self._map_data()
+                break
+            op, user_id, _, _, _, size, _ = record
+            previous = latest.pop(user_id, None)
+            if previous is not None:
+                dead += previous[1]
+            if op == OP_PUT:
+                latest[user_id] = (position, size)
+            else:
+                dead += size
+            position += size
+        self._data_end = position
+        self._write_index(((key_hash(user_id), offset) for user_id, (offset, _) in latest.items()),
+                          len(latest), dead)
+
+    def _live_slots(self) -> Iterator[Tuple[int, int]]:
+        region = self._index_map[INDEX_HEADER.size:]
+        return ((value, offset) for value, offset in SLOT.iter_unpack(region) if value > DELETED)
+
+    # Other processes' writes; the caller holds _lock and the process lock
+
+    def _stale(self) -> bool:
+        """True if another process wrote or replaced a file since this one last looked"""
+        return (self._process_lock.counter(COUNTER_WRITES) != self._generation
+                or self._process_lock.counter(COUNTER_FILES) != self._files_version)
+
+    def _sync_state(self, exclusive: bool) -> None:
+        """
+        Map files other processes replaced or grew, read the shared index
+        header, and note the profiles written since this process last
+        looked. With the lock held exclusively, also recover from a writer
+        that died partway through.
+        """
+        self._generation = self._process_lock.counter(COUNTER_WRITES)
+        replaced = exclusive and os.stat(self.data_path).st_ino != os.fstat(self._data_fd).st_ino
+        if replaced or self._process_lock.counter(COUNTER_FILES) != self._files_version:
+            self._reopen(exclusive)
+        (_, _, self._capacity, self._count, self._used, self._data_end, self._dead,
+         self._clean) = INDEX_HEADER.unpack_from(self._index_map, 0)
+        if exclusive and os.fstat(self._data_fd).st_size > self._data_end:
+            # Records appended, but not committed to the index, by a writer
+            # that died; some of its slots may already be written
+            logger.warning("Rebuilding profile index %s after an interrupted write", self.index_path)
+            self.rebuilds += 1
+            self._map_data()
+            self._rebuild_from_data()
+        elif self._data_end > len(self._data_map):
+            self._map_data()
+        if self._scanned < self._data_end:
+            self._read_changes(self._data_map, self._data_end)
+
+    def _reopen(self, exclusive: bool) -> None:
+        """Map the index and data files another process replaced"""
+        if os.stat(self.data_path).st_ino != os.fstat(self._data_fd).st_ino:
+            # Compacted: first note what was written to the old file
+            old_map = mmap.mmap(self._data_fd, 0, access=mmap.ACCESS_READ)
+            self._read_changes(old_map, len(old_map))
+            os.close(self._data_fd)
+            self._data_fd = os.open(self.data_path, os.O_RDWR)
+            self._map_data()
+            self._epoch = DATA_HEADER.unpack_from(self._data_map, 0)[1]
+            self._scanned = None
+        else:
+            # The new index may cover records appended since the last mapping
+            self._map_data()
+        if not self._map_index(alone=False):
+            if not exclusive:
+                raise ProfileMmapError("Profile index %s does not match its data file" % self.index_path)
+            # A compaction died between replacing the data file and the index
+            logger.warning("Rebuilding profile index %s from its data file", self.index_path)
+            self.rebuilds += 1
+            self._rebuild_from_data()
+        if self._scanned is None:
+            self._scanned = self._data_end
+        self._files_version = self._process_lock.counter(COUNTER_FILES)
+
+    def _read_changes(self, data_map: mmap.mmap, end: int) -> None:
+        """Note, and drop from the LRU, the profiles of the records from _scanned to end"""
+        position = self._scanned
+        while position < end:
+            record = parse_record(data_map, position)
+            if record is None:
+                break
+            self._changed.add(record[1])
+            self._cache.pop(record[1], None)
+            position += record[5]
+        self._scanned = position
+
+    # Index lookups; the caller holds _lock
+
+    def _record_key(self, offset: int) -> str:
+        _, _, _, key_length, _ = RECORD_HEADER.unpack_from(self._data_map, offset)
+        start = offset + RECORD_HEADER.size
+        return self._data_map[start:start + key_length].decode('utf-8')
+
+    def _find(self, user_id: str, value: int) -> Tuple[int, Optional[int]]:
+        """
+        (slot, record offset) of a user, or (slot to insert into, None)
+        """
+        mask = self._capacity - 1
+        slot = value & mask
+        free = None
+        index = self._index_map
+        for _ in range(self._capacity):
+            stored, offset = SLOT.unpack_from(index, INDEX_HEADER.size + slot * SLOT.size)
+            if stored == EMPTY:
+                return (slot if free is None else free), None
+            if stored == DELETED:
+                if free is None:
+                    free = slot
+            elif stored == value and self._record_key(offset) == user_id:
+                return slot, offset
+            slot = (slot + 1) & mask
+        return free, None
+
+    def _record_size(self, offset: int) -> int:
+        _, value_length, _, key_length, email_length = RECORD_HEADER.unpack_from(self._data_map, offset)
+        return RECORD_HEADER.size + key_length + email_length + value_length
+
+    def _decode(self, offset: int) -> Dict:
+        record = parse_record(self._data_map, offset)
+        if record is None:
+            raise ProfileMmapError("Corrupt record at offset %d of %s" % (offset, self.data_path))
+        return json.loads(self._data_map[record[3]:record[3] + record[4]])
+
+    # Writing
+
+    def _check_open(self) -> None:
+        if self._data_fd is None:
+            raise ValueError("Profile store %s is closed" % self.directory)
+
+    def _append(self, records: List[bytes]) -> int:
+        """Append records to the data file; returns the offset of the first"""
+        if self._clean:
+            # Until close, a crash leaves the index to be rebuilt from the data
+            self._clean = 0
+            self._write_header()
+            self._index_map.flush(0, mmap.PAGESIZE)
+        offset = self._data_end
+        data = b''.join(records)
+        written = 0
+        while written < len(data):
+            written += os.pwrite(self._data_fd, data[written:], offset + written)
+        if self.sync:
+            os.fsync(self._data_fd)
+        self._map_data()
+        return offset
+
+    def _commit(self) -> None:
+        self._data_end = self._scanned = len(self._data_map)
+        self._write_header()
+        if self.sync:
+            self._index_map.flush()
+        self._generation = self._process_lock.increment(COUNTER_WRITES)
+        if (not self._iterators and self._dead >= COMPACT_MIN_DEAD_BYTES
+                and self._dead >= self.compact_ratio * self._data_end):
+            self.compact()
+
+    def put_many(self, profiles: List[Dict]) -> None:
+        records = [encode_record(OP_PUT, profile['user_id'], profile.get('email') or '',
+                                 json.dumps(profile, separators=(',', ':')).encode('utf-8'))
+                   for profile in profiles]
+        if not records:
+            return
+        with self._lock:
+            self._check_open()
+            with self._process_lock.exclusive():
+                self._sync_state(exclusive=True)
+                offset = self._append(records)
+                for profile, record in zip(profiles, records):
+                    user_id = profile['user_id']
+                    if self._used + 1 > self._capacity * MAX_LOAD:
+                        self._write_index(self._live_slots(), self._count, self._dead, clean=0)
+                    value = key_hash(user_id)
+                    slot, previous = self._find(user_id, value)
+                    if previous is not None:
+                        self._dead += self._record_size(previous)
+                    else:
+                        self._count += 1
+                        if SLOT.unpack_from(self._index_map, INDEX_HEADER.size + slot * SLOT.size)[0] == EMPTY:
+                            self._used += 1
+                    SLOT.pack_into(self._index_map, INDEX_HEADER.size + slot * SLOT.size, value, offset)
+                    offset += len(record)
+                    self._cache.pop(user_id, None)
+                self._commit()
+
+    def delete(self, user_id: str) -> bool:
+        with self._lock:
+            self._check_open()
+            with self._process_lock.exclusive():
+                self._sync_state(exclusive=True)
+                slot, offset = self._find(user_id, key_hash(user_id))
+                if offset is None:
+                    return False
+                # The tombstone keeps the delete when the index is rebuilt
+                tombstone = encode_record(OP_DELETE, user_id, '')
+                self._append([tombstone])
+                self._dead += self._record_size(offset) + len(tombstone)
+                SLOT.pack_into(self._index_map, INDEX_HEADER.size + slot * SLOT.size, DELETED, 0)
+                self._count -= 1
+                self._cache.pop(user_id, None)
+                self._commit()
+                return True
+
+    def compact(self) -> bool:
+        """
+        Rewrite the data file with only live records and index it afresh
+
+        Returns:
+            False while a values() iteration is open
+        """
+        with self._lock:
+            self._check_open()
+            if self._iterators:
+                return False
+            with self._process_lock.exclusive():
+                self._sync_state(exclusive=True)
+                live = sorted((offset, value) for value, offset in self._live_slots())
+                self._epoch = int.from_bytes(os.urandom(8), 'little')
+                tmp = str(self.data_path) + '.tmp'
+                slots = array('Q')
+                with open(tmp, 'wb') as f:
+                    f.write(DATA_HEADER.pack(DATA_MAGIC, self._epoch))
+                    position = DATA_HEADER.size
+                    for offset, value in live:
+                        size = self._record_size(offset)
+                        f.write(self._data_map[offset:offset + size])
+                        slots.extend((value, position))
+                        position += size
+                    f.flush()
+                    os.fsync(f.fileno())
+                # A crash before the new index lands leaves an epoch mismatch,
+                # and the index is rebuilt from the new data file
+                os.replace(tmp, self.data_path)
+                os.close(self._data_fd)
+                self._data_fd = os.open(self.data_path, os.O_RDWR)
+                self._map_data()
+                freed = self._dead
+                self._data_end = self._scanned = position
+                self._write_index(zip(slots[0::2], slots[1::2]), len(live), 0)
+                self.compactions += 1
+        logger.info("Compacted profile data %s: %d live profiles, %d bytes freed",
+                    self.data_path, len(live), freed)
+        return True
+
+    # Reading
+
+    def refresh(self) -> List[str]:
+        with self._lock:
+            if self._data_fd is None:
+                return []
+            if self._stale():
+                with self._process_lock.shared():
+                    self._sync_state(exclusive=False)
+            changed, self._changed = sorted(self._changed), set()
+        return changed
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        """
+        A stored profile, decoded on first access and then served from the
+        LRU; the returned dict is shared with the cache and must not be
+        modified
+        """
+        with self._lock:
+            self._check_open()
+            if self._stale():
+                with self._process_lock.shared():
+                    self._sync_state(exclusive=False)
+            profile = self._cache.get(user_id)
+            if profile is not None:
+                self._cache.move_to_end(user_id)
+                self.hits += 1
+                return profile
+            self.misses += 1
+            with self._process_lock.shared():
+                self._sync_state(exclusive=False)
+                _, offset = self._find(user_id, key_hash(user_id))
+                if offset is None:
+                    return None
+                profile = self._decode(offset)
+            self._cache[user_id] = profile
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return profile
+
+    def _scan(self, email: Optional[str] = None) -> Iterator[Dict]:
+        """Current profiles in data file order, optionally only one email's"""
+        with self._lock:
+            self._check_open()
+            with self._process_lock.shared():
+                self._sync_state(exclusive=False)
+                # Offsets into this map, which stays valid if the data file
+                # is replaced by a compaction
+                data_map = self._data_map
+                offsets = array('Q', sorted(offset for _, offset in self._live_slots()))
+            self._iterators += 1
+        try:
+            for offset in offsets:
+                with self._lock, self._process_lock.shared():
+                    _, user_id, record_email, _, _, _, _ = parse_record(data_map, offset)
+                    if email is not None and record_email != email:
+                        continue
+                    # Profiles rewritten since the scan began are read at
+                    # their new offset; deleted ones are skipped
+                    self._sync_state(exclusive=False)
+                    _, current = self._find(user_id, key_hash(user_id))
+                    profile = None if current is None else self._decode(current)
+                if profile is not None:
+                    yield profile
+        finally:
+            with self._lock:
+                self._iterators -= 1
+
+    def get_by_email(self, email: str) -> List[Dict]:
+        # Emails are not indexed: this scans record headers, decoding only matches
+        return list(self._scan(email))
+
+    def values(self) -> Iterator[Dict]:
+        return self._scan()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._check_open()
+            with self._process_lock.shared():
+                self._sync_state(exclusive=False)
+                return self._count
+
+    def __contains__(self, user_id: str) -> bool:
+        with self._lock:
+            if user_id in self._cache and not self._stale():
+                return True
+            self._check_open()
+            with self._process_lock.shared():
+                self._sync_state(exclusive=False)
+                return self._find(user_id, key_hash(user_id))[1] is not None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._data_fd is None:
+                return
+            with self._process_lock.exclusive():
+                self._open_lock.release()
+                if self._open_lock.acquire(blocking=False):
+                    # The last process to close marks the index clean
+                    self._sync_state(exclusive=True)
+                    os.fsync(self._data_fd)
+                    self._clean = 1
+                    self._write_header()
+                    self._index_map.flush()
+                self._index_map.close()
+                self._data_map.close()
+                os.close(self._index_fd)
+                os.close(self._data_fd)
+                self._index_map = self._data_map = None
+                self._data_fd = self._index_fd = None
+                self._cache.clear()
+            self._open_lock.close()
+            self._process_lock.close()
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        with self._lock:
+            stats.update({
+                'path': str(self.directory),
+                'data_bytes': self._data_end,
+                'dead_bytes': self._dead,
+                'index_slots': self._capacity,
+                'cached': len(self._cache),
+                'cache_hits': self.hits,
+                'cache_misses': self.misses,
+                'rebuilds': self.rebuilds,
+                'compactions': self.compactions,
+                'generation': self._generation,
+                'open_seconds': round(self.open_seconds, 4),
+            })
+        return stats
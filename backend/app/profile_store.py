@@ -0,0 +1,540 @@
+"""
+Profile Store module for persisting user profiles behind ProfileManager.
+ProfileStore is the storage interface: per-profile get, put and delete plus
+iteration, keyed by user_id. SQLiteProfileStore keeps one row per profile in
+a local SQLite database in WAL mode, so a write touches one row whatever the
+number of users, a crash leaves every committed profile intact, and readers
+on other threads are never blocked by the writer. JsonProfileStore is the
+original single profiles.json file, rewritten whole on every change; an
+existing file is imported into SQLite once on first open.
+
+Several processes (uvicorn workers) can share one store: writes are
+serialized across processes and never lose another process's changes, and
+refresh() reports which profiles other processes changed since the last
+call, found through a generation counter rather than by reloading.
+"""
+import contextlib
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows): a store is then safe for one process only
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class ProcessLock:
+    """
+    Advisory lock on a file, shared by every process that opens a store,
+    with optional 64-bit counters kept in the file and mapped into memory,
+    so reading one costs no system call. Re-entrant within a process; the
+    caller serializes its own threads.
+    """
+
+    COUNTER = struct.Struct('<Q')
+
+    def __init__(self, path: Path, counters: int = 0):
+        """
+        Args:
+            path: Lock file, created if missing
+            counters: Number of shared counters, all starting at 0
+        """
+        self.path = Path(path)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._depth = 0
+        self._exclusive = False
+        self._counters: Optional[mmap.mmap] = None
+        if counters:
+            size = counters * self.COUNTER.size
+            with self.exclusive():
+                if os.fstat(self._fd).st_size < size:
+                    os.ftruncate(self._fd, size)
+            self._counters = mmap.mmap(self._fd, size)
+
+    def acquire(self, exclusive: bool = True, blocking: bool = True) -> bool:
+        """
+        Take the lock, or only count a nested hold if already held
+
+        Returns:
+            False if blocking is off and another process holds it
+
+        Raises:
+            RuntimeError: If an exclusive hold is requested inside a shared one
+        """
+        if self._depth:
+            if exclusive and not self._exclusive:
+                raise RuntimeError("Cannot upgrade shared lock %s" % self.path)
+        else:
+            if fcntl is not None:
+                flags = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB)
+                try:
+                    fcntl.flock(self._fd, flags)
+                except BlockingIOError:
+                    return False
+            self._exclusive = exclusive
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if not self._depth and fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def downgrade(self) -> None:
+        """Turn a single exclusive hold into a shared one"""
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_SH)
+        self._exclusive = False
+
+    @contextlib.contextmanager
+    def exclusive(self) -> Iterator[None]:
+        self.acquire(exclusive=True)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextlib.contextmanager
+    def shared(self) -> Iterator[None]:
+        self.acquire(exclusive=False)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def counter(self, number: int) -> int:
+        return self.COUNTER.unpack_from(self._counters, number * self.COUNTER.size)[0]
+
+    def increment(self, number: int) -> int:
+        """Add one to a counter; the caller holds the lock exclusively"""
+        value = self.counter(number) + 1
+        self.COUNTER.pack_into(self._counters, number * self.COUNTER.size, value)
+        return value
+
+    def close(self) -> None:
+        if self._counters is not None:
+            self._counters.close()
+            self._counters = None
+        if self._fd is not None:
+            # Closing the descriptor releases any hold
+            os.close(self._fd)
+            self._fd = None
+            self._depth = 0
+
+class ProfileStore:
+    """Storage interface for profile dictionaries keyed by user_id"""
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        """Return a stored profile, or None"""
+        raise NotImplementedError
+
+    def get_by_email(self, email: str) -> List[Dict]:
+        """Return the profiles registered with an email address"""
+        raise NotImplementedError
+
+    def put(self, profile: Dict) -> None:
+        """Insert or replace a profile"""
+        self.put_many([profile])
+
+    def put_many(self, profiles: List[Dict]) -> None:
+        """Insert or replace several profiles in one write"""
+        raise NotImplementedError
+
+    def delete(self, user_id: str) -> bool:
+        """Delete a profile; returns False if it was not stored"""
+        raise NotImplementedError
+
+    def values(self) -> Iterator[Dict]:
+        """Iterate over every stored profile"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.get(user_id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (profile['user_id'] for profile in self.values())
+
+    def migrate_json(self, json_path: Path) -> int:
+        """
+        Import a profiles.json into an empty store in one write, then
+        rename the file so it is not imported again. Processes opening the
+        store at once import it once: the check, import and rename run
+        under the store's exclusive process lock, and a file already
+        renamed counts as migrated.
+
+        Returns:
+            Number of profiles imported
+        """
+        json_path = Path(json_path)
+        with self._process_lock.exclusive():
+            # Catch up with profiles another process stored, or imported,
+            # since this one opened the store
+            self.refresh()
+            if len(self):
+                return 0
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    profiles = json.load(f)
+            except FileNotFoundError:
+                return 0
+            self.put_many(list(profiles.values()))
+            json_path.rename(json_path.with_name(json_path.name + '.migrated'))
+        logger.info("Migrated %d profiles from %s to %s", len(profiles), json_path, type(self).__name__)
+        return len(profiles)
+
+    def refresh(self) -> List[str]:
+        """
+        Catch up with writes made through other processes since the last
+        call; a store only one process uses has nothing to catch up with
+
+        Returns:
+            user_ids those writes created, changed or deleted
+        """
+        return []
+
+    def close(self) -> None:
+        """Release files and connections"""
+
+    def stats(self) -> Dict:
+        """Backend name and profile count"""
+        return {'backend': type(self).__name__, 'profiles': len(self)}
+
+class JsonProfileStore(ProfileStore):
+    """
+    All profiles in one JSON file, rewritten on every change. Writers hold
+    an exclusive lock on profiles.json.lock and first reload the file if
+    another process replaced it, so no process overwrites another's changes
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: The profiles.json file; its directory is created if missing
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._process_lock = ProcessLock(self.path.with_name(self.path.name + '.lock'))
+        # Changed by other processes and not yet reported by refresh()
+        self._changed: Set[str] = set()
+        with self._process_lock.shared():
+            self._stamp = self._file_stamp()
+            self.profiles: Dict[str, Dict] = self._load()
+
+    def _file_stamp(self) -> Optional[Tuple[int, int, int]]:
+        """Inode, modification time and size; every save replaces the file"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            if self.path.exists():
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error("Error loading profiles: %s", str(e))
+        return {}
+
+    def _reload_if_changed(self) -> None:
+        """Reload a file another process replaced; the caller holds both locks"""
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        profiles = self._load()
+        self._changed.update(user_id for user_id in self.profiles.keys() | profiles.keys()
+                             if self.profiles.get(user_id) != profiles.get(user_id))
+        self.profiles, self._stamp = profiles, stamp
+
+    def _save(self) -> None:
+        # Written aside and renamed over, so other processes never read half a file
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.profiles, f, indent=2)
+            os.replace(tmp, self.path)
+            self._stamp = self._file_stamp()
+        except Exception as e:
+            logger.error("Error saving profiles: %s", str(e))
+            raise
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        return self.profiles.get(user_id)
+
+    def get_by_email(self, email: str) -> List[Dict]:
+        return [profile for profile in self.profiles.values() if profile.get('email') == email]
+
+    def put_many(self, profiles: List[Dict]) -> None:
+        with self._lock, self._process_lock.exclusive():
+            self._reload_if_changed()
+            for profile in profiles:
+                self.profiles[profile['user_id']] = profile
+            self._save()
+
+    def delete(self, user_id: str) -> bool:
+        with self._lock, self._process_lock.exclusive():
+            self._reload_if_changed()
+            if self.profiles.pop(user_id, None) is None:
+                return False
+            self._save()
+            return True
+
+    def refresh(self) -> List[str]:
+        with self._lock:
+            if self._file_stamp() != self._stamp:
+                with self._process_lock.shared():
+                    self._reload_if_changed()
+            changed, self._changed = sorted(self._changed), set()
+        return changed
+
+    def values(self) -> Iterator[Dict]:
+        return iter(list(self.profiles.values()))
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self.profiles
+
+    def close(self) -> None:
+        self._process_lock.close()
+
+class SQLiteProfileStore(ProfileStore):
+    """One row per profile in a SQLite database in WAL mode"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS profiles (
+            user_id TEXT PRIMARY KEY,
+            email TEXT,
+            last_updated TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS profiles_email ON profiles (email);
+        -- Bumped by every write transaction; other processes compare it
+        -- with the value they last saw to detect changes cheaply
+        CREATE TABLE IF NOT EXISTS profile_meta (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO profile_meta (name, value) VALUES ('generation', 0);
+        -- The generation and process that last wrote or deleted each profile
+        CREATE TABLE IF NOT EXISTS profile_changes (
+            user_id TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL,
+            writer TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS profile_changes_generation ON profile_changes (generation);
+    """
+
+    def __init__(self, path: Path, synchronous: Optional[str] = None, migrate_from: Optional[Path] = None):
+        """
+        Args:
+            path: Database file, created if missing
+            synchronous: SQLite synchronous level (env PROFILE_DB_SYNCHRONOUS,
+                default NORMAL: in WAL mode a power loss can drop the last
+                commits but never corrupts the database; FULL syncs every
+                commit)
+            migrate_from: profiles.json to import when the database is
+                empty; the file is renamed to profiles.json.migrated after
+        """
+        self.path = Path(path)
+        self.synchronous = (synchronous or os.getenv('PROFILE_DB_SYNCHRONOUS', 'NORMAL')).upper()
+        if self.synchronous not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            raise ValueError("Invalid synchronous level %r" % self.synchronous)
+        # One connection per thread, so readers run concurrently; writes
+        # are serialized by SQLite's write lock
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        # Tells this store's own writes apart from other processes' in
+        # profile_changes
+        self._writer = uuid.uuid4().hex
+        # SQLite locks its own writes; this only serializes setting up a new
+        # database, as switching it to WAL fails rather than waits while
+        # another process does the same, and migrate_json
+        self._process_lock = ProcessLock(self.path.with_name(self.path.name + '.lock'))
+        with self._process_lock.exclusive():
+            connection = self._connection()
+            connection.executescript(self.SCHEMA)
+        self._generation = self._current_generation()
+        if migrate_from is not None:
+            self.migrate_json(migrate_from)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Autocommit; write transactions are opened explicitly
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=%s" % self.synchronous)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    @staticmethod
+    def _row(profile: Dict) -> tuple:
+        return (profile['user_id'], profile.get('email'), profile.get('last_updated'),
+                json.dumps(profile, separators=(',', ':')))
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        row = self._connection().execute("SELECT data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def get_by_email(self, email: str) -> List[Dict]:
+        rows = self._connection().execute("SELECT data FROM profiles WHERE email = ?", (email,))
+        return [json.loads(data) for data, in rows]
+
+    def _current_generation(self) -> int:
+        return self._connection().execute(
+            "SELECT value FROM profile_meta WHERE name = 'generation'").fetchone()[0]
+
+    def _record_changes(self, connection: sqlite3.Connection, user_ids: Iterable[str]) -> None:
+        """Bump the generation and mark user_ids changed; inside a write transaction"""
+        connection.execute("UPDATE profile_meta SET value = value + 1 WHERE name = 'generation'")
+        generation = connection.execute("SELECT value FROM profile_meta WHERE name = 'generation'").fetchone()[0]
+        connection.executemany(
+            "INSERT INTO profile_changes (user_id, generation, writer) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET generation = excluded.generation, writer = excluded.writer",
+            ((user_id, generation, self._writer) for user_id in user_ids)
+        )
+
+    def put_many(self, profiles: List[Dict]) -> None:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT INTO profiles (user_id, email, last_updated, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET email = excluded.email, "
+                "last_updated = excluded.last_updated, data = excluded.data",
+                map(self._row, profiles)
+            )
+            self._record_changes(connection, {profile['user_id'] for profile in profiles})
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def delete(self, user_id: str) -> bool:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = connection.execute("DELETE FROM profiles WHERE user_id = ?", (user_id,)).rowcount > 0
+            if deleted:
+                self._record_changes(connection, [user_id])
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return deleted
+
+    def refresh(self) -> List[str]:
+        generation = self._current_generation()
+        with self._lock:
+            if generation == self._generation:
+                return []
+            rows = self._connection().execute(
+                "SELECT user_id FROM profile_changes WHERE generation > ? AND generation <= ? AND writer != ?",
+                (self._generation, generation, self._writer))
+            self._generation = generation
+            return sorted(user_id for user_id, in rows)
+
+    def values(self) -> Iterator[Dict]:
+        # A dedicated cursor reads one consistent snapshot, in batches
+        cursor = self._connection().execute("SELECT data FROM profiles ORDER BY rowid")
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+            for data, in rows:
+                yield json.loads(data)
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def __contains__(self, user_id: str) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM profiles WHERE user_id = ?", (user_id,)).fetchone() is not None
+
+    def close(self) -> None:
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._local = threading.local()
+        self._process_lock.close()
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats.update({
+            'path': str(self.path),
+            'size_bytes': self.path.stat().st_size if self.path.exists() else 0,
+            'synchronous': self.synchronous,
+            'generation': self._generation,
+        })
+        return stats
+
+# Backends selectable with env PROFILE_STORE
+BACKENDS = ('sqlite', 'log', 'mmap', 'json')
+
+def open_profile_store(storage_dir: Path, backend: Optional[str] = None) -> ProfileStore:
+    """
+    Open the profile store in a storage directory
+
+    Args:
+        storage_dir: Directory holding the store files
+        backend: One of BACKENDS (env PROFILE_STORE, default sqlite);
+            all but json import an existing profiles.json on first open
+    """
+    backend = backend or os.getenv('PROFILE_STORE', 'sqlite')
+    storage_dir = Path(storage_dir)
+    if backend == 'sqlite':
+        return SQLiteProfileStore(storage_dir / 'profiles.db', migrate_from=storage_dir / 'profiles.json')
+    if backend == 'log':
+        from app.profile_log import LogProfileStore
+        return LogProfileStore(storage_dir / 'profile_log', migrate_from=storage_dir / 'profiles.json')
+    if backend == 'mmap':
+        from app.profile_mmap import MmapProfileStore
+        return MmapProfileStore(storage_dir / 'profile_mmap', migrate_from=storage_dir / 'profiles.json')
+    if backend == 'json':
+        return JsonProfileStore(storage_dir / 'profiles.json')
+    raise ValueError("Unknown profile store %r. Must be one of: %s" % (backend, ', '.join(BACKENDS)))
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    """Import a storage directory's profiles.json into its SQLite store"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Migrate profiles.json to the SQLite profile store")
+    parser.add_argument('storage_dir', nargs='?', default='~/profile_data', help="Profile storage directory")
+    args = parser.parse_args(argv)
+    storage_dir = Path(args.storage_dir).expanduser()
+    store = SQLiteProfileStore(storage_dir / 'profiles.db')
+    try:
+        imported = store.migrate_json(storage_dir / 'profiles.json')
+        print("Imported %d profiles; %d stored" % (imported, len(store)))
+    finally:
+        store.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,423 @@
+"""
+Reverse Matcher module for finding every profile a single job matches.
+Compiles all profiles into column arrays once: which category keywords each
+CV holds, certification bonuses, preferences, and every skill, certification
+and experience entry as a list of relevance units over one shared unit
+vocabulary. Inverted indexes from category keywords and relevance units to
+profiles narrow a job down to the profiles that can score above what the
+job alone earns them, and only those are scored, with array operations,
+instead of running each profile's scorer over the job.
+"""
+import logging
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.job_matcher import JobMatcher, TechArtisticScorer, is_remote_job, job_currency, job_salary
+from app.job_text import JobText, JobTextCache, job_text_cache
+from app.scorer_cache import ScorerCache
+from app.taxonomy import Taxonomy, taxonomy_store
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Relevance entry kinds, with the cap TechArtisticScorer applies to each
+SKILL, CERTIFICATION, EXPERIENCE = range(3)
+RELEVANCE_CAPS = np.array([3, 2, 3], dtype=np.int64)
+
+class ReverseMatcher:
+    """Index of all profiles answering 'which users does this job match?'"""
+
+    def __init__(
+        self,
+        profiles: Iterable[Dict] = (),
+        scorer_cache: Optional[ScorerCache] = None,
+        job_texts: JobTextCache = job_text_cache,
+        source: Optional[Callable[[], Iterable[Dict]]] = None
+    ):
+        """
+        Args:
+            profiles: Profile dictionaries as stored by ProfileManager
+            scorer_cache: Where indexed profiles get their compiled CV terms
+            job_texts: Preprocessed job text cache (shared by default)
+            source: Returns every stored profile; when given, the index is
+                loaded from it on the first match instead of up front, and
+                profile_changed skips changes until then, since the source
+                already reflects them
+        """
+        self.scorer_cache = scorer_cache or ScorerCache()
+        self.job_texts = job_texts
+        self._lock = threading.RLock()
+        self._source = source
+        self._loaded = source is None
+        self._reset()
+        self.add_profiles(profiles)
+
+    def _reset(self) -> None:
+        # Profiles live in numbered slots, like jobs in JobIndex; only the
+        # compiled columns are kept, not the profile dicts
+        self._slots: Dict[str, int] = {}
+        self._user_ids: List[Optional[str]] = []
+        # CV words, as sorted ids into a shared word vocabulary, and
+        # certifications, to rederive the keyword and bonus columns when
+        # another taxonomy is swapped in
+        self._word_ids: Dict[str, int] = {}
+        self._cv_words: List[Optional[np.ndarray]] = []
+        self._certifications: List[Optional[Tuple[str, ...]]] = []
+        self._free: List[int] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._use_taxonomy(taxonomy_store.current())
+        self._min_salary = np.zeros(0, dtype=np.float64)
+        self._currency = np.zeros(0, dtype=object)
+        self._remote_only = np.zeros(0, dtype=bool)
+
+        # Shared relevance unit vocabulary, also by the hash JobText keeps
+        # of each job n-gram
+        self._unit_columns: Dict[str, int] = {}
+        self._units: List[str] = []
+        self._hash_units: Dict[int, List[int]] = {}
+        # Relevance entries: owning slot, kind and units needed, plus
+        # (entry, unit column) pairs; entries of removed profiles stay
+        # behind with slot -1 until the next compaction
+        self._entry_slot: List[int] = []
+        self._entry_kind: List[int] = []
+        self._entry_needed: List[int] = []
+        self._pair_entry: List[int] = []
+        self._pair_unit: List[int] = []
+        self._slot_entries: List[Optional[range]] = []
+        self._garbage = 0
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _use_taxonomy(self, taxonomy: Taxonomy) -> None:
+        """Compile the keyword tables of a taxonomy and clear the columns derived from it"""
+        self._taxonomy = taxonomy
+        self._keyword_matcher = taxonomy.keyword_matcher
+        keywords = self._keyword_matcher.keywords
+        categories = list(self._keyword_matcher.categories)
+        self._keyword_columns = {keyword: column for column, keyword in enumerate(keywords)}
+        self._categories = categories
+        self._membership = np.zeros((len(keywords), len(categories)), dtype=np.int64)
+        for column, category in enumerate(categories):
+            for keyword in self._keyword_matcher.categories[category]:
+                self._membership[self._keyword_columns[keyword], column] += 1
+        self._keyword_words = np.array([self._word_id(keyword) for keyword in keywords], dtype=np.int32)
+        # Slots whose CV holds each keyword, and slots with bonuses by
+        # their bonus total
+        self._keyword_slots: List[Set[int]] = [set() for _ in keywords]
+        self._bonus_slots: Dict[int, Set[int]] = {}
+        self._cv_keywords = np.zeros((len(self._alive), len(keywords)), dtype=np.int64)
+        self._bonuses = np.zeros((len(self._alive), len(categories)), dtype=np.int64)
+
+    def _fill_taxonomy_columns(self, slot: int, bonuses: Optional[Dict[str, int]] = None) -> None:
+        """Keyword and certification bonus columns of a slot under the index's taxonomy"""
+        self._cv_keywords[slot] = np.isin(self._keyword_words, self._cv_words[slot])
+        if bonuses is None:
+            bonuses = self._taxonomy.category_bonuses(self._certifications[slot])
+        self._bonuses[slot] = [bonuses.get(category, 0) for category in self._categories]
+        for column in np.flatnonzero(self._cv_keywords[slot]).tolist():
+            self._keyword_slots[column].add(slot)
+        total = int(self._bonuses[slot].sum())
+        if total:
+            self._bonus_slots.setdefault(total, set()).add(slot)
+
+    def add_profile(self, profile: Dict) -> None:
+        """Index a profile, replacing any previous version of it"""
+        with self._lock:
+            self._check_taxonomy()
+            user_id = profile['user_id']
+            self.remove_profile(user_id)
+            scorer = self.scorer_cache.get_scorer(profile)
+            preferences = profile.get('preferences') or {}
+            slot = self._free.pop() if self._free else self._grow()
+            self._slots[user_id] = slot
+            self._user_ids[slot] = user_id
+            self._cv_words[slot] = np.unique(np.array(
+                [self._word_id(word) for word in scorer.cv_keywords], dtype=np.int32))
+            self._certifications[slot] = tuple(map(sys.intern, profile['cv_data'].get('certifications', [])))
+            self._alive[slot] = True
+            # Bonuses from the index's taxonomy, which the cached scorer may predate
+            self._fill_taxonomy_columns(
+                slot, scorer.category_bonuses if scorer.taxonomy.version == self._taxonomy.version else None)
+            self._min_salary[slot] = preferences.get('min_salary') or 0
+            self._currency[slot] = preferences.get('currency', 'GBP')
+            self._remote_only[slot] = 'remote' in preferences.get('job_types', [])
+
+            first = len(self._entry_slot)
+            for kind, entries in ((SKILL, scorer.skill_units),
+                                  (CERTIFICATION, scorer.certification_tokens),
+                                  (EXPERIENCE, scorer.experience_tokens)):
+                for units in entries:
+                    entry = len(self._entry_slot)
+                    self._entry_slot.append(slot)
+                    self._entry_kind.append(kind)
+                    self._entry_needed.append(len(units))
+                    for unit in units:
+                        self._pair_entry.append(entry)
+                        self._pair_unit.append(self._unit_column(unit))
+            self._slot_entries[slot] = range(first, len(self._entry_slot))
+            self._arrays = None
+
+    def add_profiles(self, profiles: Iterable[Dict]) -> int:
+        """Index several profiles; returns how many were added"""
+        count = 0
+        for profile in profiles:
+            self.add_profile(profile)
+            count += 1
+        return count
+
+    def remove_profile(self, user_id: str) -> bool:
+        """Drop a profile from the index; returns False if it was not indexed"""
+        with self._lock:
+            slot = self._slots.pop(user_id, None)
+            if slot is None:
+                return False
+            for column in np.flatnonzero(self._cv_keywords[slot]).tolist():
+                self._keyword_slots[column].discard(slot)
+            total = int(self._bonuses[slot].sum())
+            if total:
+                self._bonus_slots[total].discard(slot)
+            self._user_ids[slot] = self._cv_words[slot] = self._certifications[slot] = None
+            self._alive[slot] = False
+            for entry in self._slot_entries[slot]:
+                self._entry_slot[entry] = -1
+            self._garbage += len(self._slot_entries[slot])
+            self._slot_entries[slot] = None
+            self._free.append(slot)
+            self._arrays = None
+            if self._garbage > len(self._entry_slot) // 2:
+                self._compact()
+            return True
+
+    def profile_changed(self, user_id: str, profile: Optional[Dict]) -> None:
+        """ProfileManager listener keeping the index current"""
+        with self._lock:
+            if not self._loaded:
+                return
+            if profile is None:
+                self.remove_profile(user_id)
+            else:
+                self.add_profile(profile)
+
+    def _load(self) -> None:
+        """Index the source's profiles on first use"""
+        if self._loaded:
+            return
+        started = time.perf_counter()
+        try:
+            count = self.add_profiles(self._source())
+        except Exception:
+            self._reset()
+            raise
+        self._loaded = True
+        logger.info("Indexed %d profiles for reverse matching in %.2fs", count, time.perf_counter() - started)
+
+    def _grow(self) -> int:
+        slot = len(self._user_ids)
+        if slot == len(self._alive):
+            capacity = max(64, 2 * slot)
+            self._alive = np.resize(self._alive, capacity)
+            self._alive[slot:] = False
+            self._cv_keywords = np.resize(self._cv_keywords, (capacity, self._cv_keywords.shape[1]))
+            self._bonuses = np.resize(self._bonuses, (capacity, self._bonuses.shape[1]))
+            self._min_salary = np.resize(self._min_salary, capacity)
+            self._currency = np.resize(self._currency, capacity)
+            self._remote_only = np.resize(self._remote_only, capacity)
+        for column in (self._user_ids, self._cv_words, self._certifications, self._slot_entries):
+            column.append(None)
+        return slot
+
+    def _word_id(self, word: str) -> int:
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self._word_ids[word] = len(self._word_ids)
+        return word_id
+
+    def _unit_column(self, unit: str) -> int:
+        column = self._unit_columns.get(unit)
+        if column is None:
+            column = self._unit_columns[unit] = len(self._units)
+            self._units.append(unit)
+            self._hash_units.setdefault(hash(unit), []).append(column)
+        return column
+
+    def _compact(self) -> None:
+        """Drop the relevance entries of removed profiles"""
+        entry_kind, entry_needed = self._entry_kind, self._entry_needed
+        pairs: Dict[int, List[int]] = {}
+        for entry, unit in zip(self._pair_entry, self._pair_unit):
+            pairs.setdefault(entry, []).append(unit)
+        self._entry_slot, self._entry_kind, self._entry_needed = [], [], []
+        self._pair_entry, self._pair_unit = [], []
+        for slot, entries in enumerate(self._slot_entries):
+            if entries is None:
+                continue
+            first = len(self._entry_slot)
+            for entry in entries:
+                for unit in pairs.get(entry, ()):
+                    self._pair_entry.append(len(self._entry_slot))
+                    self._pair_unit.append(unit)
+                self._entry_slot.append(slot)
+                self._entry_kind.append(entry_kind[entry])
+                self._entry_needed.append(entry_needed[entry])
+            self._slot_entries[slot] = range(first, len(self._entry_slot))
+        self._garbage = 0
+        self._arrays = None
+
+    def _check_taxonomy(self) -> None:
+        """Rederive the keyword and bonus columns if a new taxonomy was swapped in"""
+        taxonomy = taxonomy_store.current()
+        if taxonomy is self._taxonomy:
+            return
+        # Relevance entries do not depend on the taxonomy and are kept
+        self._use_taxonomy(taxonomy)
+        for slot in self._slots.values():
+            self._fill_taxonomy_columns(slot)
+
+    def _relevance_arrays(self) -> Dict[str, np.ndarray]:
+        """Numpy views of the relevance entries, rebuilt after index changes"""
+        if self._arrays is None:
+            entry_slot = np.array(self._entry_slot, dtype=np.intp)
+            # Removed profiles' entries land on a spare row past the last slot
+            entry_slot[entry_slot < 0] = len(self._user_ids)
+            # Postings of each unit: the entries listing it, grouped by unit
+            pair_unit = np.array(self._pair_unit, dtype=np.intp)
+            order = np.argsort(pair_unit, kind='stable')
+            self._arrays = {
+                'entry_slot': entry_slot,
+                'entry_kind': np.array(self._entry_kind, dtype=np.intp),
+                'entry_needed': np.array(self._entry_needed, dtype=np.int64),
+                'unit_entries': np.array(self._pair_entry, dtype=np.intp)[order],
+                'unit_starts': np.searchsorted(pair_unit[order], np.arange(len(self._units) + 1)),
+            }
+        return self._arrays
+
+    def _relevance(self, entry: JobText, slots: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        CV relevance of the profiles with an entry satisfied by the job
+
+        Returns:
+            (sorted slots, their relevance points); other profiles score 0
+        """
+        arrays = self._relevance_arrays()
+        starts = arrays['unit_starts']
+        postings = [arrays['unit_entries'][starts[column]:starts[column + 1]]
+                    for ngram in entry.ngrams.tolist() for column in self._hash_units.get(ngram, ())]
+        if not postings:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.int64)
+        # Units of each entry present in the job; a skill needs all of them
+        entries, counts = np.unique(np.concatenate(postings), return_counts=True)
+        kinds = arrays['entry_kind'][entries]
+        satisfied = np.where(kinds == SKILL, counts == arrays['entry_needed'][entries], True)
+        owners = arrays['entry_slot'][entries][satisfied]
+        kinds = kinds[satisfied]
+        live = owners < slots
+        keys, per_kind = np.unique(owners[live] * 3 + kinds[live], return_counts=True)
+        owners, positions = np.unique(keys // 3, return_inverse=True)
+        relevance = np.bincount(positions, weights=np.minimum(per_kind, RELEVANCE_CAPS[keys % 3]),
+                                minlength=len(owners)).astype(np.int64)
+        return owners, relevance
+
+    def match(self, job: Dict) -> List[Dict]:
+        """
+        Find every profile the job matches
+
+        A profile matches when it passes the salary and remote criteria and
+        its score reaches JobMatcher.MIN_MATCH_SCORE, exactly as
+        JobMatcher(profile).match_job(job) would decide.
+
+        Returns:
+            [{'user_id', 'score_details'}], highest total_score first
+        """
+        with self._lock:
+            self._load()
+            self._check_taxonomy()
+            slots = len(self._user_ids)
+            if not slots:
+                return []
+            entry = self.job_texts.get(job)
+            found = sorted(self._keyword_columns[keyword] for keyword in self._keyword_matcher.find(entry.text))
+            membership = self._membership[found]
+            job_points = membership.sum(axis=0)
+            relevant, relevance = self._relevance(entry, slots)
+
+            # A profile without CV hits among the job's keywords or relevance
+            # scores at most what the job alone earns plus its bonus total;
+            # when the job alone reaches the threshold every profile is a
+            # candidate
+            cap = self._taxonomy.category_cap
+            shortfall = JobMatcher.MIN_MATCH_SCORE - np.maximum(np.minimum(cap, job_points), 0).sum()
+            if shortfall <= 0:
+                rows = np.flatnonzero(self._alive[:slots])
+            else:
+                candidates = set(relevant.tolist()).union(
+                    *(self._keyword_slots[column] for column in found),
+                    *(group for total, group in self._bonus_slots.items() if total >= shortfall)
+                )
+                rows = np.fromiter(sorted(candidates), dtype=np.intp, count=len(candidates))
+
+            # Category points: job hits, CV hits among them, certification bonus
+            category_scores = np.minimum(
+                cap, job_points + self._cv_keywords[rows][:, found] @ membership + self._bonuses[rows]
+            )
+            category_scores = np.where(category_scores > 0, category_scores, 0)
+            points = np.zeros(len(rows), dtype=np.int64)
+            points[np.searchsorted(rows, relevant)] = relevance
+            relevance = points
+
+            totals = category_scores.sum(axis=1) + relevance
+            eligible = self._alive[rows] & (totals >= JobMatcher.MIN_MATCH_SCORE)
+            salary = job_salary(job)
+            if salary is not None:
+                # Minimum salaries in another currency than the job's do not apply
+                below = self._min_salary[rows] > salary
+                currency = job_currency(job)
+                if currency is not None:
+                    below &= self._currency[rows] == currency
+                eligible &= ~below
+            if not is_remote_job(job):
+                eligible &= ~self._remote_only[rows]
+
+            keywords = [self._keyword_matcher.keywords[column] for column in found]
+            matched = np.flatnonzero(eligible)
+            matches = [
+                {
+                    'user_id': self._user_ids[slot],
+                    'score_details': {
+                        'total_score': total,
+                        'category_scores': {category: score
+                                            for category, score in zip(self._categories, scores) if score > 0},
+                        'matched_keywords': list(keywords),
+                        'cv_relevance': row_relevance,
+                        'high_priority': total >= TechArtisticScorer.HIGH_PRIORITY_SCORE,
+                        'taxonomy_version': self._taxonomy.version
+                    }
+                }
+                for slot, scores, total, row_relevance in zip(
+                    rows[matched].tolist(), category_scores[matched].tolist(), totals[matched].tolist(),
+                    relevance[matched].tolist()
+                )
+            ]
+
+        matches.sort(key=lambda match: (-match['score_details']['total_score'], match['user_id']))
+        return matches
+
+    def stats(self) -> Dict[str, int]:
+        """Index size counters"""
+        with self._lock:
+            return {
+                'profiles': len(self._slots),
+                'units': len(self._units),
+                'words': len(self._word_ids),
+                'entries': len(self._entry_slot) - self._garbage,
+                'garbage_entries': self._garbage,
+            }
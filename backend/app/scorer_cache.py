@@ -0,0 +1,97 @@
+"""
+Scorer Cache module for reusing compiled per-profile scoring state.
+Keeps one TechArtisticScorer per user in a bounded LRU, keyed by the
+profile's last_updated stamp and the taxonomy version, so the CV keyword
+set, certification flags and tokenized relevance terms ProfileManager
+stored with the profile are loaded once per profile and taxonomy version
+instead of once per match request.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.job_matcher import TechArtisticScorer
+from app.taxonomy import taxonomy_store
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class ScorerCache:
+    """LRU cache of compiled scorers keyed by (user_id, last_updated, taxonomy version)"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Args:
+            max_entries: Number of profiles kept compiled
+                (env SCORER_CACHE_SIZE, default 1024)
+        """
+        self.max_entries = max_entries or int(os.getenv('SCORER_CACHE_SIZE', 1024))
+        # user_id -> ((last_updated, taxonomy version), scorer); one version per user
+        self._entries: 'OrderedDict[str, Tuple[Tuple[Optional[str], str], TechArtisticScorer]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_scorer(self, profile: Dict) -> TechArtisticScorer:
+        """
+        Return the compiled scorer for a profile, building it on a miss;
+        scorers built with an older taxonomy miss
+
+        Args:
+            profile: Profile dictionary as stored by ProfileManager
+        """
+        user_id = profile['user_id']
+        taxonomy = taxonomy_store.current()
+        version = (profile.get('last_updated'), taxonomy.version)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # Compile outside the lock; a concurrent miss only duplicates work
+        scorer = TechArtisticScorer.from_profile(profile, taxonomy)
+        with self._lock:
+            self._entries[user_id] = (version, scorer)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return scorer
+
+    def invalidate(self, user_id: str) -> bool:
+        """Drop a user's compiled scorer; returns False if none was cached"""
+        with self._lock:
+            if self._entries.pop(user_id, None) is None:
+                return False
+            self.invalidations += 1
+            return True
+
+    def clear(self) -> None:
+        """Drop every entry and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and cache occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries
+            }
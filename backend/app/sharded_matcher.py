@@ -0,0 +1,315 @@
+"""
+Sharded Matcher module for matching profiles against large job catalogs.
+Splits the catalog into shards held by long-lived worker processes, so each
+worker keeps its jobs and their preprocessed text warm between requests. A
+profile's compiled scorer is sent to each worker once and cached there; every
+request scores all shards in parallel and merges the per-shard top-k.
+"""
+import heapq
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.job_matcher import JobMatcher, TechArtisticScorer
+from app.job_record import JobRecord, as_record
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class MatchWorkerError(RuntimeError):
+    """Raised when a match worker failed or died during a request"""
+
+def _worker_main(connection, max_scorers: int) -> None:
+    """Entry point executed inside a worker process"""
+    # shard -> job id -> (sequence, job)
+    shards: Dict[int, Dict[str, Tuple[int, Dict]]] = defaultdict(dict)
+    # shard -> (jobs in catalog order, job id -> sequence), rebuilt on change
+    ordered: Dict[int, Tuple[List[Dict], Dict[str, int]]] = {}
+    scorers: 'OrderedDict[Tuple, TechArtisticScorer]' = OrderedDict()
+    while True:
+        try:
+            command, args = connection.recv()
+        except EOFError:
+            break
+        if command == 'stop':
+            break
+        try:
+            result = None
+            if command == 'put':
+                shard, items = args
+                for sequence, job in items:
+                    shards[shard][job['id']] = (sequence, job)
+                ordered.pop(shard, None)
+            elif command == 'remove':
+                shard, job_id = args
+                shards[shard].pop(job_id, None)
+                ordered.pop(shard, None)
+            elif command == 'match':
+                key, scorer, profile, k, current_status, shard_ids = args
+                if scorer is not None:
+                    scorers[key] = scorer
+                scorers.move_to_end(key)
+                while len(scorers) > max_scorers:
+                    scorers.popitem(last=False)
+                matcher = JobMatcher(profile, scorer=scorers[key])
+                result = []
+                for shard in shard_ids:
+                    if shard not in ordered:
+                        items = sorted(shards[shard].values(), key=lambda item: item[0])
+                        ordered[shard] = ([job for _, job in items],
+                                          {job['id']: sequence for sequence, job in items})
+                    jobs, sequences = ordered[shard]
+                    for match in matcher.match_jobs_top_k(jobs, k, current_status):
+                        details = match['score_details']
+                        job_id = match['job']['id']
+                        result.append((-details['total_score'], sequences[job_id], job_id, details))
+                # Only this worker's top k can reach the merged top k
+                result = heapq.nsmallest(k, result, key=lambda item: item[:2])
+            connection.send(('ok', result))
+        except Exception as e:
+            connection.send(('error', "%s: %s" % (type(e).__name__, e)))
+
+class ShardedMatcher:
+    """Job catalog sharded across persistent worker processes"""
+
+    def __init__(
+        self,
+        jobs: Optional[Iterable[Dict]] = None,
+        workers: Optional[int] = None,
+        shards: Optional[int] = None,
+        max_scorers: Optional[int] = None
+    ):
+        """
+        Args:
+            jobs: Initial catalog
+            workers: Number of worker processes (env MATCH_WORKERS, default CPU count)
+            shards: Number of catalog shards, spread round-robin over the
+                workers (env MATCH_SHARDS, default one per worker)
+            max_scorers: Compiled scorers each worker keeps
+                (env SCORER_CACHE_SIZE, default 1024)
+        """
+        self.workers = workers or int(os.getenv('MATCH_WORKERS', os.cpu_count() or 1))
+        self.shards = shards or int(os.getenv('MATCH_SHARDS', self.workers))
+        self.max_scorers = max_scorers or int(os.getenv('SCORER_CACHE_SIZE', 1024))
+        # job id -> (sequence, shard, job); the sequence fixes catalog order
+        self._jobs: Dict[str, Tuple[int, int, JobRecord]] = {}
+        self._sequence = 0
+        self._processes: List[multiprocessing.Process] = []
+        self._connections: List = []
+        # Per worker mirror of its scorer LRU, to send each scorer once
+        self._sent: List['OrderedDict[Tuple, None]'] = []
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.scorers_sent = 0
+        self.restarts = 0
+        if jobs is not None:
+            self.add_jobs(jobs)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    @property
+    def running(self) -> bool:
+        """True while the worker processes are up"""
+        return bool(self._processes)
+
+    def _worker_of(self, shard: int) -> int:
+        return shard % self.workers
+
+    def _start(self) -> None:
+        """Start the workers and hand each its shards"""
+        logger.info("Starting %d match workers for %d shards", self.workers, self.shards)
+        for _ in range(self.workers):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker_main, args=(child, self.max_scorers), daemon=True)
+            process.start()
+            child.close()
+            self._processes.append(process)
+            self._connections.append(parent)
+            self._sent.append(OrderedDict())
+        by_shard: Dict[int, List[Tuple[int, Dict]]] = defaultdict(list)
+        for sequence, shard, job in self._jobs.values():
+            by_shard[shard].append((sequence, job))
+        requests: Dict[int, List] = defaultdict(list)
+        for shard, items in by_shard.items():
+            requests[self._worker_of(shard)].append(('put', (shard, items)))
+        self._call(requests)
+
+    def _stop(self) -> None:
+        for connection, process in zip(self._connections, self._processes):
+            try:
+                connection.send(('stop', None))
+            except OSError:
+                pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            connection.close()
+        self._processes, self._connections, self._sent = [], [], []
+
+    def _call(self, requests: Dict[int, List[Tuple[str, object]]]) -> Dict[int, List]:
+        """
+        Send each worker its commands, then collect the replies, so workers
+        run in parallel
+
+        Raises:
+            MatchWorkerError: If a worker failed; dead workers are replaced
+                on the next request
+        """
+        replies: Dict[int, List] = defaultdict(list)
+        errors = []
+        try:
+            for worker, commands in requests.items():
+                for command in commands:
+                    self._connections[worker].send(command)
+            for worker, commands in requests.items():
+                for _ in commands:
+                    status, result = self._connections[worker].recv()
+                    if status == 'ok':
+                        replies[worker].append(result)
+                    else:
+                        errors.append(result)
+        except (EOFError, OSError) as e:
+            logger.error("Match worker died: %s", str(e))
+            self._stop()
+            self.restarts += 1
+            raise MatchWorkerError("Match worker died during a request, try again") from e
+        if errors:
+            raise MatchWorkerError("Match worker failed: %s" % errors[0])
+        return replies
+
+    def add_jobs(self, jobs: Iterable[Dict]) -> int:
+        """
+        Add jobs to the catalog as JobRecords; a job with a known id
+        replaces the old one and keeps its shard and catalog position
+
+        Returns:
+            Number of jobs added or replaced
+        """
+        with self._lock:
+            changed: Dict[int, List[Tuple[int, Dict]]] = defaultdict(list)
+            count = 0
+            for job in jobs:
+                job = as_record(job)
+                known = self._jobs.get(job.id)
+                if known is None:
+                    sequence = self._sequence
+                    self._sequence += 1
+                    shard = sequence % self.shards
+                else:
+                    sequence, shard, _ = known
+                self._jobs[job.id] = (sequence, shard, job)
+                changed[shard].append((sequence, job))
+                count += 1
+            if self.running:
+                requests: Dict[int, List] = defaultdict(list)
+                for shard, items in changed.items():
+                    requests[self._worker_of(shard)].append(('put', (shard, items)))
+                self._call(requests)
+            return count
+
+    def remove_job(self, job_id: str) -> bool:
+        """Drop a job from the catalog; returns False if it was not there"""
+        with self._lock:
+            known = self._jobs.pop(job_id, None)
+            if known is None:
+                return False
+            if self.running:
+                shard = known[1]
+                self._call({self._worker_of(shard): [('remove', (shard, job_id))]})
+            return True
+
+    def catalog(self) -> List[JobRecord]:
+        """The catalog in order, as a single process would match it"""
+        return [job for _, _, job in sorted(self._jobs.values(), key=lambda item: item[0])]
+
+    def match_top_k(
+        self,
+        profile: Dict,
+        k: int = 20,
+        current_status: str = 'new',
+        scorer: Optional[TechArtisticScorer] = None
+    ) -> List[Dict]:
+        """
+        Return a profile's best k matches across every shard
+
+        The result is the same as
+        JobMatcher(profile).match_jobs_top_k(self.catalog(), k).
+
+        Args:
+            profile: Profile dictionary as stored by ProfileManager
+            k: Number of matches to return
+            current_status: Status given to every match (default: 'new')
+            scorer: Precompiled tech-artistic scorer for the profile (e.g.
+                from a ScorerCache); built from the profile's stored
+                artifacts if omitted
+
+        Raises:
+            MatchWorkerError: If a worker failed during the request
+        """
+        if current_status not in JobMatcher.STATUS_OPTIONS:
+            raise ValueError("Invalid status. Must be one of: %s" % ', '.join(JobMatcher.STATUS_OPTIONS))
+        if k <= 0:
+            return []
+        scorer = scorer or TechArtisticScorer.from_profile(profile)
+        if not isinstance(scorer, TechArtisticScorer):
+            # Engines fitted on the catalog (BM25) would be fitted per shard
+            raise ValueError("Sharded matching needs a tech-artistic scorer")
+        key = (profile['user_id'], profile.get('last_updated'), scorer.taxonomy.version)
+        with self._lock:
+            if not self.running:
+                self._start()
+            requests = {}
+            for worker in range(self.workers):
+                sent = self._sent[worker]
+                payload = None if key in sent else scorer
+                sent[key] = None
+                sent.move_to_end(key)
+                while len(sent) > self.max_scorers:
+                    sent.popitem(last=False)
+                self.scorers_sent += payload is not None
+                shard_ids = [shard for shard in range(self.shards) if self._worker_of(shard) == worker]
+                requests[worker] = [('match', (key, payload, profile, k, current_status, shard_ids))]
+            try:
+                replies = self._call(requests)
+            except MatchWorkerError:
+                # The workers may not have cached the scorer; resend next time
+                for sent in self._sent:
+                    sent.pop(key, None)
+                raise
+            self.requests += 1
+            best = heapq.nsmallest(
+                k, (item for results in replies.values() for item in results[0]), key=lambda item: item[:2]
+            )
+            jobs = [self._jobs[job_id][2] for _, _, job_id, _ in best]
+        matcher = JobMatcher(profile, scorer=scorer)
+        return [matcher._build_match(job, item[3], current_status) for job, item in zip(jobs, best)]
+
+    def stats(self) -> Dict:
+        """Catalog, worker and request counters"""
+        with self._lock:
+            sizes = [0] * self.shards
+            for _, shard, _ in self._jobs.values():
+                sizes[shard] += 1
+            return {
+                'jobs': len(self._jobs),
+                'workers': self.workers,
+                'shards': self.shards,
+                'shard_sizes': sizes,
+                'running': self.running,
+                'requests': self.requests,
+                'scorers_sent': self.scorers_sent,
+                'restarts': self.restarts,
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes; the next request starts them again"""
+        with self._lock:
+            self._stop()
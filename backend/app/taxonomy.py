@@ -0,0 +1,214 @@
+"""
+Taxonomy module for the keyword categories behind tech-artistic scoring.
+The categories, their keywords, the per-category cap and the certification
+bonuses are read from a JSON file and compiled into an immutable, versioned
+Taxonomy snapshot. TaxonomyStore holds the current snapshot and swaps in a
+new one when the file changes, without a restart; a scorer keeps the
+snapshot it was built with, so scoring in flight sees one consistent
+taxonomy, and the version recorded in every score_details tells which
+taxonomy produced a score.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from app.keyword_matcher import KeywordMatcher
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAXONOMY_PATH = Path(__file__).with_name('taxonomy.json')
+
+class TaxonomyError(ValueError):
+    """Raised when a taxonomy file is missing or malformed"""
+
+class Taxonomy:
+    """Compiled, read-only keyword taxonomy"""
+
+    def __init__(
+        self,
+        categories: Dict[str, List[str]],
+        category_cap: int = 4,
+        certification_bonuses: Optional[Dict[str, Dict[str, int]]] = None
+    ):
+        """
+        Args:
+            categories: Category name -> keywords, matched as lowercase
+                substrings of the job text
+            category_cap: Maximum points per category
+            certification_bonuses: Category -> {term: points}; a CV earns
+                the points when one of its certifications contains the term
+
+        Raises:
+            TaxonomyError: If any part is malformed
+        """
+        if not isinstance(categories, dict) or not categories:
+            raise TaxonomyError("categories must be a non-empty object of category -> keywords")
+        for category, keywords in categories.items():
+            if not isinstance(keywords, list) or not all(isinstance(keyword, str) for keyword in keywords):
+                raise TaxonomyError("keywords of category %r must be a list of strings" % category)
+        if not isinstance(category_cap, int) or category_cap <= 0:
+            raise TaxonomyError("category_cap must be a positive integer")
+        certification_bonuses = certification_bonuses or {}
+        for category, terms in certification_bonuses.items():
+            if category not in categories:
+                raise TaxonomyError("certification bonus for unknown category %r" % category)
+            if not isinstance(terms, dict) or not all(
+                    isinstance(term, str) and isinstance(points, int) and points >= 0
+                    for term, points in terms.items()):
+                raise TaxonomyError("bonuses of category %r must map terms to non-negative integers" % category)
+        self.categories = {category: [keyword.lower() for keyword in keywords]
+                           for category, keywords in categories.items()}
+        self.category_cap = category_cap
+        self.certification_bonuses = {category: {term.lower(): points for term, points in terms.items()}
+                                      for category, terms in certification_bonuses.items()}
+        canonical = json.dumps(self.to_dict(), sort_keys=True, separators=(',', ':'))
+        # Content hash, so any change to the taxonomy changes the version
+        self.version = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+        self.keyword_matcher = KeywordMatcher(self.categories)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Taxonomy':
+        """Compile a taxonomy from its JSON form"""
+        if not isinstance(data, dict):
+            raise TaxonomyError("taxonomy must be a JSON object")
+        return cls(data.get('categories'), data.get('category_cap', 4), data.get('certification_bonuses'))
+
+    @classmethod
+    def load(cls, path: Path) -> 'Taxonomy':
+        """
+        Read and compile a taxonomy file
+
+        Raises:
+            TaxonomyError: If the file cannot be read or is malformed
+        """
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise TaxonomyError("Cannot read taxonomy %s: %s" % (path, e)) from e
+        return cls.from_dict(data)
+
+    def to_dict(self) -> Dict:
+        """The taxonomy in its JSON form"""
+        return {
+            'categories': self.categories,
+            'category_cap': self.category_cap,
+            'certification_bonuses': self.certification_bonuses,
+        }
+
+    def category_bonuses(self, certifications: Iterable[str]) -> Dict[str, int]:
+        """Bonus points per category earned by a CV's certifications"""
+        certifications = [cert.lower() for cert in certifications]
+        return {
+            category: sum(points for term, points in terms.items()
+                          if any(term in cert for cert in certifications))
+            for category, terms in self.certification_bonuses.items()
+        }
+
+class TaxonomyStore:
+    """Holds the current taxonomy and hot-reloads it when its file changes"""
+
+    def __init__(self, path: Optional[str] = None, reload_interval: Optional[float] = None):
+        """
+        Args:
+            path: Taxonomy JSON file (env TAXONOMY_PATH, default
+                app/taxonomy.json)
+            reload_interval: Seconds between checks of the file's
+                modification time (env TAXONOMY_RELOAD_SECONDS, default 5;
+                0 checks on every access)
+
+        Raises:
+            TaxonomyError: If the initial taxonomy cannot be loaded
+        """
+        self.path = Path(path or os.getenv('TAXONOMY_PATH') or DEFAULT_TAXONOMY_PATH)
+        self.reload_interval = (reload_interval if reload_interval is not None
+                                else float(os.getenv('TAXONOMY_RELOAD_SECONDS', 5)))
+        self._lock = threading.Lock()
+        self._mtime = self._file_mtime()
+        self._checked = time.monotonic()
+        self._current = Taxonomy.load(self.path)
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error: Optional[str] = None
+        logger.info("Loaded taxonomy %s from %s", self._current.version, self.path)
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def current(self) -> Taxonomy:
+        """The current snapshot, reloading first if the file changed"""
+        if time.monotonic() - self._checked >= self.reload_interval:
+            self.reload()
+        return self._current
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Reload the file if it changed since the last load (or always, with
+        force); a malformed file is logged and the current taxonomy kept
+
+        Returns:
+            True if a new taxonomy version was swapped in
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            mtime = self._file_mtime()
+            if not force and mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            try:
+                taxonomy = Taxonomy.load(self.path)
+            except TaxonomyError as e:
+                self.failed_reloads += 1
+                self.last_error = str(e)
+                logger.error("Keeping taxonomy %s: %s", self._current.version, str(e))
+                return False
+        return self.replace(taxonomy)
+
+    def replace(self, taxonomy: Taxonomy) -> bool:
+        """
+        Swap in a compiled taxonomy
+
+        Returns:
+            True if its version differs from the current one
+        """
+        with self._lock:
+            if taxonomy.version == self._current.version:
+                return False
+            # A single reference swap: readers see the old or the new snapshot
+            previous, self._current = self._current, taxonomy
+            self.reloads += 1
+        logger.info("Taxonomy %s replaced by %s", previous.version, taxonomy.version)
+        return True
+
+    def is_current(self, score_details: Dict) -> bool:
+        """True if score details were produced with the current taxonomy"""
+        return score_details.get('taxonomy_version') == self.current().version
+
+    def stats(self) -> Dict:
+        """Current version and reload counters"""
+        taxonomy = self._current
+        return {
+            'version': taxonomy.version,
+            'path': str(self.path),
+            'categories': len(taxonomy.categories),
+            'keywords': len(taxonomy.keyword_matcher.keywords),
+            'reloads': self.reloads,
+            'failed_reloads': self.failed_reloads,
+            'last_error': self.last_error,
+        }
+
+# Shared by every scorer in the process
+taxonomy_store = TaxonomyStore()
@@ -0,0 +1,255 @@
+"""
+Text Scan module for finding keywords and word n-grams in many job texts
+at once. The texts are joined into one byte array and every needle is
+located with array operations over it: candidate positions come from a
+table of the needles' first two bytes and are narrowed one byte at a time.
+Keywords keep the substring semantics of `keyword in text`; units keep the
+word n-gram semantics of JobText (tokens as found by job_text._TOKEN).
+Only ASCII texts are scanned, since a byte is then a character and \\w is
+[0-9A-Za-z_]; callers handle the others per text.
+"""
+import logging
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from app.job_text import NGRAM_MAX
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Byte classes of job_text._TOKEN for ASCII text: a token is a \w followed
+# by any run of \w, '+' and '#'
+_WORD = np.zeros(256, dtype=bool)
+for _char in b'0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_':
+    _WORD[_char] = True
+_TOKEN_CHAR = _WORD.copy()
+_TOKEN_CHAR[[ord('+'), ord('#')]] = True
+_MARK = _TOKEN_CHAR & ~_WORD
+
+# Bytes between two words stepped over one at a time before falling back
+# to a search of every word character in the batch
+GAP_STEPS = 4
+
+class TextScanner:
+    """Compiled keyword and n-gram unit search over batches of ASCII texts"""
+
+    def __init__(self, keywords: Sequence[str], units: Sequence[str]):
+        """
+        Args:
+            keywords: Substrings; column i of a scan is keywords[i]
+            units: Word n-grams of up to NGRAM_MAX words joined by single
+                spaces, as from job_text.phrase_units; column
+                len(keywords) + j is units[j]
+        """
+        self.keywords = list(keywords)
+        self.units = list(units)
+        # Needles are the keywords followed by the distinct unit words;
+        # only ASCII needles can occur in the texts scanned
+        words: Dict[str, int] = {}
+        for unit in self.units:
+            for word in unit.split(' '):
+                words.setdefault(word, len(words))
+        self._word_count = len(words)
+        needles = [(needle.encode('ascii'), column)
+                   for column, needle in enumerate(self.keywords + list(words))
+                   if needle and needle.isascii()]
+        self._longest = max((len(needle) for needle, _ in needles), default=0)
+        self._single_bytes = [(needle, column) for needle, column in needles if len(needle) == 1]
+        # Longer needles are grouped by their first two bytes, read as a
+        # little-endian pair; the rest of each is compared eight bytes at a time
+        groups: Dict[int, Dict[bytes, List[int]]] = {}
+        for needle, column in needles:
+            if len(needle) > 1:
+                groups.setdefault(needle[0] | needle[1] << 8, {}).setdefault(needle, []).append(column)
+        self._pairs = np.array(sorted(groups), dtype=np.uint16)
+        self._groups = [
+            [(needle, columns, [(offset, np.uint64((1 << 8 * len(needle[offset:offset + 8])) - 1),
+                                 np.uint64(int.from_bytes(needle[offset:offset + 8], 'little')))
+                                for offset in range(2, len(needle), 8)])
+             for needle, columns in groups[pair].items()]
+            for pair in sorted(groups)
+        ]
+        self._pair_table = np.zeros(1 << 16, dtype=bool)
+        self._pair_table[self._pairs] = True
+        self._pair_groups = np.zeros(1 << 16, dtype=np.int32)
+        self._pair_groups[self._pairs] = np.arange(len(self._pairs))
+        self._group_type = np.uint8 if len(self._pairs) <= 256 else np.uint16
+        # Third bytes that continue some needle of each group; any byte
+        # does when a needle of the group is just the pair
+        self._third_table = np.zeros((len(self._pairs), 256), dtype=bool)
+        for group, pair in enumerate(sorted(groups)):
+            for needle in groups[pair]:
+                if len(needle) == 2:
+                    self._third_table[group] = True
+                else:
+                    self._third_table[group, needle[2]] = True
+        self._third_table = self._third_table.ravel()
+        self._crosses_texts = any(b'\n' in needle for needle, _ in needles)
+
+        # Single-word units are looked up by word id; longer ones as codes
+        # over the ids + 1 of their words, so a 0 never matches
+        base = self._word_count + 1
+        self._word_units = np.full(self._word_count, -1, dtype=np.int64)
+        self._in_phrase = np.zeros(self._word_count, dtype=bool)
+        codes, columns = [], []
+        for column, unit in enumerate(self.units, start=len(self.keywords)):
+            parts = unit.split(' ')
+            if len(parts) == 1:
+                self._word_units[words[unit]] = column
+                continue
+            if len(parts) > NGRAM_MAX or not all(part.isascii() for part in parts):
+                continue
+            code = 0
+            for part in parts:
+                code = code * base + words[part] + 1
+                self._in_phrase[words[part]] = True
+            codes.append(code)
+            columns.append(column)
+        order = np.argsort(codes, kind='stable')
+        self._phrase_codes = np.array(codes, dtype=np.int64)[order]
+        self._phrase_columns = np.array(columns, dtype=np.int64)[order]
+
+    def scan(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find every keyword and unit in each text
+
+        Args:
+            texts: ASCII texts (str.isascii()); others give wrong results
+
+        Returns:
+            (rows, columns) of every hit, possibly repeated: texts[row]
+            contains keywords[column], or has units[column - len(keywords)]
+            among its word n-grams
+        """
+        # A separator byte before, between and after the texts, so no token
+        # runs from one text into the next, and padding so every needle
+        # comparison stays in bounds
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        ends = np.cumsum(lengths + 1)
+        joined = '\n' + '\n'.join(texts) + '\n' * (self._longest + 8)
+        data = np.frombuffer(joined.encode('ascii'), dtype=np.uint8)
+        row_of = np.repeat(np.arange(len(texts), dtype=np.int32), lengths + 1)
+        row_of = np.concatenate([row_of[:1], row_of, np.full(self._longest + 7, len(texts) - 1, dtype=np.int32)])
+
+        found = list(self._occurrences(data))
+        if not found:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        counts = [len(positions) for positions, _, _ in found]
+        positions = np.concatenate([positions for positions, _, _ in found])
+        sizes = np.repeat(np.array([len(needle) for _, needle, _ in found], dtype=np.int64), counts)
+        columns = np.repeat(np.array([column for _, _, column in found], dtype=np.int64), counts)
+        rows = row_of[positions]
+        if self._crosses_texts:
+            # A needle containing the separator could start in one or span two
+            inside = np.flatnonzero((positions > ends[rows] - lengths[rows] - 1) & (positions + sizes <= ends[rows]))
+            positions, sizes, columns, rows = positions[inside], sizes[inside], columns[inside], rows[inside]
+
+        keyword = columns < len(self.keywords)
+        found_rows, found_columns = [rows[keyword]], [columns[keyword]]
+        # A unit word must be a whole token: it ends a run of token
+        # characters, and only '+' or '#' precede it within its run
+        words = np.flatnonzero(~keyword)
+        positions, sizes, rows = positions[words], sizes[words], rows[words]
+        ids = columns[words] - len(self.keywords)
+        whole = ~_TOKEN_CHAR[data[positions + sizes]]
+        before = positions - 1
+        marked = np.flatnonzero(_MARK[data[before]])
+        while len(marked):
+            before[marked] -= 1
+            marked = marked[_MARK[data[before[marked]]]]
+        whole = np.flatnonzero(whole & ~_WORD[data[before]])
+        positions, sizes, rows, ids = positions[whole], sizes[whole], rows[whole], ids[whole]
+
+        unit_columns = self._word_units[ids]
+        single = unit_columns >= 0
+        found_rows.append(rows[single])
+        found_columns.append(unit_columns[single])
+        phrase = np.flatnonzero(self._in_phrase[ids])
+        if len(phrase):
+            phrase_rows, phrase_columns = self._phrase_hits(
+                data, ends, positions[phrase], sizes[phrase], rows[phrase], ids[phrase])
+            found_rows.append(phrase_rows)
+            found_columns.append(phrase_columns)
+        return np.concatenate(found_rows), np.concatenate(found_columns)
+
+    def _occurrences(self, data: np.ndarray) -> Iterator[Tuple[np.ndarray, bytes, int]]:
+        """Yield (start positions, needle, column) for each needle found in data"""
+        for needle, column in self._single_bytes:
+            yield np.flatnonzero(data == needle[0]), needle, column
+        if not self._groups:
+            return
+        # Candidates: positions whose first two bytes start some needle,
+        # taken at even and at odd offsets, then whose third byte continues one
+        even = data[:len(data) - len(data) % 2].view('<u2')
+        odd = data[1:len(data) - (len(data) - 1) % 2].view('<u2')
+        even_hits = np.flatnonzero(np.take(self._pair_table, even))
+        odd_hits = np.flatnonzero(np.take(self._pair_table, odd))
+        candidates = np.concatenate([even_hits * 2, odd_hits * 2 + 1])
+        groups = np.take(self._pair_groups, np.concatenate([even[even_hits], odd[odd_hits]]))
+        keep = np.flatnonzero(np.take(self._third_table, groups * 256 + data[candidates + 2]))
+        candidates, groups = candidates[keep], groups[keep]
+        # Grouped by their first two bytes; a stable sort of small integers
+        # is a radix sort
+        candidates = candidates[np.argsort(groups.astype(self._group_type), kind='stable')]
+        highs = np.cumsum(np.bincount(groups, minlength=len(self._groups))).tolist()
+        lows = [0] + highs[:-1]
+        # Eight bytes starting at every offset, overlapping
+        blocks = np.ndarray(shape=(len(data) - 7,), dtype='<u8', buffer=data, strides=(1,))
+        for group, low, high in zip(self._groups, lows, highs):
+            if low == high:
+                continue
+            # The block after the pair is read once for the whole group
+            starting = candidates[low:high]
+            following = blocks[starting + 2]
+            for needle, columns, needle_blocks in group:
+                positions = starting
+                for index, (offset, mask, target) in enumerate(needle_blocks):
+                    values = following if index == 0 else blocks[positions + offset]
+                    positions = positions[values & mask == target]
+                for column in columns:
+                    yield positions, needle, column
+
+    def _phrase_hits(self, data: np.ndarray, ends: np.ndarray, positions: np.ndarray, sizes: np.ndarray,
+                     rows: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (rows, columns) of the multi-word units formed by consecutive tokens,
+        given the position, length, row and word id of each word token
+        """
+        order = np.argsort(positions, kind='stable')
+        positions, sizes, rows, ids = positions[order], sizes[order], rows[order], ids[order]
+
+        # The token after one ending at e starts at the first \w at or after
+        # e, since everything between two tokens is non-\w; it is the next
+        # word of this text if it starts before the text's end
+        following = positions + sizes
+        gap = np.flatnonzero(~_WORD[data[following]])
+        for _ in range(GAP_STEPS):
+            if not len(gap):
+                break
+            following[gap] += 1
+            gap = gap[~_WORD[data[following[gap]]] & (following[gap] < ends[rows[gap]])]
+        if len(gap):
+            word_starts = np.append(np.flatnonzero(_WORD[data]), len(data))
+            following[gap] = word_starts[np.searchsorted(word_starts, following[gap])]
+        slots = np.minimum(np.searchsorted(positions, following), len(positions) - 1)
+        next_slot = np.where((positions[slots] == following) & (following < ends[rows]), slots, -1)
+
+        base = self._word_count + 1
+        codes = ids + 1
+        slot = np.arange(len(positions))
+        all_rows, all_codes = [], []
+        for _ in range(NGRAM_MAX - 1):
+            keep = next_slot[slot] >= 0
+            slot, rows, codes = next_slot[slot[keep]], rows[keep], codes[keep]
+            codes = codes * base + ids[slot] + 1
+            all_rows.append(rows)
+            all_codes.append(codes)
+        rows, codes = np.concatenate(all_rows), np.concatenate(all_codes)
+        slots = np.minimum(np.searchsorted(self._phrase_codes, codes), len(self._phrase_codes) - 1)
+        matched = self._phrase_codes[slots] == codes
+        return rows[matched], self._phrase_columns[slots[matched]]
@@ -0,0 +1,163 @@
+"""
+Upload Limits module for bounding CV upload size and validating content.
+Provides an ASGI middleware that enforces a request body limit while bytes
+arrive, the only check made before the body is received, and a helper that
+reads a received UploadFile in chunks with a per-file size limit and a
+magic-byte check on the first chunk.
+"""
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Tuple
+
+from fastapi import UploadFile
+
+from app.cv_parser import CVParseError
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_BYTES = 64 * 1024
+# Multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+# Leading bytes of each accepted format (.docx is a zip container, .doc is OLE2)
+MAGIC_BYTES = {
+    '.pdf': (b'%PDF-',),
+    '.docx': (b'PK\x03\x04',),
+    '.doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+}
+
+class UploadTooLarge(CVParseError):
+    """Raised when an upload exceeds the configured size limit"""
+
+class InvalidUploadContent(CVParseError):
+    """Raised when the file content does not match its extension"""
+
+def check_magic(first_chunk: bytes, suffix: str) -> None:
+    """
+    Verify the leading bytes match the file extension
+
+    Raises:
+        InvalidUploadContent: If the content is not a PDF/DOCX as claimed
+    """
+    signatures = MAGIC_BYTES.get(suffix.lower())
+    if signatures is None:
+        raise InvalidUploadContent("Unsupported file format: %s" % suffix)
+    if not any(first_chunk.startswith(signature) for signature in signatures):
+        raise InvalidUploadContent("File content does not look like a %s document" % suffix)
+
+async def read_upload(upload: UploadFile, max_bytes: int) -> Tuple[bytes, str]:
+    """
+    Read an upload into memory in fixed-size chunks
+
+    By the time the endpoint runs, Starlette has received the multipart
+    body and spooled the file; the magic bytes are checked on the first
+    chunk, before the rest is read from that spool, and the size limit is
+    enforced chunk by chunk, so a rejected file is never loaded whole.
+
+    Args:
+        upload: File received by the endpoint
+        max_bytes: Largest accepted file size
+
+    Returns:
+        (content, sha256 hex digest)
+
+    Raises:
+        InvalidUploadContent: If the content does not match the extension
+        UploadTooLarge: If the file is larger than max_bytes
+    """
+    suffix = Path(upload.filename or "").suffix
+    digest = hashlib.sha256()
+    chunks = []
+    size = 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        if size == 0:
+            check_magic(chunk, suffix)
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge("File exceeds the %d byte upload limit" % max_bytes)
+        digest.update(chunk)
+        chunks.append(chunk)
+    if size == 0:
+        raise InvalidUploadContent("Uploaded file is empty")
+    return b''.join(chunks), digest.hexdigest()
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware rejecting request bodies over a per-path byte limit.
+    The declared Content-Length is checked up front and the received bytes
+    are counted as they arrive, so oversized bodies are cut off early.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        """
+        Args:
+            app: Wrapped ASGI application
+            limits: Maximum request body size in bytes, by request path
+        """
+        self.app = app
+        self.limits = limits
+
+    async def _reject(self, send, limit: int) -> None:
+        body = json.dumps({"detail": "Request body exceeds the %d byte limit" % limit}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 413,
+            'headers': [(b'content-type', b'application/json'),
+                        (b'content-length', str(len(body)).encode())],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get('path')) if scope['type'] == 'http' else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get('headers', []):
+            if name == b'content-length' and value.isdigit() and int(value) > limit:
+                logger.warning("Rejected %s upload declaring %s bytes", scope['path'], value.decode())
+                await self._reject(send, limit)
+                return
+
+        state = {'received': 0, 'exceeded': False, 'replaced': False}
+
+        async def limited_receive():
+            if state['exceeded']:
+                # Stop reading: the client gets a 413 as soon as the app responds
+                return {'type': 'http.disconnect'}
+            message = await receive()
+            if message['type'] == 'http.request':
+                state['received'] += len(message.get('body', b''))
+                if state['received'] > limit:
+                    state['exceeded'] = True
+                    logger.warning("Upload to %s exceeded %d bytes while streaming", scope['path'], limit)
+                    return {'type': 'http.disconnect'}
+            return message
+
+        async def limited_send(message):
+            # Whatever the app answers after an overflow becomes a 413
+            if state['exceeded']:
+                if not state['replaced'] and message['type'] == 'http.response.start':
+                    state['replaced'] = True
+                    await self._reject(send, limit)
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except Exception:
+            if not state['exceeded']:
+                raise
+            if not state['replaced']:
+                state['replaced'] = True
+                await self._reject(send, limit)
@@ -0,0 +1,192 @@
+"""
+Benchmark suite for the CV parsing pipeline.
+
+Generates synthetic PDF and DOCX CVs, measures CVParser.parse_cv latency
+percentiles, peak RSS and lines per second for each case, writes the
+results as JSON and optionally fails when a run regresses against a
+previous results file.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cv_parser --output results.json
+    python -m benchmarks.bench_cv_parser --baseline results.json --threshold 0.2
+"""
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.synthetic_cv import LAYOUTS, generate_cv
+
+DEFAULT_PAGES = [1, 5, 20, 50, 200]
+DEFAULT_FORMATS = ['pdf', 'docx']
+DEFAULT_LAYOUTS = ['classic', 'numbered']
+
+def _percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+def _max_rss_mb() -> float:
+    """Peak resident set size of this process in MiB (ru_maxrss is KiB on Linux)"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+def run_case(fmt: str, pages: int, layout: str, repeat: int, warmup: int, tolerant: bool) -> Dict:
+    """
+    Measure one (format, pages, layout) case. Runs in a fresh process so
+    peak RSS belongs to this case alone.
+    """
+    from app.cv_parser import CVParser, ParseLimits
+    logging.getLogger('app.cv_parser').setLevel(logging.WARNING)
+
+    content = generate_cv(fmt, pages, layout)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / ("cv.%s" % fmt)
+        path.write_bytes(content)
+        # Limits off: the suite measures full documents
+        parser = CVParser(limits=ParseLimits(0, 0, 0), page_workers=0, tolerant_headers=tolerant)
+        for _ in range(warmup):
+            parser.parse_cv(path)
+        rss_before = _max_rss_mb()
+        samples = []
+        lines = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = parser.parse_cv(path)
+            samples.append(time.perf_counter() - started)
+            lines = len(result['raw_text'])
+        rss_after = _max_rss_mb()
+
+    median = statistics.median(samples)
+    return {
+        'name': "%s-%dp-%s" % (fmt, pages, layout),
+        'format': fmt,
+        'pages': pages,
+        'layout': layout,
+        'bytes': len(content),
+        'lines': lines,
+        'repeat': repeat,
+        'latency_ms': {
+            'min': round(min(samples) * 1000, 3),
+            'p50': round(median * 1000, 3),
+            'p90': round(_percentile(samples, 90) * 1000, 3),
+            'p99': round(_percentile(samples, 99) * 1000, 3),
+            'max': round(max(samples) * 1000, 3),
+        },
+        'lines_per_second': round(lines / median, 1) if median else 0.0,
+        'peak_rss_mb': round(rss_after, 1),
+        'parse_rss_growth_mb': round(rss_after - rss_before, 1),
+    }
+
+def run_suite(formats: List[str], pages: List[int], layouts: List[str],
+              repeat: int, warmup: int, tolerant: bool) -> Dict:
+    """Run every case, each in its own short-lived process"""
+    context = multiprocessing.get_context('spawn')
+    cases = []
+    for fmt in formats:
+        for page_count in pages:
+            for layout in layouts:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    # Fewer repeats for the largest documents keeps the suite quick
+                    runs = max(3, repeat // max(1, page_count // 20))
+                    case = executor.submit(run_case, fmt, page_count, layout,
+                                           runs, warmup, tolerant).result()
+                print("%-22s p50 %9.2f ms  p99 %9.2f ms  %10.0f lines/s  rss %6.1f MiB" % (
+                    case['name'], case['latency_ms']['p50'], case['latency_ms']['p99'],
+                    case['lines_per_second'], case['peak_rss_mb']), file=sys.stderr)
+                cases.append(case)
+    return {
+        'suite': 'cv_parser',
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {'repeat': repeat, 'warmup': warmup, 'tolerant_headers': tolerant},
+        'cases': cases,
+    }
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Compare two result files case by case
+
+    Returns:
+        Descriptions of every case whose p50 latency grew, or whose lines/s
+        or peak RSS got worse, by more than threshold (a fraction, 0.2 = 20%)
+    """
+    previous = {case['name']: case for case in baseline.get('cases', [])}
+    regressions = []
+    for case in current['cases']:
+        old = previous.get(case['name'])
+        if old is None:
+            continue
+        checks = [
+            ('p50 latency', old['latency_ms']['p50'], case['latency_ms']['p50'], True),
+            ('lines/s', old['lines_per_second'], case['lines_per_second'], False),
+            ('peak RSS', old['peak_rss_mb'], case['peak_rss_mb'], True),
+        ]
+        for label, before, after, lower_is_better in checks:
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = change > threshold if lower_is_better else -change > threshold
+            if worse:
+                regressions.append("%s: %s %.2f -> %.2f (%+.0f%%)" % (
+                    case['name'], label, before, after, change * 100))
+    return regressions
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(',') if item]
+
+def _str_list(value: str) -> List[str]:
+    return [item for item in value.split(',') if item]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark the CV parsing pipeline")
+    parser.add_argument('--pages', type=_int_list, default=DEFAULT_PAGES,
+                        help="Comma separated page counts (default: 1,5,20,50,200)")
+    parser.add_argument('--formats', type=_str_list, default=DEFAULT_FORMATS,
+                        help="Comma separated formats: pdf,docx")
+    parser.add_argument('--layouts', type=_str_list, default=DEFAULT_LAYOUTS,
+                        help="Comma separated layouts: %s" % ','.join(LAYOUTS))
+    parser.add_argument('--repeat', type=int, default=20, help="Timed runs per small case")
+    parser.add_argument('--warmup', type=int, default=2, help="Untimed runs per case")
+    parser.add_argument('--tolerant-headers', action='store_true', help="Enable tolerant header matching")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    parser.add_argument('--baseline', help="Previous results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Allowed relative regression before failing (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.formats, args.pages, args.layouts,
+                        args.repeat, args.warmup, args.tolerant_headers)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print("REGRESSION %s" % regression, file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions beyond %.0f%%" % (args.threshold * 100), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Benchmark and accuracy check for near-duplicate job detection.
+
+Indexes a synthetic catalog plus edited re-posts of its jobs with
+JobDeduplicator, measures how many duplicate pairs at or above the threshold
+clearly above the threshold (by exact shingle Jaccard similarity) share a
+cluster, how many clustered pairs fall clearly below it, and checks the index
+after removals. Pairs within the margin of the threshold go either way, as
+the signatures only estimate similarity. Reports
+ingestion throughput and the scoring work saved by matching only one job per
+cluster.
+
+Usage (from backend/):
+    python -m benchmarks.bench_job_dedup --jobs 20000 --duplicates 5000 --output results.json
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Dict, List, Optional
+
+from app.job_dedup import JobDeduplicator, dedup_text, shingle_hashes
+from app.job_matcher import JobMatcher
+from benchmarks.synthetic_jobs import generate_jobs, generate_near_duplicates, generate_profiles
+
+def jaccard(first: Dict, second: Dict) -> float:
+    """Exact Jaccard similarity of two jobs' shingle sets"""
+    a = set(shingle_hashes(dedup_text(first)).tolist())
+    b = set(shingle_hashes(dedup_text(second)).tolist())
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def check_clusters(deduplicator: JobDeduplicator, jobs: Dict[str, Dict], duplicates: List[Dict],
+                   margin: float) -> Dict:
+    """
+    Recall over (original, re-post) pairs more than margin above the
+    threshold, and clustered pairs more than margin below it
+    """
+    found = missed = 0
+    for duplicate in duplicates:
+        original = jobs[duplicate['id'].rsplit('-dup-', 1)[0]]
+        if jaccard(original, duplicate) < deduplicator.threshold + margin:
+            continue
+        if deduplicator.cluster_of(original['id']) == deduplicator.cluster_of(duplicate['id']):
+            found += 1
+        else:
+            missed += 1
+    false_merges = 0
+    clusters = {deduplicator.cluster_of(job_id) for job_id in jobs}
+    for cluster in clusters:
+        representative, *others = deduplicator.members(cluster)
+        for member in others:
+            if jaccard(jobs[representative], jobs[member]) < deduplicator.threshold - margin:
+                false_merges += 1
+    return {
+        'pairs_above_margin': found + missed,
+        'recall': round(found / max(found + missed, 1), 4),
+        'false_merges': false_merges,
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark and check near-duplicate job detection")
+    parser.add_argument('--jobs', type=int, default=10000, help="Synthetic catalog size")
+    parser.add_argument('--duplicates', type=int, default=3000, help="Edited re-posts added to the catalog")
+    parser.add_argument('--edits', type=float, default=0.03, help="Share of description words edited")
+    parser.add_argument('--threshold', type=float, help="Similarity threshold (default JOB_DEDUP_THRESHOLD)")
+    parser.add_argument('--min-recall', type=float, default=0.95, help="Fail below this recall")
+    parser.add_argument('--margin', type=float, default=0.1,
+                        help="Similarity distance from the threshold within which pairs are not judged")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    originals = generate_jobs(args.jobs)
+    duplicates = generate_near_duplicates(originals, args.duplicates, edits=args.edits)
+    catalog = originals + duplicates
+    jobs = {job['id']: job for job in catalog}
+
+    deduplicator = JobDeduplicator(threshold=args.threshold)
+    started = time.perf_counter()
+    deduplicator.add_jobs(catalog)
+    ingest_seconds = time.perf_counter() - started
+    accuracy = check_clusters(deduplicator, jobs, duplicates, args.margin)
+
+    # Removing the re-posts must leave one cluster per original job
+    for duplicate in duplicates:
+        deduplicator.remove_job(duplicate['id'])
+    clusters = {deduplicator.cluster_of(job['id']) for job in originals}
+    removed_ok = len(clusters) == len(originals) == deduplicator.stats()['clusters']
+    deduplicator.add_jobs(duplicates)
+
+    matcher = JobMatcher(generate_profiles(1)[0])
+    matcher.match_jobs(catalog)  # Warm the shared job text cache
+    started = time.perf_counter()
+    matcher.match_jobs(catalog)
+    all_ms = (time.perf_counter() - started) * 1000
+    representatives = deduplicator.unique(catalog)
+    started = time.perf_counter()
+    matcher.match_jobs(representatives)
+    representatives_ms = (time.perf_counter() - started) * 1000
+
+    failures = []
+    if accuracy['recall'] < args.min_recall:
+        failures.append("recall %.4f below %.4f" % (accuracy['recall'], args.min_recall))
+    if accuracy['false_merges']:
+        failures.append("%d clustered pairs below the threshold margin" % accuracy['false_merges'])
+    if not removed_ok:
+        failures.append("clusters left over after removing the re-posts")
+    for failure in failures:
+        print("FAILED %s" % failure, file=sys.stderr)
+
+    results = {
+        'suite': 'job_dedup',
+        'jobs': len(catalog),
+        'duplicates_added': args.duplicates,
+        'stats': deduplicator.stats(),
+        'accuracy': accuracy,
+        'jobs_per_second': round(len(catalog) / ingest_seconds),
+        'representatives': len(representatives),
+        'match_all_ms': round(all_ms, 1),
+        'match_representatives_ms': round(representatives_ms, 1),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
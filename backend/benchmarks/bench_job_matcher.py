@@ -0,0 +1,120 @@
+"""
+Throughput benchmark for job scoring.
+
+Reports jobs scored per second by the per-job and batch paths of the
+tech-artistic scorer, top-k latency with and without a JobIndex, BM25 fit
+and scoring time, and ReverseMatcher latency against a loop of match_job
+calls. Correctness of these paths is covered by tests/test_job_matcher.py.
+
+Usage (from backend/):
+    python -m benchmarks.bench_job_matcher --jobs 20000 --output results.json
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.bm25_engine import BM25Index, BM25Scorer
+from app.job_index import JobIndex
+from app.job_matcher import JobMatcher, TechArtisticScorer
+from app.job_text import job_text_cache
+from app.reverse_matcher import ReverseMatcher
+from app.taxonomy import Taxonomy, taxonomy_store
+from benchmarks.synthetic_jobs import generate_jobs, generate_profiles
+
+def _latency_ms(run: Callable[[], object], repeat: int = 3) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started)
+    return min(samples) * 1000
+
+def _throughput(score: Callable[[Dict], Dict], jobs: List[Dict]) -> float:
+    started = time.perf_counter()
+    for job in jobs:
+        score(job)
+    return len(jobs) / (time.perf_counter() - started)
+
+def _cold(run: Callable[[], float]) -> float:
+    """Run with an empty shared job text cache; later runs find it filled"""
+    job_text_cache.clear()
+    return run()
+
+def _batch_throughput(score: Callable[[List[Dict]], List], jobs: List[Dict]) -> float:
+    started = time.perf_counter()
+    score(jobs)
+    return len(jobs) / (time.perf_counter() - started)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark job scoring throughput")
+    parser.add_argument('--jobs', type=int, default=20000, help="Synthetic catalog size")
+    parser.add_argument('--profiles', type=int, default=2000, help="Synthetic profiles for reverse matching")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    jobs = generate_jobs(args.jobs)
+    profiles = generate_profiles(1)
+
+    cv_data = profiles[0]['cv_data']
+    results = {
+        'suite': 'job_matcher',
+        'jobs': len(jobs),
+        'jobs_per_second': {
+            'score_job_cold': round(_cold(lambda: _throughput(TechArtisticScorer(cv_data).score_job, jobs)), 1),
+            'score_job': round(_throughput(TechArtisticScorer(cv_data).score_job, jobs), 1),
+            'score_jobs': round(_cold(lambda: _batch_throughput(TechArtisticScorer(cv_data).score_jobs, jobs)), 1),
+        },
+    }
+    per_second = results['jobs_per_second']
+    results['score_jobs_speedup'] = round(per_second['score_jobs'] / per_second['score_job_cold'], 1)
+    index = JobIndex(jobs)
+    matcher = JobMatcher(profiles[0])
+    candidates, _ = index.hit_matrix(*matcher.scorer.batch_columns())
+    results['top_k'] = {
+        'k': 25,
+        'candidates': len(candidates),
+        'match_jobs_ms': round(_latency_ms(lambda: matcher.match_jobs(jobs)), 1),
+        'match_top_k_ms': round(_latency_ms(lambda: matcher.match_top_k(index, 25)), 1),
+        'match_jobs_top_k_ms': round(_latency_ms(lambda: matcher.match_jobs_top_k(jobs, 25)), 1),
+        'match_jobs_top_k_cold_ms': round(_cold(lambda: _latency_ms(lambda: matcher.match_jobs_top_k(jobs, 25), 1)), 1),
+    }
+    results['top_k'].update(matcher.top_k_stats)
+    started = time.perf_counter()
+    bm25 = BM25Index(jobs)
+    fit_seconds = time.perf_counter() - started
+    bm25_matcher = JobMatcher(profiles[0], scorer=BM25Scorer(profiles[0]['cv_data'], bm25))
+    results['bm25'] = {
+        'fit_jobs_per_second': round(len(jobs) / fit_seconds, 1),
+        'score_catalog_ms': round(_latency_ms(bm25_matcher.scorer.score_catalog), 1),
+        'match_jobs_ms': round(_latency_ms(lambda: bm25_matcher.match_jobs(jobs)), 1),
+        'matches': sum(1 for match in bm25_matcher.match_jobs(jobs) if match),
+    }
+    reverse_profiles = generate_profiles(args.profiles, seed=1)
+    reverse = ReverseMatcher(reverse_profiles)
+    matchers = [JobMatcher(profile, scorer=reverse.scorer_cache.get_scorer(profile))
+                for profile in reverse_profiles]
+    sample = jobs[:50]
+    results['reverse_match'] = {
+        'profiles': len(reverse_profiles),
+        'per_job_ms': round(_latency_ms(lambda: [reverse.match(job) for job in sample]) / len(sample), 3),
+        'match_job_loop_ms': round(_latency_ms(
+            lambda: [matcher.match_job(job) for job in sample for matcher in matchers]) / len(sample), 3),
+        'matches_per_job': round(sum(len(reverse.match(job)) for job in sample) / len(sample), 1),
+    }
+    results['taxonomy'] = {
+        'version': taxonomy_store.current().version,
+        'compile_ms': round(_latency_ms(lambda: Taxonomy.from_dict(taxonomy_store.current().to_dict())), 3),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Memory and filtering benchmark for normalized job records.
+
+Loads a synthetic catalog from JSON (so every job owns its strings, as when
+read from the jobs table) once as plain dicts and once as JobRecords, and
+reports the memory each layout holds per job, projected to a 1M-job catalog.
+Neither layout keeps the lowercased match text; JobTextCache holds it for
+the jobs being scored. Checks salary parsing and that matching records gives
+the same results as matching dicts, and times the basic-criteria filter on
+both.
+
+Usage (from backend/):
+    python -m benchmarks.bench_job_records --jobs 1000000 --output results.json
+"""
+import argparse
+import gc
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.job_matcher import JobMatcher
+from app.job_record import EmploymentType, JobRecord, as_records, parse_salary
+from benchmarks.synthetic_jobs import generate_jobs, generate_profiles
+
+# (job, expected (min, max, currency))
+SALARY_CASES = [
+    ({'salary': 55000}, (55000, 55000, None)),
+    ({'salary': '60000'}, (60000, 60000, None)),
+    ({'salary': '£50,000 - £60,000'}, (50000, 60000, 'GBP')),
+    ({'salary': '$85k-120k USD'}, (85000, 120000, 'USD')),
+    ({'salary': '€45.5k'}, (45500, 45500, 'EUR')),
+    ({'salary': 'Competitive'}, (None, None, None)),
+    ({'salary_range': {'min': 85000, 'max': 150000}}, (85000, 150000, None)),
+    ({'salary': 'DOE', 'salary_range': {'min': 1, 'max': 2, 'currency': 'GBP'}}, (1, 2, 'GBP')),
+    ({}, (None, None, None)),
+]
+EMPLOYMENT_CASES = [
+    ('Full-time', EmploymentType.FULL_TIME), ('full time', EmploymentType.FULL_TIME),
+    ('Part-time', EmploymentType.PART_TIME), ('Contract', EmploymentType.CONTRACT),
+    ('Freelance', EmploymentType.CONTRACT), ('Internship', EmploymentType.INTERNSHIP),
+    ('Temporary', EmploymentType.TEMPORARY), ('', EmploymentType.UNKNOWN), (None, EmploymentType.UNKNOWN),
+]
+
+def check_parsing() -> List[str]:
+    """Salary and employment type parsing against known answers"""
+    mismatches = []
+    for job, expected in SALARY_CASES:
+        actual = parse_salary(job)
+        if actual != expected:
+            mismatches.append("salary %r: expected %r, got %r" % (job, expected, actual))
+    for value, expected in EMPLOYMENT_CASES:
+        actual = EmploymentType.parse(value)
+        if actual != expected:
+            mismatches.append("employment type %r: expected %r, got %r" % (value, expected, actual))
+    return mismatches
+
+def _summary(matches: List[Optional[Dict]]) -> List:
+    return [match and (match['job']['id'], match['score_details']) for match in matches]
+
+def check_matching(jobs: List[Dict], records: List[JobRecord], profiles: List[Dict]) -> List[str]:
+    """match_jobs and match_jobs_top_k over records against the same over dicts"""
+    mismatches = []
+    for profile in profiles:
+        matcher = JobMatcher(profile)
+        if _summary(matcher.match_jobs(records)) != _summary(matcher.match_jobs(jobs)):
+            mismatches.append("match_jobs differs for %s" % profile['user_id'])
+        if _summary(matcher.match_jobs_top_k(records, 25)) != _summary(matcher.match_jobs_top_k(jobs, 25)):
+            mismatches.append("match_jobs_top_k differs for %s" % profile['user_id'])
+    return mismatches
+
+def _retained(build: Callable[[], object]) -> Tuple[object, int]:
+    """Build something and return it with the memory it holds"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        built = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return built, size
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark job record memory and filtering")
+    parser.add_argument('--jobs', type=int, default=200000, help="Synthetic catalog size")
+    parser.add_argument('--profiles', type=int, default=5, help="Profiles used for the matching check")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    payload = json.dumps(generate_jobs(args.jobs))
+    jobs, dict_bytes = _retained(lambda: json.loads(payload))
+    records, record_bytes = _retained(lambda: as_records(json.loads(payload)))
+    del payload
+
+    mismatches = check_parsing()
+    sample = min(len(jobs), 20000)
+    mismatches += check_matching(jobs[:sample], records[:sample], generate_profiles(args.profiles))
+    for mismatch in mismatches[:20]:
+        print("MISMATCH %s" % mismatch, file=sys.stderr)
+
+    matcher = JobMatcher(dict(generate_profiles(1)[0], preferences={'min_salary': 80000, 'job_types': ['remote']}))
+    timings = {}
+    for name, catalog in (('dicts', jobs), ('records', records)):
+        started = time.perf_counter()
+        kept = sum(1 for job in catalog if matcher._meets_basic_criteria(job))
+        timings[name] = round((time.perf_counter() - started) * 1e9 / len(catalog), 1)
+
+    per_job = {
+        'dict': round(dict_bytes / len(jobs), 1),
+        'record': round(record_bytes / len(records), 1),
+    }
+    results = {
+        'suite': 'job_records',
+        'jobs': len(jobs),
+        'mismatches': len(mismatches),
+        'bytes_per_job': per_job,
+        'projected_1m_jobs_mb': {name: round(size * 1e6 / 2 ** 20, 1) for name, size in per_job.items()},
+        'record_saving_vs_dict': round(1 - per_job['record'] / per_job['dict'], 3),
+        'criteria_ns_per_job': timings,
+        'criteria_kept': kept,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
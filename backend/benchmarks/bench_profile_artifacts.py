@@ -0,0 +1,180 @@
+"""
+Benchmark and differential check for stored profile artifacts.
+
+Writes synthetic profiles through ProfileManager, which stores the matching
+artifacts derived from each CV, then checks that scorers loaded from the
+stored artifacts score a synthetic catalog exactly like scorers built from
+cv_data: with current artifacts, and with missing, malformed, old-version,
+stale (derived from another version of the profile) and old-taxonomy
+artifacts, which must be rebuilt or have their bonuses recomputed. Reports
+the time to build a scorer from cv_data and from stored artifacts, for the
+synthetic CVs and for CVs --scale times longer, and the size artifacts add
+to a stored profile.
+
+Usage (from backend/):
+    python -m benchmarks.bench_profile_artifacts --profiles 500 --output results.json
+"""
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.job_matcher import JobMatcher, TechArtisticScorer
+from app.profile_artifacts import ARTIFACTS_KEY, ARTIFACTS_VERSION, ProfileArtifacts, artifact_stats
+from app.profile_manager import ProfileData, ProfileManager
+from app.profile_store import SQLiteProfileStore
+from app.taxonomy import Taxonomy, taxonomy_store
+from benchmarks.synthetic_jobs import generate_jobs, generate_profiles
+
+def _retuned(taxonomy: Taxonomy) -> Taxonomy:
+    """The taxonomy with another cap and an extra certification bonus"""
+    data = taxonomy.to_dict()
+    category = next(iter(data['categories']))
+    bonuses = dict(data['certification_bonuses'])
+    bonuses[category] = dict(bonuses.get(category, {}), aws=1)
+    return Taxonomy.from_dict(dict(data, category_cap=data['category_cap'] + 1, certification_bonuses=bonuses))
+
+def _variants(profile: Dict, other: Dict) -> Dict[str, Dict]:
+    """Copies of a stored profile with current, missing and stale artifacts, and the counter loading each bumps"""
+    stored = profile[ARTIFACTS_KEY]
+    tuned = _retuned(taxonomy_store.current())
+    old_taxonomy = ProfileArtifacts.build(profile['cv_data'], tuned, profile['last_updated']).to_dict()
+    variants = {
+        'current': (stored, 'loaded'),
+        'missing': (None, 'rebuilt'),
+        'malformed': ({'version': ARTIFACTS_VERSION}, 'rebuilt'),
+        'old_version': (dict(stored, version=ARTIFACTS_VERSION - 1), 'rebuilt'),
+        # Another CV's artifacts, left over from an earlier version of the profile
+        'stale': (dict(other[ARTIFACTS_KEY], last_updated='2000-01-01T00:00:00'), 'rebuilt'),
+        'old_taxonomy': (old_taxonomy, 'bonuses_recomputed'),
+    }
+    result = {}
+    for name, (artifacts, counter) in variants.items():
+        variant = {key: value for key, value in profile.items() if key != ARTIFACTS_KEY}
+        if artifacts is not None:
+            variant[ARTIFACTS_KEY] = artifacts
+        result[name] = (variant, counter)
+    return result
+
+def _details(matches: List[Optional[Dict]]) -> List[Optional[Dict]]:
+    return [match and match['score_details'] for match in matches]
+
+def check_artifacts(jobs: List[Dict], profiles: List[Dict]) -> List[str]:
+    """Scorers from stored, missing and stale artifacts against scorers built from cv_data"""
+    mismatches = []
+    for number, profile in enumerate(profiles):
+        expected = TechArtisticScorer(profile['cv_data']).score_jobs(jobs)
+        other = profiles[(number + 1) % len(profiles)]
+        for name, (variant, counter) in _variants(profile, other).items():
+            before = artifact_stats()
+            actual = TechArtisticScorer.from_profile(variant).score_jobs(jobs)
+            after = artifact_stats()
+            if actual != expected:
+                mismatches.append("%s, %s artifacts: scores differ from a scorer built from cv_data" % (
+                    profile['user_id'], name))
+            if after[counter] != before[counter] + 1:
+                mismatches.append("%s, %s artifacts: %s not counted" % (profile['user_id'], name, counter))
+        matcher = JobMatcher(profile)
+        reference = JobMatcher({key: value for key, value in profile.items() if key != ARTIFACTS_KEY})
+        if _details(matcher.match_jobs(jobs[:200])) != _details(reference.match_jobs(jobs[:200])):
+            mismatches.append("%s: JobMatcher matches differ with stored artifacts" % profile['user_id'])
+    return mismatches
+
+def check_manager(directory: Path, profiles: List[Dict]) -> List[str]:
+    """Artifacts are stored on every write, follow cv_data changes and stay out of API dicts"""
+    mismatches = []
+    manager = ProfileManager(str(directory), store=SQLiteProfileStore(directory / 'check.db'))
+    manager.create_or_update_profiles([ProfileData.from_dict(profile) for profile in profiles])
+    for profile in profiles:
+        stored = manager.profiles.get(profile['user_id'])
+        artifacts = stored.get(ARTIFACTS_KEY) or {}
+        if artifacts.get('version') != ARTIFACTS_VERSION or artifacts.get('last_updated') != stored['last_updated']:
+            mismatches.append("%s: stored without current artifacts" % profile['user_id'])
+    loaded = manager.get_profile(profiles[0]['user_id'])
+    if ARTIFACTS_KEY in loaded.to_dict(include_artifacts=False):
+        mismatches.append("artifacts included in the API form of a profile")
+    # An update through a loaded profile gets a new stamp and must not keep its artifacts
+    loaded.cv_data = profiles[1]['cv_data']
+    manager.create_or_update_profile(loaded)
+    stored = manager.profiles.get(loaded.user_id)
+    expected = ProfileArtifacts.build(profiles[1]['cv_data'], last_updated=loaded.last_updated).to_dict()
+    if stored[ARTIFACTS_KEY] != expected:
+        mismatches.append("artifacts not rederived after cv_data changed")
+    manager.profiles.close()
+    return mismatches
+
+def _scaled(profile: Dict, scale: int) -> Dict:
+    """A profile whose skills, experience and certifications are repeated scale times"""
+    cv_data = dict(profile['cv_data'])
+    for section in ('skills', 'experience', 'certifications'):
+        cv_data[section] = ["%s %d" % (line, copy) for copy in range(scale) for line in cv_data[section]]
+    return dict(profile, cv_data=cv_data)
+
+def _per_profile_us(build: Callable[[Dict], object], profiles: List[Dict], repeat: int = 3) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for profile in profiles:
+            build(profile)
+        samples.append(time.perf_counter() - started)
+    return min(samples) * 1e6 / len(profiles)
+
+def measure(profiles: List[Dict]) -> Dict:
+    """Scorer build time from cv_data and from stored artifacts, and the stored size artifacts add"""
+    bare = [{key: value for key, value in profile.items() if key != ARTIFACTS_KEY} for profile in profiles]
+    from_cv = _per_profile_us(lambda profile: TechArtisticScorer(profile['cv_data']), profiles)
+    from_artifacts = _per_profile_us(TechArtisticScorer.from_profile, profiles)
+    stored_bytes = sum(len(json.dumps(profile, separators=(',', ':'))) for profile in profiles)
+    bare_bytes = sum(len(json.dumps(profile, separators=(',', ':'))) for profile in bare)
+    return {
+        'scorer_from_cv_data_us': round(from_cv, 1),
+        'scorer_from_artifacts_us': round(from_artifacts, 1),
+        'speedup': round(from_cv / from_artifacts, 2),
+        'stored_bytes_per_profile': round(stored_bytes / len(profiles)),
+        'artifact_bytes_per_profile': round((stored_bytes - bare_bytes) / len(profiles)),
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark and cross-check stored profile artifacts")
+    parser.add_argument('--profiles', type=int, default=500, help="Synthetic profiles timed")
+    parser.add_argument('--check-profiles', type=int, default=20, help="Profiles used for the differential check")
+    parser.add_argument('--jobs', type=int, default=1000, help="Synthetic catalog size for the differential check")
+    parser.add_argument('--scale', type=int, default=10, help="Length multiplier of the long CVs")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    jobs = generate_jobs(args.jobs)
+    results = {'suite': 'profile_artifacts', 'taxonomy_version': taxonomy_store.current().version}
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        sets = {'profiles': generate_profiles(args.profiles)}
+        sets['long_profiles'] = [_scaled(profile, args.scale) for profile in sets['profiles']]
+        mismatches = check_manager(directory, sets['profiles'][:args.check_profiles])
+        for name, profiles in sets.items():
+            manager = ProfileManager(str(directory), store=SQLiteProfileStore(directory / ("%s.db" % name)))
+            manager.create_or_update_profiles([ProfileData.from_dict(profile) for profile in profiles])
+            stored = [manager.profiles.get(profile['user_id']) for profile in profiles]
+            manager.profiles.close()
+            mismatches += check_artifacts(jobs, stored[:args.check_profiles])
+            results[name] = measure(stored)
+            print("%s: scorer from cv_data %.1f us, from artifacts %.1f us" % (
+                name, results[name]['scorer_from_cv_data_us'], results[name]['scorer_from_artifacts_us']),
+                file=sys.stderr)
+    for mismatch in mismatches[:20]:
+        print("MISMATCH %s" % mismatch, file=sys.stderr)
+    results['mismatches'] = len(mismatches)
+    results['artifact_stats'] = artifact_stats()
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Multi-process benchmark for the profile stores.
+
+For each backend, times --writers processes writing and deleting their own
+users and a few users they all share, at the same time, through one store.
+Then keeps --readers processes with a ProfileManager open while this
+process changes --changes profiles per round (compacting the store every
+third round), and reports the time each reader's refresh() takes with the
+round's changes and with none. tests/test_profile_coherence.py checks that
+no write is lost and that refresh() reports exactly the changed profiles.
+
+Usage (from backend/):
+    python -m benchmarks.bench_profile_coherence --backends sqlite,log,mmap,json --output results.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import queue
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.profile_manager import ProfileManager
+from app.profile_store import BACKENDS, open_profile_store
+from benchmarks.bench_profile_store import ProfileFactory, _percentile
+
+SHARED_USERS = 10
+
+def _receive(results: multiprocessing.Queue, processes: List[multiprocessing.Process]):
+    """Next result from a worker; fails rather than waits if one has died"""
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            failed = [process.exitcode for process in processes if process.exitcode]
+            if failed:
+                raise RuntimeError("worker process exited with %d" % failed[0])
+
+def write_worker(backend: str, directory: str, slot: int, writes: int, results: multiprocessing.Queue) -> None:
+    """Write and delete this slot's users and the shared ones; report the time taken"""
+    logging.getLogger('app').setLevel(logging.WARNING)
+    factory = ProfileFactory(pool=20)
+    rng = random.Random(slot)
+    store = open_profile_store(Path(directory), backend)
+    started = time.perf_counter()
+    try:
+        for step in range(writes):
+            if rng.random() < 0.3:
+                user_id = "shared-%d" % rng.randrange(SHARED_USERS)
+            else:
+                user_id = "writer-%d-%d" % (slot, rng.randrange(writes // 4 + 1))
+            if rng.random() < 0.1:
+                store.delete(user_id)
+            else:
+                profile = factory(step)
+                profile['user_id'] = user_id
+                store.put(profile)
+    finally:
+        store.close()
+    results.put(time.perf_counter() - started)
+
+def read_worker(backend: str, directory: str, requests: multiprocessing.Queue,
+                results: multiprocessing.Queue) -> None:
+    """Hold a ProfileManager open; per round, time refresh with the round's changes and without"""
+    logging.getLogger('app').setLevel(logging.WARNING)
+    manager = ProfileManager(directory, store=open_profile_store(Path(directory), backend), refresh_interval=0)
+    manager.refresh(force=True)
+    results.put({})
+    try:
+        while requests.get() is not None:
+            started = time.perf_counter()
+            manager.refresh(force=True)
+            changed_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            manager.refresh(force=True)
+            idle_ms = (time.perf_counter() - started) * 1000
+            results.put({'changed_ms': changed_ms, 'idle_ms': idle_ms})
+    finally:
+        manager.profiles.close()
+
+def time_writers(context, backend: str, directory: Path, writers: int, writes: int) -> Dict:
+    """Wall time of concurrent writer processes, and their writes per second"""
+    directory.mkdir(parents=True)
+    results = context.Queue()
+    processes = [context.Process(target=write_worker, args=(backend, str(directory), slot, writes, results))
+                 for slot in range(writers)]
+    for process in processes:
+        process.start()
+    seconds = max(_receive(results, processes) for _ in processes)
+    for process in processes:
+        process.join()
+    return {
+        'writers': writers,
+        'write_seconds': round(seconds, 2),
+        'writes_per_second': round(writers * writes / seconds),
+    }
+
+def time_readers(context, backend: str, directory: Path, factory: ProfileFactory, profiles: int,
+                 readers: int, rounds: int, changes: int) -> Dict:
+    """Refresh time of reader processes, with each round's changes and with none"""
+    directory.mkdir(parents=True)
+    store = open_profile_store(directory, backend)
+    for first in range(0, profiles, 1000):
+        store.put_many([factory(number) for number in range(first, min(profiles, first + 1000))])
+    results = context.Queue()
+    requests = [context.Queue() for _ in range(readers)]
+    processes = [context.Process(target=read_worker, args=(backend, str(directory), inbox, results))
+                 for inbox in requests]
+    for process in processes:
+        process.start()
+    changed_ms: List[float] = []
+    idle_ms: List[float] = []
+    try:
+        for _ in processes:
+            _receive(results, processes)
+        rng = random.Random(11)
+        for number in range(rounds):
+            for user in rng.sample(range(profiles), changes):
+                if rng.random() < 0.2:
+                    store.delete("user-%d" % user)
+                else:
+                    store.put(factory(user, version=number))
+            if number % 3 == 2 and hasattr(store, 'compact'):
+                store.compact()
+            for inbox in requests:
+                inbox.put(number)
+            for _ in processes:
+                result = _receive(results, processes)
+                changed_ms.append(result['changed_ms'])
+                idle_ms.append(result['idle_ms'])
+    finally:
+        for inbox in requests:
+            inbox.put(None)
+        for process in processes:
+            process.join()
+        store.close()
+    return {
+        'readers': readers,
+        'changes_per_round': changes,
+        'refresh_changed_p50_ms': round(_percentile(changed_ms, 0.5), 3),
+        'refresh_idle_p50_ms': round(_percentile(idle_ms, 0.5), 4),
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark profile stores shared by several processes")
+    parser.add_argument('--backends', default=','.join(BACKENDS), help="Comma-separated store backends")
+    parser.add_argument('--writers', type=int, default=4, help="Concurrent writer processes")
+    parser.add_argument('--writes', type=int, default=200, help="Writes per writer process")
+    parser.add_argument('--readers', type=int, default=2, help="Reader processes")
+    parser.add_argument('--profiles', type=int, default=2000, help="Profiles stored before the reader rounds")
+    parser.add_argument('--rounds', type=int, default=9, help="Rounds of changes timed by the readers")
+    parser.add_argument('--changes', type=int, default=20, help="Profiles changed per round")
+    parser.add_argument('--directory', help="Where to create the stores (default a temporary directory)")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    # Fresh interpreters, so no process inherits another's open store
+    context = multiprocessing.get_context('spawn')
+    factory = ProfileFactory(pool=200)
+    results = {'suite': 'profile_coherence', 'backends': {}}
+    with tempfile.TemporaryDirectory(dir=args.directory) as tmp:
+        for backend in args.backends.split(','):
+            writers = time_writers(context, backend, Path(tmp) / backend / 'writers', args.writers, args.writes)
+            readers = time_readers(context, backend, Path(tmp) / backend / 'readers', factory, args.profiles,
+                                   args.readers, args.rounds, args.changes)
+            results['backends'][backend] = dict(writers, **readers)
+            print("%s: %d writes/s, refresh p50 %.3f ms with changes, %.4f ms without" % (
+                backend, writers['writes_per_second'], readers['refresh_changed_p50_ms'],
+                readers['refresh_idle_p50_ms']), file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
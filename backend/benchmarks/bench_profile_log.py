@@ -0,0 +1,223 @@
+"""
+Benchmark and consistency check for the log-structured profile store.
+
+Checks LogProfileStore against JsonProfileStore over a random sequence of
+writes and deletes with small segments and compactions in between, after
+reopening (snapshot plus tail replay), after a torn write at the end of the
+log, and with writer threads running while the compactor swaps snapshots.
+Reports single-write latency with group fsync, how many writes concurrent
+writers share per fsync, and startup time for a store of --profiles
+profiles: loading profiles.json, replaying the whole log, and loading a
+snapshot plus a tail of updates.
+
+Usage (from backend/):
+    python -m benchmarks.bench_profile_log --profiles 1000000 --output results.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.profile_log import LogProfileStore, encode_record, OP_PUT
+from app.profile_store import JsonProfileStore
+from benchmarks.bench_profile_store import FILL_BATCH, ProfileFactory, _percentile, check_differential, compare_stores
+
+def _log(directory: Path, **options) -> LogProfileStore:
+    options.setdefault('compact_interval', 0)
+    return LogProfileStore(directory, **options)
+
+def check_log(directory: Path, factory: ProfileFactory) -> List[str]:
+    """Differential check with rollovers, compactions, reopening and a torn tail"""
+    expected = JsonProfileStore(directory / 'expected.json')
+    store = _log(directory / 'log', segment_bytes=64 << 10)
+    mismatches = check_differential(expected, store, factory, 3000, between=store.compact)
+    if store.compactions == 0:
+        mismatches.append("no compaction ran")
+    # More writes after the last compaction, so reopening replays a tail
+    for number in range(50):
+        profile = factory(number, version=99)
+        expected.put(profile)
+        store.put(profile)
+    store.delete('user-0')
+    expected.delete('user-0')
+    store.close()
+
+    store = _log(directory / 'log')
+    if store.replayed_records == 0 or len(list((directory / 'log').glob('snapshot-*.idx'))) != 1:
+        mismatches.append("reopening did not load a snapshot and replay a tail")
+    mismatches += ["after reopening: %s" % mismatch for mismatch in compare_stores(expected, store)]
+    store.close()
+
+    # A crash in the middle of appending leaves part of a record behind
+    tail = sorted((directory / 'log').glob('segment-*.log'))[-1]
+    size = tail.stat().st_size
+    record = encode_record(OP_PUT, 'user-torn', '', json.dumps(factory(1)).encode('utf-8'))
+    with open(tail, 'ab') as f:
+        f.write(record[:len(record) // 2])
+    store = _log(directory / 'log')
+    if tail.stat().st_size != size or 'user-torn' in store:
+        mismatches.append("torn record was not truncated")
+    mismatches += ["after torn write: %s" % mismatch for mismatch in compare_stores(expected, store)]
+    store.close()
+    return mismatches
+
+def check_concurrent_compaction(directory: Path, factory: ProfileFactory, writers: int, seconds: float) -> Dict:
+    """Writer threads over disjoint users while compactions run; the log must end with each one's last write"""
+    store = _log(directory, segment_bytes=256 << 10)
+    latest: List[Dict[str, Optional[Dict]]] = [{} for _ in range(writers)]
+    errors: List[str] = []
+    stop = threading.Event()
+
+    def write(slot: int) -> None:
+        rng = random.Random(slot)
+        step = 0
+        try:
+            while not stop.is_set():
+                number = rng.randrange(500) * writers + slot
+                step += 1
+                if rng.random() < 0.1:
+                    store.delete("user-%d" % number)
+                    latest[slot]["user-%d" % number] = None
+                else:
+                    profile = factory(number, version=step)
+                    store.put(profile)
+                    latest[slot][profile['user_id']] = profile
+        except Exception as e:
+            errors.append("writer %d: %s" % (slot, e))
+
+    threads = [threading.Thread(target=write, args=(slot,)) for slot in range(writers)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        store.compact()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    expected = {user_id: profile for writes in latest for user_id, profile in writes.items() if profile is not None}
+    compactions = store.compactions
+    for reopen in (False, True):
+        if reopen:
+            store.close()
+            store = _log(directory)
+        actual = {profile['user_id']: profile for profile in store.values()}
+        if actual != expected:
+            errors.append("%s: %d profiles expected, %d stored" % (
+                "after reopening" if reopen else "after compactions", len(expected), len(actual)))
+    store.close()
+    return {'writers': writers, 'compactions': compactions, 'errors': errors}
+
+def time_writes(directory: Path, factory: ProfileFactory, writers: int, count: int) -> Dict:
+    """Single-profile writes from writer threads with group fsync"""
+    store = _log(directory)
+    samples: List[float] = []
+
+    def write(slot: int) -> None:
+        for step in range(count):
+            profile = factory(step * writers + slot)
+            started = time.perf_counter()
+            store.put(profile)
+            samples.append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=write, args=(slot,)) for slot in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    result = {
+        'writers': writers,
+        'p50_ms': round(_percentile(samples, 0.5), 3),
+        'p99_ms': round(_percentile(samples, 0.99), 3),
+        'writes_per_second': round(len(samples) / elapsed),
+        'writes_per_fsync': round(len(samples) / max(1, store.syncs), 2),
+    }
+    store.close()
+    return result
+
+def time_startup(directory: Path, factory: ProfileFactory, profiles: int, tail: int) -> Dict:
+    """Open times for a JSON file, a whole log, and a snapshot plus a tail of updates"""
+    directory.mkdir()
+    store = _log(directory / 'log')
+    json_path = directory / 'profiles.json'
+    with open(json_path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for first in range(0, profiles, FILL_BATCH):
+            batch = [factory(number) for number in range(first, min(profiles, first + FILL_BATCH))]
+            store.put_many(batch)
+            f.write(',' if first else '')
+            f.write(','.join('%s:%s' % (json.dumps(p['user_id']), json.dumps(p)) for p in batch))
+        f.write('}')
+    store.close()
+
+    started = time.perf_counter()
+    JsonProfileStore(json_path)
+    json_seconds = time.perf_counter() - started
+
+    store = _log(directory / 'log')
+    full_replay = store.open_seconds
+    store.compact()
+    rng = random.Random(3)
+    for first in range(0, tail, FILL_BATCH):
+        store.put_many([factory(rng.randrange(profiles), version=1) for _ in range(min(FILL_BATCH, tail - first))])
+    store.close()
+    store = _log(directory / 'log')
+    result = {
+        'profiles': len(store),
+        'json_load_seconds': round(json_seconds, 3),
+        'log_replay_seconds': round(full_replay, 3),
+        'snapshot_plus_tail_seconds': round(store.open_seconds, 3),
+        'tail_records': store.replayed_records,
+    }
+    store.close()
+    return result
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark and check the log-structured profile store")
+    parser.add_argument('--profiles', type=int, default=100000, help="Store size for the startup comparison")
+    parser.add_argument('--tail', type=int, default=10000, help="Updates written after the snapshot")
+    parser.add_argument('--writes', type=int, default=500, help="Timed writes per writer thread")
+    parser.add_argument('--writers', type=int, default=8, help="Concurrent writer threads")
+    parser.add_argument('--seconds', type=float, default=3.0, help="Length of the concurrent compaction check")
+    parser.add_argument('--directory', help="Where to create the stores (default a temporary directory)")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    factory = ProfileFactory()
+    with tempfile.TemporaryDirectory(dir=args.directory) as tmp:
+        directory = Path(tmp)
+        mismatches = check_log(directory / 'check', factory)
+        concurrency = check_concurrent_compaction(directory / 'concurrent', factory, 4, args.seconds)
+        mismatches += concurrency.pop('errors')
+        writes = [time_writes(directory / ('writes-%d' % writers), factory, writers, args.writes)
+                  for writers in (1, args.writers)]
+        startup = time_startup(directory / 'startup', factory, args.profiles, args.tail)
+
+    for mismatch in mismatches[:20]:
+        print("MISMATCH %s" % mismatch, file=sys.stderr)
+    results = {
+        'suite': 'profile_log',
+        'mismatches': len(mismatches),
+        'writes': writes,
+        'concurrent_compaction': concurrency,
+        'startup': startup,
+        'cpus': os.cpu_count(),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Startup and memory benchmark for the memory-mapped profile store.
+
+Builds stores of each size from profiles carrying the full raw_text of their
+CV, then opens each in a fresh process and reports open time, private
+(anonymous) and file-backed resident memory after opening and after a run
+of random get_profile calls, for MmapProfileStore and for profiles.json
+loaded by JsonProfileStore (up to --json-max). Fails if mmap open time or
+private memory at the largest size grows more than --max-growth times over
+the smallest. Also checks the store against JsonProfileStore through writes,
+deletes and compactions, after reopening, after a crash that leaves the
+index dirty, and after a torn final record.
+
+Usage (from backend/):
+    python -m benchmarks.bench_profile_mmap --sizes 10000,100000,1000000 --output results.json
+"""
+import argparse
+import json
+import logging
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.profile_log import OP_PUT, encode_record
+from app.profile_manager import ProfileManager
+from app.profile_mmap import MmapProfileStore
+from app.profile_store import JsonProfileStore
+from benchmarks.bench_profile_store import FILL_BATCH, ProfileFactory, check_differential, compare_stores
+
+class CVProfileFactory(ProfileFactory):
+    """Synthetic profiles whose raw_text holds the CV's full text, as parsed CVs do"""
+
+    def __init__(self, pool: int = 1000):
+        super().__init__(pool)
+        for profile in self.pool:
+            cv_data = dict(profile['cv_data'])
+            lines = [line for section, values in cv_data.items() if section != 'raw_text' for line in values]
+            cv_data['raw_text'] = lines * 4
+            profile['cv_data'] = cv_data
+
+def _memory() -> Dict[str, int]:
+    """Resident private and file-backed memory of this process in KiB"""
+    memory = {}
+    with open('/proc/self/status', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith(('RssAnon:', 'RssFile:')):
+                memory[line.split(':')[0]] = int(line.split()[1])
+    return memory
+
+def measure_open(backend: str, path: str, gets: int) -> Dict:
+    """Open a store, then fetch random profiles; run in a fresh process"""
+    logging.getLogger('app').setLevel(logging.WARNING)
+    before = _memory()
+    started = time.perf_counter()
+    if backend == 'json':
+        store = JsonProfileStore(Path(path))
+    else:
+        store = MmapProfileStore(Path(path))
+    manager = ProfileManager(path, store=store)
+    open_seconds = time.perf_counter() - started
+    opened = _memory()
+    rng = random.Random(1)
+    size = len(store)
+    started = time.perf_counter()
+    for _ in range(gets):
+        manager.get_profile("user-%d" % rng.randrange(size))
+    get_ms = (time.perf_counter() - started) * 1000 / gets
+    after = _memory()
+    return {
+        'open_seconds': round(open_seconds, 4),
+        'anon_kib_after_open': opened['RssAnon'] - before['RssAnon'],
+        'anon_kib_after_gets': after['RssAnon'] - before['RssAnon'],
+        'file_kib_after_gets': after['RssFile'] - before['RssFile'],
+        'get_ms': round(get_ms, 4),
+    }
+
+def _child(backend: str, path: Path, gets: int) -> Dict:
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_profile_mmap', '--child', backend, str(path),
+                             '--gets', str(gets)], check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+def check_mmap(directory: Path, factory: ProfileFactory) -> List[str]:
+    """Differential check with compactions, reopening, a dirty index and a torn tail"""
+    expected = JsonProfileStore(directory / 'expected.json')
+    store = MmapProfileStore(directory / 'mmap', cache_size=50)
+    mismatches = check_differential(expected, store, factory, 3000, between=store.compact)
+    # Past the initial index capacity, so the index grows
+    batch = [factory(number) for number in range(1000, 3000)]
+    expected.put_many(batch)
+    store.put_many(batch)
+    mismatches += compare_stores(expected, store)
+    store.close()
+
+    store = MmapProfileStore(directory / 'mmap')
+    if store.rebuilds:
+        mismatches.append("a cleanly closed index was rebuilt")
+    mismatches += ["after reopening: %s" % mismatch for mismatch in compare_stores(expected, store)]
+    profile = factory(5000)
+    store.put(profile)
+    expected.put(profile)
+    store.delete('user-1000')
+    expected.delete('user-1000')
+    # A crash: the process ends without closing the store, and the kernel
+    # drops its file locks
+    store._index_map.flush()
+    store._open_lock.close()
+    store._process_lock.close()
+    store = MmapProfileStore(directory / 'mmap')
+    if store.rebuilds != 1:
+        mismatches.append("a dirty index was not rebuilt")
+    mismatches += ["after a crash: %s" % mismatch for mismatch in compare_stores(expected, store)]
+    store.close()
+
+    data = directory / 'mmap' / 'profiles.data'
+    size = data.stat().st_size
+    record = encode_record(OP_PUT, 'user-torn', '', json.dumps(factory(1)).encode('utf-8'))
+    with open(data, 'ab') as f:
+        f.write(record[:len(record) // 2])
+    store = MmapProfileStore(directory / 'mmap')
+    if data.stat().st_size != size or 'user-torn' in store:
+        mismatches.append("torn record was not truncated")
+    mismatches += ["after torn write: %s" % mismatch for mismatch in compare_stores(expected, store)]
+    store.close()
+    return mismatches
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark startup and memory of the mmap profile store")
+    parser.add_argument('--sizes', default="10000,100000", help="Comma-separated store sizes")
+    parser.add_argument('--gets', type=int, default=1000, help="Random get_profile calls after opening")
+    parser.add_argument('--json-max', type=int, default=100000, help="Largest size measured for profiles.json")
+    parser.add_argument('--max-growth', type=float, default=3.0,
+                        help="Largest allowed ratio of mmap open time or private memory, largest to smallest size")
+    parser.add_argument('--directory', help="Where to create the stores (default a temporary directory)")
+    parser.add_argument('--child', nargs=2, metavar=('BACKEND', 'PATH'), help=argparse.SUPPRESS)
+    parser.add_argument('--output', help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+    if args.child:
+        print(json.dumps(measure_open(args.child[0], args.child[1], args.gets)))
+        return 0
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    factory = CVProfileFactory()
+    results = {'suite': 'profile_mmap', 'mmap': [], 'json': []}
+    with tempfile.TemporaryDirectory(dir=args.directory) as tmp:
+        directory = Path(tmp)
+        mismatches = check_mmap(directory / 'check', factory)
+        store = MmapProfileStore(directory / 'mmap', sync=False)
+        json_store = JsonProfileStore(directory / 'profiles.json')
+        stored = 0
+        for size in sizes:
+            for first in range(stored, size, FILL_BATCH):
+                batch = [factory(number) for number in range(first, min(size, first + FILL_BATCH))]
+                store.put_many(batch)
+                if size <= args.json_max:
+                    json_store.profiles.update((profile['user_id'], profile) for profile in batch)
+            stored = size
+            store.close()
+            result = {'profiles': size, 'data_bytes': (directory / 'mmap' / 'profiles.data').stat().st_size}
+            result.update(_child('mmap', directory / 'mmap', args.gets))
+            results['mmap'].append(result)
+            print("mmap %d profiles: open %.4f s, %d KiB private" % (
+                size, result['open_seconds'], result['anon_kib_after_gets']), file=sys.stderr)
+            if size <= args.json_max:
+                json_store._save()
+                result = {'profiles': size}
+                result.update(_child('json', directory / 'profiles.json', args.gets))
+                results['json'].append(result)
+            store = MmapProfileStore(directory / 'mmap', sync=False)
+        store.close()
+
+    first, last = results['mmap'][0], results['mmap'][-1]
+    # Small absolute floors keep timer and allocator noise from counting as growth
+    for key, floor in (('open_seconds', 0.01), ('anon_kib_after_gets', 4096)):
+        growth = max(last[key], floor) / max(first[key], floor)
+        if growth > args.max_growth:
+            mismatches.append("mmap %s grew %.1fx from %d to %d profiles" % (key, growth, sizes[0], sizes[-1]))
+    for mismatch in mismatches[:20]:
+        print("MISMATCH %s" % mismatch, file=sys.stderr)
+    results['mismatches'] = len(mismatches)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Write latency benchmark for the profile stores.
+
+Grows a SQLiteProfileStore to each target size with bulk writes and, at
+every size, times single-profile upserts (half updates of stored users, half
+new users) through ProfileManager; fails if the median upsert at the
+largest size is more than --max-growth times the median at the smallest.
+The whole-file JsonProfileStore is timed the same way up to --json-max
+profiles, for comparison. Also runs reader threads against the database
+while a writer upserts. tests/test_profile_store.py checks that every
+backend agrees with the JSON store and that profiles.json is migrated once.
+
+Usage (from backend/):
+    python -m benchmarks.bench_profile_store --sizes 1000,10000,100000,1000000 --output results.json
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.profile_manager import ProfileData, ProfileManager
+from app.profile_store import JsonProfileStore, ProfileStore, SQLiteProfileStore
+from benchmarks.synthetic_jobs import generate_profiles
+
+FILL_BATCH = 10000
+
+class ProfileFactory:
+    """Synthetic profiles for any user number, reusing a pool of CVs"""
+
+    def __init__(self, pool: int = 1000):
+        self.pool = generate_profiles(pool)
+
+    def __call__(self, number: int, version: int = 0) -> Dict:
+        profile = dict(self.pool[number % len(self.pool)])
+        profile['user_id'] = "user-%d" % number
+        profile['email'] = "user%d@example.com" % number
+        profile['last_updated'] = "2025-01-01T00:00:%02d" % (version % 60)
+        return profile
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def fill(store: ProfileStore, factory: ProfileFactory, start: int, stop: int) -> float:
+    """Bulk-write users start..stop-1; returns profiles per second"""
+    started = time.perf_counter()
+    for first in range(start, stop, FILL_BATCH):
+        store.put_many([factory(number) for number in range(first, min(stop, first + FILL_BATCH))])
+    elapsed = time.perf_counter() - started
+    return (stop - start) / elapsed if elapsed else 0.0
+
+def time_upserts(manager: ProfileManager, factory: ProfileFactory, size: int, count: int,
+                 rng: random.Random) -> Dict:
+    """
+    Time count single upserts through the manager: updates of random stored
+    users and new users past size, alternately
+
+    Returns:
+        Latency percentiles in milliseconds and the new store size
+    """
+    samples = []
+    next_user = size
+    for step in range(count):
+        if step % 2:
+            profile = factory(next_user)
+            next_user += 1
+        else:
+            profile = factory(rng.randrange(size), version=step)
+        data = ProfileData.from_dict(profile)
+        started = time.perf_counter()
+        manager.create_or_update_profile(data)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        'profiles': size,
+        'p50_ms': round(_percentile(samples, 0.5), 3),
+        'p99_ms': round(_percentile(samples, 0.99), 3),
+        'next_user': next_user,
+    }
+
+def time_reads(store: ProfileStore, size: int, count: int, rng: random.Random) -> float:
+    """Median get latency in milliseconds"""
+    samples = []
+    for _ in range(count):
+        user_id = "user-%d" % rng.randrange(size)
+        started = time.perf_counter()
+        store.get(user_id)
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(_percentile(samples, 0.5), 3)
+
+def check_concurrent(store: SQLiteProfileStore, factory: ProfileFactory, size: int, readers: int,
+                     seconds: float) -> Dict:
+    """
+    Reader threads fetch random profiles while one writer upserts; every
+    read must return a whole profile and no thread may fail
+    """
+    errors: List[str] = []
+    reads = [0] * readers
+    writes = [0]
+    stop = threading.Event()
+
+    def read(slot: int) -> None:
+        rng = random.Random(slot)
+        try:
+            while not stop.is_set():
+                user_id = "user-%d" % rng.randrange(size)
+                profile = store.get(user_id)
+                if profile is None or profile['user_id'] != user_id:
+                    errors.append("read %s returned %r" % (user_id, profile and profile.get('user_id')))
+                    return
+                reads[slot] += 1
+        except Exception as e:
+            errors.append("reader %d: %s" % (slot, e))
+
+    def write() -> None:
+        rng = random.Random(-1)
+        try:
+            while not stop.is_set():
+                store.put(factory(rng.randrange(size), version=writes[0]))
+                writes[0] += 1
+        except Exception as e:
+            errors.append("writer: %s" % e)
+
+    threads = [threading.Thread(target=read, args=(slot,)) for slot in range(readers)]
+    threads.append(threading.Thread(target=write))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {
+        'readers': readers,
+        'reads_per_second': round(sum(reads) / seconds),
+        'writes_per_second': round(writes[0] / seconds),
+        'errors': errors,
+    }
+
+def compare_stores(expected: ProfileStore, actual: ProfileStore) -> List[str]:
+    """Differences between the contents and lookups of two stores"""
+    mismatches = []
+    expected_profiles = {profile['user_id']: profile for profile in expected.values()}
+    actual_profiles = {profile['user_id']: profile for profile in actual.values()}
+    if actual_profiles != expected_profiles or len(actual) != len(expected):
+        mismatches.append("stores differ: %d expected profiles, %d in %s" % (
+            len(expected_profiles), len(actual_profiles), type(actual).__name__))
+    for user_id in list(expected_profiles)[:50]:
+        email = expected_profiles[user_id]['email']
+        if actual.get_by_email(email) != expected.get_by_email(email):
+            mismatches.append("get_by_email %s differs" % email)
+        if (user_id in actual) != (user_id in expected) or actual.get(user_id) != expected.get(user_id):
+            mismatches.append("get %s differs" % user_id)
+    return mismatches
+
+def check_differential(expected: ProfileStore, actual: ProfileStore, factory: ProfileFactory, operations: int,
+                       between: Optional[Callable[[], None]] = None) -> List[str]:
+    """
+    Apply one random sequence of writes and deletes to both stores and
+    compare them; between, if given, runs every 100 operations
+    """
+    rng = random.Random(7)
+    for step in range(operations):
+        action = rng.random()
+        if action < 0.2:
+            user_id = "user-%d" % rng.randrange(200)
+            if expected.delete(user_id) != actual.delete(user_id):
+                return ["delete %s disagreed" % user_id]
+        elif action < 0.3:
+            batch = [factory(rng.randrange(200), version=step) for _ in range(rng.randrange(1, 20))]
+            expected.put_many(batch)
+            actual.put_many(batch)
+        else:
+            profile = factory(rng.randrange(200), version=step)
+            expected.put(profile)
+            actual.put(profile)
+        if between is not None and step % 100 == 99:
+            between()
+    return compare_stores(expected, actual)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark profile store write latency against store size")
+    parser.add_argument('--sizes', default="1000,10000,100000,1000000", help="Comma-separated store sizes")
+    parser.add_argument('--upserts', type=int, default=500, help="Timed upserts per size")
+    parser.add_argument('--json-max', type=int, default=10000, help="Largest size timed for the JSON store")
+    parser.add_argument('--readers', type=int, default=4, help="Reader threads in the concurrency check")
+    parser.add_argument('--seconds', type=float, default=3.0, help="Length of the concurrency check")
+    parser.add_argument('--max-growth', type=float, default=3.0,
+                        help="Largest allowed ratio of median upsert latency, largest to smallest size")
+    parser.add_argument('--directory', help="Where to create the stores (default a temporary directory)")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    factory = ProfileFactory()
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory(dir=args.directory) as tmp:
+        directory = Path(tmp)
+        mismatches: List[str] = []
+        json_results = []
+        store = JsonProfileStore(directory / 'profiles.json')
+        manager = ProfileManager(directory, store=store)
+        stored = 0
+        for size in (size for size in sizes if size <= args.json_max):
+            fill(store, factory, stored, size)
+            # Fewer timed writes, as each rewrites the whole file
+            result = time_upserts(manager, factory, size, 20, rng)
+            stored = result.pop('next_user')
+            json_results.append(result)
+
+        sqlite_results = []
+        store = SQLiteProfileStore(directory / 'profiles.db')
+        manager = ProfileManager(directory, store=store)
+        stored = 0
+        try:
+            for size in sizes:
+                result = {'fill_per_second': round(fill(store, factory, stored, size))}
+                result.update(time_upserts(manager, factory, size, args.upserts, rng))
+                stored = result.pop('next_user')
+                result['get_p50_ms'] = time_reads(store, size, args.upserts, rng)
+                sqlite_results.append(result)
+                print("sqlite %d profiles: upsert p50 %.3f ms, p99 %.3f ms" % (
+                    size, result['p50_ms'], result['p99_ms']), file=sys.stderr)
+            concurrency = check_concurrent(store, factory, sizes[-1], args.readers, args.seconds)
+            mismatches += concurrency['errors']
+            stats = store.stats()
+        finally:
+            store.close()
+
+    growth = sqlite_results[-1]['p50_ms'] / sqlite_results[0]['p50_ms']
+    if growth > args.max_growth:
+        mismatches.append("median upsert grew %.1fx from %d to %d profiles" % (growth, sizes[0], sizes[-1]))
+    for mismatch in mismatches[:20]:
+        print("MISMATCH %s" % mismatch, file=sys.stderr)
+    results = {
+        'suite': 'profile_store',
+        'mismatches': len(mismatches),
+        'sqlite': sqlite_results,
+        'sqlite_p50_growth': round(growth, 2),
+        'json': json_results,
+        'concurrency': {key: value for key, value in concurrency.items() if key != 'errors'},
+        'stats': stats,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Benchmark and differential check for sharded matching.
+
+Matches synthetic profiles against a synthetic catalog with ShardedMatcher
+and with a single-process JobMatcher, fails if any top-k differs (also
+after jobs are added, replaced and removed), and reports request latency
+for both paths.
+
+Usage (from backend/):
+    python -m benchmarks.bench_sharded_matcher --jobs 200000 --workers 8 --output results.json
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Dict, List, Optional
+
+from app.job_matcher import JobMatcher
+from app.sharded_matcher import ShardedMatcher
+from benchmarks.synthetic_jobs import generate_jobs, generate_profiles
+
+def _ranking(matches: List[Dict]) -> List:
+    return [(match['job']['id'], match['score_details']['total_score'],
+             sorted(match['score_details']['category_scores'].items()),
+             match['score_details']['cv_relevance']) for match in matches]
+
+def check_sharded(sharded: ShardedMatcher, profiles: List[Dict], k: int) -> List[str]:
+    """Compare every profile's sharded top-k with single-process matching"""
+    mismatches = []
+    catalog = sharded.catalog()
+    for profile in profiles:
+        expected = _ranking(JobMatcher(profile).match_jobs_top_k(catalog, k))
+        actual = _ranking(sharded.match_top_k(profile, k))
+        if actual != expected:
+            mismatches.append("sharded %s, k=%d: expected %s, got %s" % (
+                profile['user_id'], k, expected[:3], actual[:3]))
+    return mismatches
+
+def _latency_ms(run, repeat: int = 3) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return min(samples)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark and cross-check sharded matching")
+    parser.add_argument('--jobs', type=int, default=50000, help="Synthetic catalog size")
+    parser.add_argument('--workers', type=int, help="Worker processes (default MATCH_WORKERS or CPU count)")
+    parser.add_argument('--shards', type=int, help="Catalog shards (default MATCH_SHARDS or one per worker)")
+    parser.add_argument('--profiles', type=int, default=5, help="Synthetic profiles matched")
+    parser.add_argument('--k', type=int, default=25, help="Matches per request")
+    parser.add_argument('--output', help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    jobs = generate_jobs(args.jobs)
+    profiles = generate_profiles(args.profiles)
+    sharded = ShardedMatcher(jobs, workers=args.workers, shards=args.shards)
+    try:
+        started = time.perf_counter()
+        sharded.match_top_k(profiles[0], args.k)
+        first_request_ms = (time.perf_counter() - started) * 1000
+
+        mismatches = check_sharded(sharded, profiles, args.k) + check_sharded(sharded, profiles[:2], 1)
+        # Replace every 7th job, remove every 11th and add new ones, then recheck
+        sharded.add_jobs(dict(job, description=job['description'][::-1], updated_at="2025-02-01T00:00:00")
+                         for job in jobs[::7])
+        for job in jobs[::11]:
+            sharded.remove_job(job['id'])
+        sharded.add_jobs(dict(job, id="new-%s" % job['id']) for job in generate_jobs(args.jobs // 10, seed=1))
+        mismatches += check_sharded(sharded, profiles, args.k)
+        for mismatch in mismatches[:20]:
+            print("MISMATCH %s" % mismatch, file=sys.stderr)
+
+        catalog = sharded.catalog()
+        matcher = JobMatcher(profiles[0])
+        results = {
+            'suite': 'sharded_matcher',
+            'jobs': len(catalog),
+            'k': args.k,
+            'mismatches': len(mismatches),
+            'first_request_ms': round(first_request_ms, 1),
+            'single_process_ms': round(_latency_ms(lambda: matcher.match_jobs_top_k(catalog, args.k)), 1),
+            'sharded_ms': round(_latency_ms(lambda: sharded.match_top_k(profiles[0], args.k)), 1),
+            'stats': sharded.stats(),
+        }
+    finally:
+        sharded.shutdown()
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Synthetic CV generator for benchmarks.
+Builds reproducible PDF and DOCX CVs of a given page count and section layout
+without any network access or external fixtures.
+"""
+import io
+import random
+from typing import List
+
+import docx
+
+LAYOUTS = ('classic', 'numbered', 'flat', 'dense')
+LINES_PER_PAGE = 45
+
+_SECTIONS = {
+    'classic': ['Skills', 'Experience', 'Education', 'Projects', 'Certifications'],
+    # Headers only recognised by the parser's tolerant mode
+    'numbered': ['1. Skills:', '2. WORK EXPERIENCE —', '3. Education', '4) Projects', '5. Certifications:'],
+    # No headers at all: everything lands in raw_text only
+    'flat': [],
+    # Many short sections, so header classification dominates
+    'dense': ['Skills', 'Experience', 'Projects'],
+}
+
+_VOCABULARY = (
+    "python blockchain machine learning digital transformation innovation leadership "
+    "programme delivery stakeholder management cloud architecture generative ai web3 "
+    "smart contract automation workflow creative technology 3d modeling animation "
+    "strategy governance compliance agile scrum data analytics computer vision defi nft"
+).split()
+
+def generate_lines(pages: int, layout: str = 'classic', seed: int = 0) -> List[List[str]]:
+    """
+    Generate the text lines of a CV, grouped per page
+
+    Args:
+        pages: Number of pages to generate
+        layout: One of LAYOUTS
+        seed: Random seed, so the same arguments always give the same CV
+    """
+    if layout not in LAYOUTS:
+        raise ValueError("Unknown layout %s. Must be one of: %s" % (layout, ', '.join(LAYOUTS)))
+    rng = random.Random("%s-%d-%d" % (layout, pages, seed))
+    headers = _SECTIONS[layout]
+    section_every = 4 if layout == 'dense' else 15
+    result = []
+    line_number = 0
+    for _ in range(pages):
+        page = []
+        for _ in range(LINES_PER_PAGE):
+            if headers and line_number % section_every == 0:
+                page.append(headers[(line_number // section_every) % len(headers)])
+            else:
+                page.append(' '.join(rng.choice(_VOCABULARY) for _ in range(rng.randint(4, 12))))
+            line_number += 1
+        result.append(page)
+    return result
+
+def _pdf_escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """Write a minimal, valid PDF with one Helvetica text stream per page"""
+    count = len(pages)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            ' '.join("%d 0 R" % (4 + 2 * i) for i in range(count)), count)).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, lines in enumerate(pages):
+        objects.append((
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            "/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * i)
+        ).encode())
+        # Non-ASCII header dashes are not in the base font encoding
+        text = ' '.join("(%s) Tj T*" % _pdf_escape(line.encode('latin-1', 'replace').decode('latin-1'))
+                        for line in lines)
+        stream = ("BT /F1 10 Tf 16 TL 40 760 Td %s ET" % text).encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+def build_docx(pages: List[List[str]]) -> bytes:
+    """Write a DOCX with one paragraph per line and a page break between pages"""
+    document = docx.Document()
+    for number, lines in enumerate(pages):
+        if number:
+            document.add_page_break()
+        for line in lines:
+            document.add_paragraph(line)
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+def generate_cv(fmt: str, pages: int, layout: str = 'classic', seed: int = 0) -> bytes:
+    """Generate a synthetic CV file ('pdf' or 'docx') and return its bytes"""
+    lines = generate_lines(pages, layout, seed)
+    if fmt == 'pdf':
+        return build_pdf(lines)
+    if fmt == 'docx':
+        return build_docx(lines)
+    raise ValueError("Unsupported format: %s" % fmt)
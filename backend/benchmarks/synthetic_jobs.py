@@ -0,0 +1,103 @@
+"""
+Synthetic job catalog and CV generator for matcher benchmarks.
+All output is seeded so runs are reproducible.
+"""
+import random
+from typing import Dict, List
+
+_TECH_TERMS = [
+    'digital art', 'creative technology', 'digital design', '3d modeling', 'animation',
+    'ai', 'machine learning', 'creative ai', 'generative ai', 'computer vision',
+    'blockchain', 'web3', 'nft', 'smart contract', 'defi',
+    'automation', 'digital transformation', 'process optimization', 'workflow',
+    'innovation', 'emerging technology', 'digital strategy', 'technology leadership',
+]
+_FILLER = (
+    "we are hiring a team player to join our fast growing company and maintain "
+    "delivery across product engineering design marketing finance operations with "
+    "stakeholders clients partners python cloud data analytics agile programme "
+    "management governance compliance remote hybrid office benefits pension"
+).split()
+_TITLES = ['Program Manager', 'Technical Lead', 'Art Director', 'Data Scientist',
+           'Product Owner', 'Solutions Architect', 'Creative Technologist', 'Engineer']
+_LOCATIONS = ['Remote', 'Remote - UK', 'London', 'London (Remote Available)', 'Manchester',
+              'Work from home', 'Berlin', 'New York']
+_TYPES = ['Full-time', 'Contract', 'Part-time', 'Internship']
+
+def generate_jobs(count: int, seed: int = 0, words: int = 120) -> List[Dict]:
+    """Generate job dicts shaped like the Supabase jobs table"""
+    rng = random.Random(seed)
+    jobs = []
+    for number in range(count):
+        body = [rng.choice(_FILLER) for _ in range(words)]
+        for _ in range(rng.randint(0, 6)):
+            body.insert(rng.randrange(len(body) + 1), rng.choice(_TECH_TERMS))
+        jobs.append({
+            'id': "job-%d" % number,
+            'title': "%s %s" % (rng.choice(['Senior', 'Lead', 'Junior', '']), rng.choice(_TITLES)),
+            'company': "Company %d" % rng.randint(1, count // 4 + 1),
+            'location': rng.choice(_LOCATIONS),
+            'salary': str(rng.randrange(30000, 200000, 5000)),
+            'description': ' '.join(body).capitalize() + '.',
+            'employment_type': rng.choice(_TYPES),
+            'updated_at': "2025-01-%02dT00:00:00" % rng.randint(1, 28),
+        })
+    return jobs
+
+def generate_cv_data(seed: int = 0) -> Dict[str, List[str]]:
+    """Generate parsed CV data in the shape CVParser returns"""
+    rng = random.Random("cv-%d" % seed)
+    return {
+        'skills': [rng.choice(_TECH_TERMS) for _ in range(6)] + ['Python', 'Stakeholder management'],
+        'experience': [
+            "Led %s and %s programmes for %s clients" % (
+                rng.choice(_TECH_TERMS), rng.choice(_TECH_TERMS), rng.choice(_FILLER))
+            for _ in range(8)
+        ],
+        'education': ['MSc Computer Science'],
+        'projects': ['Built an nft marketplace'],
+        'certifications': rng.sample(['Certified Innovation Manager', 'Blockchain Developer Certificate',
+                                      'PRINCE2 Practitioner', 'AWS Solutions Architect'], 2),
+        'raw_text': [],
+    }
+
+def generate_profiles(count: int, seed: int = 0) -> List[Dict]:
+    """Generate profile dicts shaped like ProfileData.to_dict()"""
+    rng = random.Random("profiles-%d" % seed)
+    profiles = []
+    for number in range(count):
+        preferences = {}
+        if rng.random() < 0.5:
+            preferences['job_types'] = ['remote']
+        if rng.random() < 0.5:
+            preferences['min_salary'] = rng.randrange(40000, 150000, 10000)
+        profiles.append({
+            'user_id': "user-%d" % number,
+            'cv_data': generate_cv_data(seed * 100003 + number),
+            'email': "user%d@example.com" % number,
+            'preferences': preferences,
+            'last_updated': "2025-01-01T00:00:00",
+        })
+    return profiles
+
+def generate_near_duplicates(jobs: List[Dict], count: int, seed: int = 0, edits: float = 0.03) -> List[Dict]:
+    """
+    Re-posts of randomly chosen jobs with a few words of the description
+    replaced, inserted or dropped, as aggregated feeds send them
+    """
+    rng = random.Random("dupes-%d" % seed)
+    duplicates = []
+    for number in range(count):
+        job = rng.choice(jobs)
+        body = job['description'].split()
+        for _ in range(max(1, int(len(body) * edits))):
+            position = rng.randrange(len(body))
+            action = rng.random()
+            if action < 0.4:
+                body[position] = rng.choice(_FILLER)
+            elif action < 0.7:
+                body.insert(position, rng.choice(_FILLER))
+            elif len(body) > 1:
+                del body[position]
+        duplicates.append(dict(job, id="%s-dup-%d" % (job['id'], number), description=' '.join(body)))
+    return duplicates
@@ -0,0 +1,27 @@
+"""
+Shared fixtures for the backend tests: small, seeded synthetic catalogs and
+profiles from the benchmark generators.
+"""
+import logging
+from typing import Dict, List
+
+import pytest
+
+from benchmarks.synthetic_jobs import generate_cv_data, generate_jobs, generate_profiles
+
+logging.getLogger('app').setLevel(logging.WARNING)
+
+@pytest.fixture(scope='session')
+def jobs() -> List[Dict]:
+    """Synthetic job catalog"""
+    return generate_jobs(600)
+
+@pytest.fixture(scope='session')
+def cvs() -> List[Dict]:
+    """Parsed CV sections of a few synthetic CVs"""
+    return [generate_cv_data(seed) for seed in range(3)]
+
+@pytest.fixture(scope='session')
+def profiles() -> List[Dict]:
+    """A few synthetic profile dicts, shaped like ProfileData.to_dict()"""
+    return generate_profiles(3)
@@ -0,0 +1,43 @@
+"""
+Tests for batch CV ingestion: user_ids derived from file paths, and files
+whose user_id is already taken within a batch.
+"""
+import pytest
+
+from app.batch_ingest import BatchIngestor, user_id_from_filename
+from app.cv_pool import CVParsePool
+from app.profile_manager import ProfileManager
+from benchmarks.synthetic_cv import generate_cv
+
+@pytest.mark.parametrize('name, user_id', [
+    ('cv.pdf', 'cv'),
+    ('partnerA/cv.pdf', 'partnera.cv'),
+    ('partnerB/cv.pdf', 'partnerb.cv'),
+    ('partnerA.cv.pdf', 'partnera_cv'),
+    ('../Jane Doe.docx', 'jane_doe'),
+    ('batch\\CV.pdf', 'batch.cv'),
+    ('.pdf', 'pdf'),
+])
+def test_user_id_from_path(name, user_id):
+    assert user_id_from_filename(name) == user_id
+
+def test_duplicate_user_ids_fail_instead_of_overwriting(tmp_path):
+    pool = CVParsePool(max_workers=1)
+    manager = ProfileManager(str(tmp_path))
+    sources = [
+        ('partnerA/cv.pdf', generate_cv('pdf', 1, seed=1)),
+        ('partnerB/cv.pdf', generate_cv('pdf', 1, seed=2)),
+        ('partnerA/CV.pdf', generate_cv('pdf', 1, seed=3)),
+    ]
+    try:
+        records = list(BatchIngestor(pool, manager).run(sources))
+    finally:
+        pool.shutdown()
+        manager.profiles.close()
+    by_file = {record['file']: record for record in records if 'file' in record}
+    assert by_file['partnerA/cv.pdf']['user_id'] == 'partnera.cv'
+    assert by_file['partnerB/cv.pdf']['user_id'] == 'partnerb.cv'
+    assert not by_file['partnerA/CV.pdf']['success']
+    assert 'partnerA/cv.pdf' in by_file['partnerA/CV.pdf']['error']
+    summary = records[-1]['summary']
+    assert summary['profiles_written'] == 2 and summary['failed'] == 1
@@ -0,0 +1,44 @@
+"""
+Tests for section keywords registered at runtime: the parse cache keys
+results by the keyword table, and pool workers started before the change
+parse with the new keywords.
+"""
+import asyncio
+
+import pytest
+
+from app.cv_cache import CVCache
+from app.cv_parser import CVParser
+from app.cv_pool import CVParsePool
+from benchmarks.synthetic_cv import build_docx
+
+CV = build_docx([['Skills', 'Python', 'Awards', 'Best paper 2020']])
+
+@pytest.fixture
+def section_keywords():
+    """Restore CVParser's keyword table after the test"""
+    original = {section: list(keywords) for section, keywords in CVParser.SECTION_KEYWORDS.items()}
+    yield
+    CVParser.SECTION_KEYWORDS = original
+
+def test_new_keywords_change_the_cache_key(section_keywords):
+    cache = CVCache()
+    parser = CVParser(cache=cache)
+    before = parser.parse_cv_bytes(CV, 'cv.docx')
+    assert 'awards' not in before
+    CVParser.add_section_keywords('awards', ['awards'])
+    after = CVParser(cache=cache).parse_cv_bytes(CV, 'cv.docx')
+    assert after['awards'] == ['Best paper 2020']
+    assert after['skills'] == ['Python']
+
+def test_running_pool_workers_see_new_keywords(section_keywords):
+    pool = CVParsePool(max_workers=1, cache=CVCache())
+    try:
+        before = asyncio.run(pool.parse(CV, 'cv.docx'))
+        assert 'awards' not in before
+        CVParser.add_section_keywords('awards', ['awards'])
+        after = asyncio.run(pool.parse(CV, 'cv.docx'))
+        assert after['awards'] == ['Best paper 2020']
+        assert after['skills'] == ['Python']
+    finally:
+        pool.shutdown()
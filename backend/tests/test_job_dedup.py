@@ -0,0 +1,30 @@
+"""
+Tests for JobDeduplicator settings, its size bound and jobs without ids.
+"""
+from app.job_dedup import JobDeduplicator
+
+def test_zero_threshold_is_kept(monkeypatch):
+    monkeypatch.setenv('JOB_DEDUP_THRESHOLD', '0.9')
+    assert JobDeduplicator(threshold=0.0).threshold == 0.0
+    assert JobDeduplicator().threshold == 0.9
+
+def test_bounded_index_drops_least_recently_seen(jobs):
+    deduplicator = JobDeduplicator(max_jobs=50)
+    deduplicator.add_jobs(jobs[:50])
+    # Seeing a job again makes it the most recent
+    deduplicator.add_job(jobs[0])
+    deduplicator.add_jobs(jobs[50:60])
+    assert len(deduplicator) == 50 and deduplicator.stats()['evictions'] == 10
+    assert deduplicator.cluster_of(jobs[0]['id']) is not None
+    assert deduplicator.cluster_of(jobs[1]['id']) is None
+
+def test_unique_over_a_batch_larger_than_the_bound(jobs):
+    reposts = [dict(job, id=job['id'] + '-repost') for job in jobs[:30]]
+    batch = [job for pair in zip(jobs[:30], reposts) for job in pair]
+    unique = JobDeduplicator(max_jobs=10).unique(batch)
+    assert [job['id'] for job in unique] == [job['id'] for job in jobs[:30]]
+
+def test_jobs_without_ids(jobs):
+    batch = [{key: value for key, value in job.items() if key != 'id'} for job in jobs[:20]]
+    unique = JobDeduplicator().unique(batch + batch[:5] + jobs[20:25])
+    assert unique == batch + jobs[20:25]
@@ -0,0 +1,43 @@
+"""
+Tests for JobIndex lookups against a scan of the job texts, across adds,
+replacements and removals.
+"""
+import random
+
+from app.job_index import JobIndex
+from app.job_text import job_text
+
+TERMS = ['a', 'y', '3d', 'go', 'ui', 'api', 'sql', 'python', 'machine learning', 'data',
+         'react', 'design', 'ux/ui', 'senior', 'ops', ' ', 'no-such-term']
+
+def _scan(index: JobIndex, term: str):
+    return {job.id for job in index if term in job_text(job)}
+
+def _check(index: JobIndex):
+    for term in TERMS:
+        assert index.jobs_with(term) == _scan(index, term), term
+    candidates, hits = index.hit_matrix(TERMS)
+    expected = [job.id for job in sorted(index, key=lambda job: index.position(job.id))
+                if any(term and term in job_text(job) for term in TERMS)]
+    assert candidates == expected
+    assert hits.shape == (len(candidates), len(TERMS))
+    for row, job_id in enumerate(candidates):
+        text = index.text(job_id)
+        assert [bool(value) for value in hits[row]] == [bool(term) and term in text for term in TERMS]
+
+def test_lookups_match_a_scan(jobs):
+    index = JobIndex(jobs[:300])
+    _check(index)
+    rng = random.Random(7)
+    for job in rng.sample(jobs[:300], 100):
+        index.remove_job(job['id'])
+    # New jobs reuse freed slots, replacements keep theirs
+    index.add_jobs(jobs[300:350])
+    index.add_jobs(dict(job, title=job['title'] + ' 3D', updated_at='2030-01-01T00:00:00')
+                   for job in jobs[:20])
+    _check(index)
+
+def test_hit_matrix_rows_only_for_candidates(jobs):
+    index = JobIndex(jobs[:300])
+    candidates, hits = index.hit_matrix(['no-such-term'], ['no such unit'])
+    assert candidates == [] and hits.shape == (0, 2)
@@ -0,0 +1,423 @@
+"""
+Behavioural tests for job scoring and matching.
+
+Scores are checked against a frozen copy of the original scoring rules
+(ReferenceScorer) and a textbook BM25 (reference_bm25); the batch, indexed,
+top-k and reverse matching paths are checked against per-job scoring, and a
+retuned taxonomy against the reference under it.
+"""
+import json
+import math
+import os
+import random
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+import pytest
+
+from app.bm25_engine import SECTIONS, BM25Index, BM25Scorer
+from app.job_index import JobIndex
+from app.job_matcher import JobMatcher, TechArtisticScorer
+from app.job_record import as_records
+from app.job_text import JobText, unit_hashes
+from app.keyword_matcher import KeywordMatcher
+from app.reverse_matcher import ReverseMatcher
+from app.scorer_cache import ScorerCache
+from app.taxonomy import Taxonomy, TaxonomyStore, taxonomy_store
+from app.text_scan import TextScanner
+from benchmarks.synthetic_jobs import generate_profiles
+
+# Frozen copy of the original keyword lists; the reference never changes
+REFERENCE_CATEGORIES = {
+    'digital_art': ['digital art', 'creative technology', 'digital design', '3d modeling', 'animation'],
+    'ai_creative_tools': ['ai', 'machine learning', 'creative ai', 'generative ai', 'computer vision'],
+    'blockchain_creative': ['blockchain', 'web3', 'nft', 'smart contract', 'defi'],
+    'digital_assistance': ['automation', 'digital transformation', 'process optimization', 'workflow'],
+    'tech_innovation': ['innovation', 'emerging technology', 'digital strategy', 'technology leadership']
+}
+REFERENCE_BONUSES = {'tech_innovation': {'innovation': 2}, 'blockchain_creative': {'blockchain': 2}}
+# A retuned taxonomy for the hot-reload tests: new keywords and category,
+# another cap and bonus
+TUNED_TAXONOMY = {
+    'categories': dict(REFERENCE_CATEGORIES, ai_creative_tools=REFERENCE_CATEGORIES['ai_creative_tools'] + ['python'],
+                       creative_direction=['art director', 'creative', 'design']),
+    'category_cap': 5,
+    'certification_bonuses': dict(REFERENCE_BONUSES, ai_creative_tools={'aws': 1}),
+}
+
+class ReferenceScorer:
+    """
+    The original per-keyword, per-category scoring loop, kept for comparison.
+    Relevance follows the token semantics introduced with the job text
+    cache: skills match as whole word phrases (longer phrases as each of
+    their 3-word windows), certification and experience lines match when
+    they share a word longer than 3 characters with the job.
+    """
+
+    def __init__(self, cv_data: Dict[str, List[str]], taxonomy: Optional[Dict] = None):
+        self.cv_data = cv_data
+        taxonomy = taxonomy or {}
+        self.categories = taxonomy.get('categories', REFERENCE_CATEGORIES)
+        self.category_cap = taxonomy.get('category_cap', 4)
+        self.bonuses = taxonomy.get('certification_bonuses', REFERENCE_BONUSES)
+        self.cv_keywords = set()
+        for section in ('skills', 'experience', 'certifications'):
+            for line in cv_data.get(section, []):
+                self.cv_keywords.update(line.lower().split())
+
+    def _score_category(self, job_description: str, category: str, keywords: List[str]) -> int:
+        description_lower = job_description.lower()
+        base_score = sum(1 for keyword in keywords if keyword in description_lower)
+        cv_bonus = sum(1 for keyword in keywords
+                       if keyword in self.cv_keywords and keyword in description_lower)
+        certifications = self.cv_data.get('certifications', [])
+        for term, points in self.bonuses.get(category, {}).items():
+            if any(c for c in certifications if term in c.lower()):
+                cv_bonus += points
+        return min(self.category_cap, base_score + cv_bonus)
+
+    @staticmethod
+    def _words(text: str) -> List[str]:
+        return re.findall(r"\w[\w+#]*", text.lower())
+
+    def _has_phrase(self, phrase: str, padded: str) -> bool:
+        words = self._words(phrase)
+        windows = [words[start:start + 3] for start in range(max(1, len(words) - 2))]
+        return bool(words) and all(' %s ' % ' '.join(window) in padded for window in windows)
+
+    def _calculate_cv_relevance(self, job_description: str) -> int:
+        words = self._words(job_description)
+        padded = ' %s ' % ' '.join(words)
+        relevance_score = min(3, sum(1 for skill in self.cv_data.get('skills', [])
+                                     if self._has_phrase(skill, padded)))
+        relevance_score += min(2, sum(1 for cert in self.cv_data.get('certifications', [])
+                                      if any(word in words for word in self._words(cert) if len(word) > 3)))
+        relevance_score += min(3, sum(1 for exp in self.cv_data.get('experience', [])
+                                      if any(word in words for word in self._words(exp) if len(word) > 3)))
+        return relevance_score
+
+    def score_job(self, job: Dict) -> Dict:
+        description = f"{job.get('title', '')} {job.get('description', '')}"
+        scores = {}
+        matched_keywords = set()
+        for category, keywords in self.categories.items():
+            score = self._score_category(description, category, keywords)
+            if score > 0:
+                scores[category] = score
+                matched_keywords.update(kw for kw in keywords if kw in description.lower())
+        total_score = sum(scores.values())
+        cv_relevance = self._calculate_cv_relevance(description)
+        total_score += cv_relevance
+        return {
+            'total_score': total_score,
+            'category_scores': scores,
+            'matched_keywords': list(matched_keywords),
+            'cv_relevance': cv_relevance,
+            'high_priority': total_score >= 15
+        }
+
+def reference_bm25(jobs: List[Dict], cv_data: Dict, k1: float = 1.2, b: float = 0.75) -> Dict[str, Dict]:
+    """Textbook BM25 share of the CV's attainable score, one job at a time"""
+    def words(text: str) -> List[str]:
+        return re.findall(r"\w[\w+#]*", text.lower())
+    counts = {job['id']: Counter(words("%s %s" % (job.get('title', ''), job.get('description', ''))))
+              for job in jobs}
+    df = Counter(term for job_counts in counts.values() for term in job_counts)
+    average = sum(sum(job_counts.values()) for job_counts in counts.values()) / len(counts)
+    idf = {term: math.log(1 + (len(counts) - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()}
+    queries = {'all': {term for section in SECTIONS for line in cv_data.get(section, []) for term in words(line)}}
+    queries.update({section: {term for line in cv_data.get(section, []) for term in words(line)}
+                    for section in SECTIONS})
+    results = {}
+    for job_id, job_counts in counts.items():
+        length = sum(job_counts.values())
+        shares = {}
+        for name, terms in queries.items():
+            attainable = sum(idf.get(term, 0) for term in terms)
+            score = sum(idf[term] * job_counts[term] * (k1 + 1)
+                        / (job_counts[term] + k1 * (1 - b + b * length / average))
+                        for term in terms if job_counts.get(term))
+            shares[name] = min(1.0, round(score / attainable, 4)) if attainable else 0.0
+        results[job_id] = {
+            'total_score': shares['all'],
+            'category_scores': {section: shares[section] for section in SECTIONS if shares[section] > 0},
+            'matched_keywords': sorted(term for term in queries['all'] if job_counts.get(term)),
+        }
+    return results
+
+def _comparable(details: Dict) -> Dict:
+    """Score details with order-insensitive keyword lists and no metadata"""
+    return {
+        'total_score': details['total_score'],
+        'category_scores': details['category_scores'],
+        'matched_keywords': sorted(details['matched_keywords']),
+        'cv_relevance': details['cv_relevance'],
+        'high_priority': details['high_priority'],
+    }
+
+def _ranked(matches: List[Optional[Dict]], k: int) -> List:
+    """Exhaustive top-k: highest total first, ties in catalog order"""
+    found = [match for match in matches if match]
+    found.sort(key=lambda match: -match['score_details']['total_score'])
+    return [(match['job']['id'], _comparable(match['score_details'])) for match in found[:k]]
+
+def _matches(matches: List[Dict]) -> List:
+    return [(match['job']['id'], _comparable(match['score_details'])) for match in matches]
+
+def test_scores_match_reference(jobs, cvs):
+    for cv_data in cvs:
+        scorer = TechArtisticScorer(cv_data)
+        reference = ReferenceScorer(cv_data)
+        for job in jobs:
+            assert _comparable(scorer.score_job(job)) == _comparable(reference.score_job(job)), job['id']
+
+def test_automaton_matches_substring_search():
+    rng = random.Random(0)
+    alphabet = 'abc de'
+    categories = {
+        'c%d' % n: [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))) for _ in range(40)]
+        for n in range(10)
+    }
+    categories['real'] = [kw for keywords in REFERENCE_CATEGORIES.values() for kw in keywords]
+    automaton = KeywordMatcher(categories, use_automaton=True)
+    substring = KeywordMatcher(categories, use_automaton=False)
+    for number in range(2000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 200)))
+        if number % 2:
+            text += ' ' + rng.choice(categories['real'])
+        assert automaton.scan(text) == substring.scan(text), text
+
+def test_text_scanner_matches_per_text_search():
+    rng = random.Random(3)
+    pieces = ['c', 'c++', 'c#', 'python', 'machine', 'learning', 'ai', 'r', 'go', 'x', '+', '#', '++', '-',
+              ' ', '  ', '.', '\n', 'a_b', 'ai+', 'learn', '_', '3d', 'web3', '         ', '-- --']
+    keywords = ['ai', 'c+', 'machine learning', 'r', '#', '3d', 'web3', 'x y', '\nx', 'é']
+    units = ['c++', 'c#', 'python', 'machine learning', 'r', 'go', 'ai', 'machine learning ai', 'a_b',
+             'learn', '3d', 'c++ c# python', 'x', 'x x', 'go go go', 'é']
+    for case_keywords, case_units in [(keywords, units), ([], units), (keywords, []), ([], []), (['ai'], ['r r'])]:
+        scanner = TextScanner(case_keywords, case_units)
+        hashes = unit_hashes(case_units)
+        for _ in range(300):
+            texts = [''.join(rng.choice(pieces) + rng.choice(['', ' ', '+', '#', ' - '])
+                             for _ in range(rng.randrange(25)))
+                     for _ in range(rng.randrange(6))]
+            rows, columns = scanner.scan(texts)
+            found = np.zeros((len(texts), len(case_keywords) + len(case_units)), dtype=bool)
+            found[rows, columns] = True
+            for row, text in enumerate(texts):
+                expected = [keyword in text for keyword in case_keywords] + list(JobText(text).contains(hashes))
+                assert found[row].tolist() == expected, text
+
+def test_batch_scoring_matches_per_job_for_non_ascii_text(jobs, profiles):
+    edited = [dict(job, id='%s-accented' % job['id'], description=job['description'] + ' café naïve') if number % 3 == 0 else job
+              for number, job in enumerate(jobs[:200])]
+    scorer = TechArtisticScorer(profiles[0]['cv_data'])
+    for job, batch_score in zip(edited, scorer.score_jobs(edited)):
+        assert _comparable(batch_score) == _comparable(scorer.score_job(job)), job['id']
+
+def test_batch_scoring_matches_per_job(jobs, profiles):
+    for profile in profiles:
+        matcher = JobMatcher(profile)
+        batch_scores = matcher.scorer.score_jobs(jobs)
+        batch_matches = matcher.match_jobs(jobs)
+        for job, batch_score, batch_match in zip(jobs, batch_scores, batch_matches):
+            assert _comparable(batch_score) == _comparable(matcher.scorer.score_job(job)), job['id']
+            single = matcher.match_job(job)
+            assert (single is None) == (batch_match is None), job['id']
+            if single:
+                assert _comparable(single['score_details']) == _comparable(batch_match['score_details'])
+
+def test_index_top_k_matches_exhaustive_ranking(jobs, profiles):
+    full = JobIndex(jobs)
+    # Expire every third job, then re-add half of those with new text
+    incremental = JobIndex(jobs)
+    for job in jobs[::3]:
+        incremental.remove_job(job['id'])
+    changed = [dict(job, description=job['description'][::-1]) for job in jobs[::6]]
+    incremental.add_jobs(changed)
+    kept = [job for number, job in enumerate(jobs) if number % 3]
+    for index, catalog in ((full, jobs), (incremental, kept + changed)):
+        for profile in profiles:
+            matcher = JobMatcher(profile)
+            assert _matches(matcher.match_top_k(index, 25)) == _ranked(matcher.match_jobs(catalog), 25)
+
+@pytest.mark.parametrize('points', [3, 4])
+def test_index_top_k_with_high_certification_bonuses(jobs, profiles, points):
+    # With 4 points the bonuses alone reach MIN_MATCH_SCORE, so jobs without
+    # any keyword or relevance unit match too
+    original = taxonomy_store.current()
+    bonuses = {'tech_innovation': {'innovation': points}, 'blockchain_creative': {'blockchain': points}}
+    taxonomy_store.replace(Taxonomy.from_dict(dict(original.to_dict(), certification_bonuses=bonuses)))
+    try:
+        catalog = jobs[:200] + [{'id': 'plain', 'title': 'Clerk', 'location': 'Remote',
+                                 'description': 'Filing and phone calls.'}]
+        index = JobIndex(catalog)
+        for profile in profiles:
+            matcher = JobMatcher(profile)
+            expected = _ranked(matcher.match_jobs(catalog), 300)
+            assert _matches(matcher.match_top_k(index, 300)) == expected
+            assert _matches(matcher.match_jobs_top_k(catalog, 300)) == expected
+        # Only the first profile holds certifications for both bonuses
+        first = _ranked(JobMatcher(profiles[0]).match_jobs(catalog), 300)
+        assert ('plain' in [job_id for job_id, _ in first]) == (points == 4)
+    finally:
+        taxonomy_store.replace(original)
+
+@pytest.mark.parametrize('k', [1, 25, 500])
+def test_match_jobs_top_k_matches_exhaustive_ranking(jobs, profiles, k):
+    for profile in profiles:
+        matcher = JobMatcher(profile)
+        assert _matches(matcher.match_jobs_top_k(jobs, k)) == _ranked(matcher.match_jobs(jobs), k)
+
+def _reverse_expected(matchers: List[JobMatcher], job: Dict) -> List:
+    return sorted((matcher.profile['user_id'], str(_comparable(match['score_details'])))
+                  for matcher in matchers for match in [matcher.match_job(job)] if match)
+
+def _reverse_actual(reverse: ReverseMatcher, job: Dict) -> List:
+    return sorted((match['user_id'], str(_comparable(match['score_details']))) for match in reverse.match(job))
+
+def test_reverse_match_matches_per_profile_matching(jobs):
+    profiles = generate_profiles(100, seed=1)
+    # Index extra profiles, then replace and remove some, so slot reuse and
+    # compaction are covered too
+    extra = [dict(profile, user_id="extra-" + profile['user_id'])
+             for profile in generate_profiles(len(profiles), seed=2)]
+    reverse = ReverseMatcher(extra[::2] + profiles + extra[1::2])
+    for profile in extra:
+        reverse.remove_profile(profile['user_id'])
+    for profile in profiles[::3]:
+        reverse.add_profile(dict(profile, last_updated="2025-02-01T00:00:00"))
+    matchers = [JobMatcher(profile) for profile in profiles]
+    # Jobs cut down to a few words score few profiles above the threshold
+    # on their own, so the inverted indexes narrow the candidates
+    short = [dict(job, id=job['id'] + '-short', description=' '.join(job['description'].split()[:number % 12]))
+             for number, job in enumerate(jobs[:60])]
+    partial = 0
+    for job in jobs[:60] + short:
+        expected = _reverse_expected(matchers, job)
+        assert _reverse_actual(reverse, job) == expected, job['id']
+        partial += 0 < len(expected) < len(profiles)
+    assert partial
+
+def test_minimum_salary_only_applies_in_its_currency(jobs):
+    profiles = [dict(profile, preferences={'min_salary': 90000, 'currency': currency})
+                for profile, currency in zip(generate_profiles(3, seed=1), ['GBP', 'USD', 'EUR'])]
+    salaries = ['£80,000', '$80,000', '80000 EUR', '80000', '£95,000']
+    catalog = [dict(job, id="%s-%d" % (job['id'], number), salary=salary, location='Remote')
+               for job in jobs[:20] for number, salary in enumerate(salaries)]
+    for profile, kept in zip(profiles, [{1, 2, 4}, {0, 2, 4}, {0, 1, 4}]):
+        matcher = JobMatcher(profile)
+        for job, record in zip(catalog, as_records(catalog)):
+            expected = int(job['id'].rsplit('-', 1)[1]) in kept
+            assert matcher._meets_basic_criteria(job) == expected, (profile['preferences'], job['salary'])
+            assert matcher._meets_basic_criteria(record) == expected
+    reverse = ReverseMatcher(profiles)
+    matchers = [JobMatcher(profile) for profile in profiles]
+    for job in catalog:
+        assert _reverse_actual(reverse, job) == _reverse_expected(matchers, job), job['id']
+
+def test_reverse_match_loads_source_on_first_match(jobs):
+    stored = {profile['user_id']: profile for profile in generate_profiles(20, seed=1)}
+    loads = []
+
+    def source():
+        loads.append(len(stored))
+        return list(stored.values())
+
+    reverse = ReverseMatcher(source=source)
+    # Changes before the first match are already in the source
+    removed = stored.pop('user-0')
+    reverse.profile_changed('user-0', None)
+    assert not loads and len(reverse) == 0
+    matchers = [JobMatcher(profile) for profile in stored.values()]
+    assert _reverse_actual(reverse, jobs[0]) == _reverse_expected(matchers, jobs[0])
+    assert loads == [19]
+    reverse.profile_changed('user-0', removed)
+    matchers.append(JobMatcher(removed))
+    for job in jobs[1:10]:
+        assert _reverse_actual(reverse, job) == _reverse_expected(matchers, job), job['id']
+    assert loads == [19]
+
+def test_bm25_matches_reference(jobs, cvs):
+    incremental = BM25Index(jobs[::2])
+    incremental.add_jobs(jobs[1::2])
+    for job in jobs[::4]:
+        incremental.remove_job(job['id'])
+    incremental.add_jobs(jobs[::4])
+    for cv_data in cvs:
+        expected = reference_bm25(jobs, cv_data)
+        for index in (BM25Index(jobs), incremental):
+            actual = BM25Scorer(cv_data, index).score_catalog()
+            for job_id, details in expected.items():
+                got = actual[job_id]
+                assert abs(got['total_score'] - details['total_score']) <= 1e-4, job_id
+                assert got['matched_keywords'] == details['matched_keywords'], job_id
+                assert got['category_scores'].keys() == details['category_scores'].keys(), job_id
+
+def test_bm25_scores_jobs_without_ids(jobs, cvs):
+    anonymous = [{key: value for key, value in job.items() if key != 'id'} for job in jobs[:50]]
+    index = BM25Index()
+    scorer = BM25Scorer(cvs[0], index)
+    assert scorer.score_jobs(anonymous) == BM25Scorer(cvs[0], BM25Index(jobs[:50])).score_jobs(jobs[:50])
+    scorer.score_jobs(anonymous)
+    assert len(index) == 50
+
+def test_bm25_bounded_index_keeps_recent_jobs(jobs, cvs):
+    index = BM25Index(max_jobs=40)
+    scorer = BM25Scorer(cvs[0], index)
+    assert len(scorer.score_jobs(jobs[:100])) == 100
+    assert len(index) == 40 and index.stats()['evictions'] == 60
+    # Scoring a job again makes it the most recent, so it outlives the others
+    scorer.score_job(jobs[60])
+    scorer.score_jobs(jobs[100:139])
+    assert jobs[60]['id'] in index and jobs[61]['id'] not in index
+
+@pytest.fixture
+def tuned_taxonomy():
+    """Swap the retuned taxonomy in for one test; yields (original, tuned)"""
+    original = taxonomy_store.current()
+    tuned = Taxonomy.from_dict(TUNED_TAXONOMY)
+    yield original, tuned
+    taxonomy_store.replace(original)
+
+def test_taxonomy_swap(jobs, cvs, profiles, tuned_taxonomy):
+    original, tuned = tuned_taxonomy
+    jobs = jobs[:200]
+    before = [TechArtisticScorer(cv_data) for cv_data in cvs]
+    cache = ScorerCache()
+    cached = [cache.get_scorer(profile) for profile in profiles]
+    reverse = ReverseMatcher(profiles, scorer_cache=cache)
+    taxonomy_store.replace(tuned)
+
+    # New scorers follow the tuned taxonomy; scorers built earlier keep the old one
+    for cv_data, old_scorer in zip(cvs, before):
+        for scorer, reference, taxonomy in ((TechArtisticScorer(cv_data), ReferenceScorer(cv_data, TUNED_TAXONOMY),
+                                             tuned),
+                                            (old_scorer, ReferenceScorer(cv_data), original)):
+            for job in jobs:
+                details = scorer.score_job(job)
+                assert _comparable(details) == _comparable(reference.score_job(job)), job['id']
+                assert details['taxonomy_version'] == taxonomy.version
+    for profile, old_scorer in zip(profiles, cached):
+        scorer = cache.get_scorer(profile)
+        assert scorer is not old_scorer and scorer.taxonomy is tuned
+    matchers = [JobMatcher(profile) for profile in profiles]
+    for job in jobs:
+        assert _reverse_actual(reverse, job) == _reverse_expected(matchers, job), job['id']
+        assert all(match['score_details']['taxonomy_version'] == tuned.version for match in reverse.match(job))
+    assert not taxonomy_store.is_current(before[0].score_job(jobs[0]))
+
+def test_taxonomy_file_reload(tmp_path):
+    path = tmp_path / 'taxonomy.json'
+    path.write_text(json.dumps(taxonomy_store.current().to_dict()), encoding='utf-8')
+    store = TaxonomyStore(str(path), reload_interval=0)
+    tuned = Taxonomy.from_dict(TUNED_TAXONOMY)
+    # A malformed file keeps the last good taxonomy
+    for content in (json.dumps(TUNED_TAXONOMY), '{"categories": ['):
+        path.write_text(content, encoding='utf-8')
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 1000))
+        assert store.current().version == tuned.version
+    assert store.stats()['failed_reloads'] == 1
@@ -0,0 +1,17 @@
+"""
+Tests for the employment type filter built from requested types.
+"""
+import pytest
+
+from app.job_record import EmploymentType
+
+def test_filter_parses_requested_types():
+    assert EmploymentType.parse_filter(['Full-time', 'freelance', 'contract']) == {
+        EmploymentType.FULL_TIME, EmploymentType.CONTRACT}
+    assert EmploymentType.parse_filter([]) == set()
+
+@pytest.mark.parametrize('value', ['time', 'FT', ''])
+def test_filter_rejects_unknown_types(value):
+    # Filtering on no type would drop every job
+    with pytest.raises(ValueError, match='Unknown employment type'):
+        EmploymentType.parse_filter(['full-time', value])
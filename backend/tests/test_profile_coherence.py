@@ -0,0 +1,220 @@
+"""
+Tests for profile stores shared by several processes: concurrent writers
+lose no write, even with one writer killed; a write half done by a dead
+process is recovered; and readers' refresh() reports exactly the profiles
+changed since the last call.
+"""
+import json
+import logging
+import multiprocessing
+import queue
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+from app.profile_log import COUNTER_WRITES, OP_PUT, LogProfileStore, encode_record
+from app.profile_manager import ProfileManager
+from app.profile_mmap import MmapProfileStore
+from app.profile_store import BACKENDS, open_profile_store
+from benchmarks.bench_profile_store import ProfileFactory
+
+SHARED_USERS = 10
+
+# Fresh interpreters, so no process inherits another's open store
+context = multiprocessing.get_context('spawn')
+
+@pytest.fixture(scope='module')
+def factory() -> ProfileFactory:
+    return ProfileFactory(pool=20)
+
+def _receive(results, processes: List) -> Dict:
+    """Next result from a worker; fails rather than waits if one has died"""
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            failed = [process.exitcode for process in processes if process.exitcode]
+            assert not failed, "worker process exited with %d" % failed[0]
+
+def write_worker(backend: str, directory: str, slot: int, writes: int, results) -> None:
+    """Write and delete this slot's users and the shared ones; report the last write to each"""
+    logging.getLogger('app').setLevel(logging.WARNING)
+    factory = ProfileFactory(pool=20)
+    rng = random.Random(slot)
+    store = open_profile_store(Path(directory), backend)
+    latest: Dict[str, Optional[Dict]] = {}
+    try:
+        for step in range(writes):
+            if rng.random() < 0.3:
+                user_id = "shared-%d" % rng.randrange(SHARED_USERS)
+            else:
+                user_id = "writer-%d-%d" % (slot, rng.randrange(writes // 4 + 1))
+            if rng.random() < 0.1:
+                store.delete(user_id)
+                latest[user_id] = None
+            else:
+                profile = factory(step)
+                profile['user_id'] = user_id
+                profile['last_updated'] = "writer-%d-step-%d" % (slot, step)
+                store.put(profile)
+                latest[user_id] = profile
+    finally:
+        store.close()
+    results.put(latest)
+
+def crashing_worker(backend: str, directory: str) -> None:
+    """Write batches until killed, likely in the middle of one"""
+    logging.getLogger('app').setLevel(logging.WARNING)
+    factory = ProfileFactory(pool=20)
+    store = open_profile_store(Path(directory), backend)
+    step = 0
+    while True:
+        batch = [factory(number) for number in range(step, step + 50)]
+        for profile in batch:
+            profile['user_id'] = "crashed-%d" % (step % 500)
+            step += 1
+        store.put_many(batch)
+
+def read_worker(backend: str, directory: str, requests, results) -> None:
+    """
+    Hold a ProfileManager open; per round, refresh and report how what it
+    saw differs from the changes the round made
+    """
+    logging.getLogger('app').setLevel(logging.WARNING)
+    manager = ProfileManager(directory, store=open_profile_store(Path(directory), backend), refresh_interval=0)
+    reported: Dict[str, Optional[Dict]] = {}
+    manager.add_listener(lambda user_id, data: reported.__setitem__(user_id, data))
+    manager.refresh(force=True)
+    results.put(["refresh reported %d changes before any" % len(reported)] if reported else [])
+    try:
+        while True:
+            expected = requests.get()
+            if expected is None:
+                return
+            errors = []
+            manager.refresh(force=True)
+            if set(reported) != set(expected):
+                errors.append("refresh reported %d profiles, %d changed (%d missed, %d extra)" % (
+                    len(reported), len(expected), len(set(expected) - set(reported)),
+                    len(set(reported) - set(expected))))
+            for user_id, profile in expected.items():
+                if reported.get(user_id) != profile:
+                    errors.append("listener got stale %s" % user_id)
+                stored = manager.get_profile(user_id)
+                if (stored.to_dict() if stored else None) != profile:
+                    errors.append("get_profile returned stale %s" % user_id)
+            reported.clear()
+            if manager.refresh(force=True):
+                errors.append("refresh without changes reported %d" % len(reported))
+            results.put(errors)
+    finally:
+        manager.profiles.close()
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_concurrent_writers_lose_no_write(tmp_path, backend):
+    results = context.Queue()
+    processes = [context.Process(target=write_worker, args=(backend, str(tmp_path), slot, 100, results))
+                 for slot in range(3)]
+    crashing = context.Process(target=crashing_worker, args=(backend, str(tmp_path)))
+    crashing.start()
+    for process in processes:
+        process.start()
+    time.sleep(random.uniform(0.5, 1.0))
+    crashing.kill()
+    latest = [_receive(results, processes) for _ in processes]
+    for process in processes:
+        process.join()
+    crashing.join()
+    assert [process.exitcode for process in processes] == [0] * len(processes)
+    store = open_profile_store(tmp_path, backend)
+    try:
+        assert sum(1 for _ in store.values()) == len(store)
+        for writes_by_user in latest:
+            for user_id, profile in writes_by_user.items():
+                if not user_id.startswith('shared-'):
+                    assert store.get(user_id) == profile, "lost write to %s" % user_id
+        # Each shared user holds one writer's last version of it
+        for number in range(SHARED_USERS):
+            user_id = "shared-%d" % number
+            finals = [writes_by_user[user_id] for writes_by_user in latest if user_id in writes_by_user]
+            if finals:
+                assert store.get(user_id) in finals
+    finally:
+        store.close()
+
+@pytest.mark.parametrize('backend', ['log', 'mmap'])
+def test_next_writer_recovers_an_interrupted_write(tmp_path, backend, factory):
+    # Two stores in one process hold separate file locks, as two processes would
+    whole = factory(1, version=1)
+    torn = encode_record(OP_PUT, 'user-torn', '', json.dumps(factory(2)).encode('utf-8'))
+    if backend == 'log':
+        dead, alive = LogProfileStore(tmp_path, compact_interval=0), LogProfileStore(tmp_path, compact_interval=0)
+        dead.put(factory(0))
+        # The writer counts its append before writing, then dies
+        dead._process_lock.increment(COUNTER_WRITES)
+        path = tmp_path / dead._active
+    else:
+        dead, alive = MmapProfileStore(tmp_path), MmapProfileStore(tmp_path)
+        dead.put(factory(0))
+        # Records written, index not yet updated
+        path = dead.data_path
+    with open(path, 'ab') as f:
+        f.write(encode_record(OP_PUT, whole['user_id'], whole['email'],
+                              json.dumps(whole, separators=(',', ':')).encode('utf-8')))
+        f.write(torn[:len(torn) // 2])
+    dead._process_lock.close()
+    if backend == 'mmap':
+        dead._open_lock.close()
+    try:
+        alive.put(factory(3))
+        assert alive.get('user-1') == whole
+        assert 'user-torn' not in alive
+        assert alive.refresh() == ['user-0', 'user-1']
+        assert sum(1 for _ in alive.values()) == 3
+    finally:
+        alive.close()
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_readers_refresh_exactly_the_changed_profiles(tmp_path, backend, factory):
+    store = open_profile_store(tmp_path, backend)
+    store.put_many([factory(number) for number in range(300)])
+    results = context.Queue()
+    requests = [context.Queue() for _ in range(2)]
+    processes = [context.Process(target=read_worker, args=(backend, str(tmp_path), inbox, results))
+                 for inbox in requests]
+    for process in processes:
+        process.start()
+    errors: List[str] = []
+    try:
+        for _ in processes:
+            errors += _receive(results, processes)
+        rng = random.Random(11)
+        for number in range(6):
+            expected: Dict[str, Optional[Dict]] = {}
+            for user in rng.sample(range(300), 10):
+                user_id = "user-%d" % user
+                if rng.random() < 0.2 and store.delete(user_id):
+                    expected[user_id] = None
+                else:
+                    profile = factory(user)
+                    profile['last_updated'] = "round-%d" % number
+                    store.put(profile)
+                    expected[user_id] = profile
+            # Readers must follow a compaction as well as new writes
+            if number % 3 == 2 and hasattr(store, 'compact'):
+                store.compact()
+            for inbox in requests:
+                inbox.put(expected)
+            for _ in processes:
+                errors += ["round %d: %s" % (number, error) for error in _receive(results, processes)]
+    finally:
+        for inbox in requests:
+            inbox.put(None)
+        for process in processes:
+            process.join()
+        store.close()
+    assert errors == []
+    assert [process.exitcode for process in processes] == [0] * len(processes)
@@ -0,0 +1,26 @@
+"""
+Tests for ProfileManager writes: each gets a new last_updated stamp, so
+scorers cached under the old one are not served for the edited profile.
+"""
+from app.job_matcher import TechArtisticScorer
+from app.profile_manager import ProfileData, ProfileManager
+from app.profile_store import SQLiteProfileStore
+from app.scorer_cache import ScorerCache
+
+def test_edit_through_a_loaded_profile_misses_cached_scorers(tmp_path, jobs, profiles):
+    manager = ProfileManager(str(tmp_path), store=SQLiteProfileStore(tmp_path / 'profiles.db'))
+    # Not the manager's cache, so nothing invalidates it, as in another worker process
+    cache = ScorerCache()
+    try:
+        manager.create_or_update_profile(ProfileData.from_dict(profiles[0]))
+        before = cache.get_scorer(manager.profiles.get(profiles[0]['user_id']))
+        loaded = manager.get_profile(profiles[0]['user_id'])
+        loaded.cv_data = profiles[1]['cv_data']
+        manager.create_or_update_profile(loaded)
+        stored = manager.profiles.get(profiles[0]['user_id'])
+        assert stored['last_updated'] != profiles[0]['last_updated']
+        after = cache.get_scorer(stored)
+        assert after is not before
+        assert after.score_jobs(jobs[:100]) == TechArtisticScorer(profiles[1]['cv_data']).score_jobs(jobs[:100])
+    finally:
+        manager.profiles.close()
@@ -0,0 +1,160 @@
+"""
+Tests for the profile stores: every backend against the whole-file JSON
+store, reads alongside a writer, and importing profiles.json, once, however
+many processes open the store at the same time.
+"""
+import json
+import logging
+import multiprocessing
+import random
+import threading
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from app.profile_log import LogProfileStore
+from app.profile_mmap import MmapProfileStore
+from app.profile_store import JsonProfileStore, ProfileStore, SQLiteProfileStore
+from benchmarks.bench_profile_store import ProfileFactory
+from benchmarks.synthetic_jobs import generate_profiles
+
+STORES = {
+    'sqlite': lambda directory: SQLiteProfileStore(directory / 'profiles.db'),
+    'log': lambda directory: LogProfileStore(directory / 'profile_log'),
+    'mmap': lambda directory: MmapProfileStore(directory / 'profile_mmap'),
+}
+
+@pytest.fixture(scope='module')
+def factory() -> ProfileFactory:
+    return ProfileFactory(pool=20)
+
+def _assert_same(expected: ProfileStore, actual: ProfileStore) -> None:
+    assert {profile['user_id']: profile for profile in actual.values()} == \
+        {profile['user_id']: profile for profile in expected.values()}
+    assert len(actual) == len(expected)
+    for user_id in ["user-%d" % number for number in range(0, 200, 7)]:
+        assert actual.get(user_id) == expected.get(user_id)
+        assert (user_id in actual) == (user_id in expected)
+        email = "user%s@example.com" % user_id[5:]
+        assert actual.get_by_email(email) == expected.get_by_email(email)
+
+@pytest.mark.parametrize('backend', sorted(STORES))
+def test_backends_match_the_json_store(tmp_path, backend, factory):
+    expected = JsonProfileStore(tmp_path / 'expected.json')
+    actual = STORES[backend](tmp_path)
+    rng = random.Random(7)
+    try:
+        for step in range(400):
+            action = rng.random()
+            if action < 0.2:
+                user_id = "user-%d" % rng.randrange(200)
+                assert actual.delete(user_id) == expected.delete(user_id)
+            elif action < 0.3:
+                batch = [factory(rng.randrange(200), version=step) for _ in range(rng.randrange(1, 20))]
+                expected.put_many(batch)
+                actual.put_many(batch)
+            else:
+                profile = factory(rng.randrange(200), version=step)
+                expected.put(profile)
+                actual.put(profile)
+            if step % 100 == 99 and hasattr(actual, 'compact'):
+                actual.compact()
+        _assert_same(expected, actual)
+        actual.close()
+        # And after reopening
+        actual = STORES[backend](tmp_path)
+        _assert_same(expected, actual)
+    finally:
+        actual.close()
+        expected.close()
+
+def test_reads_alongside_a_writer(tmp_path, factory):
+    store = SQLiteProfileStore(tmp_path / 'profiles.db')
+    store.put_many([factory(number) for number in range(200)])
+    errors: List[str] = []
+    stop = threading.Event()
+
+    def read(slot: int) -> None:
+        rng = random.Random(slot)
+        try:
+            while not stop.is_set():
+                user_id = "user-%d" % rng.randrange(200)
+                profile = store.get(user_id)
+                if profile is None or profile['user_id'] != user_id:
+                    errors.append("read %s returned %r" % (user_id, profile and profile.get('user_id')))
+                    return
+        except Exception as e:
+            errors.append("reader %d: %s" % (slot, e))
+
+    readers = [threading.Thread(target=read, args=(slot,)) for slot in range(4)]
+    for thread in readers:
+        thread.start()
+    try:
+        rng = random.Random(-1)
+        for version in range(300):
+            store.put(factory(rng.randrange(200), version=version))
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+        store.close()
+    assert errors == []
+
+def _write_json(directory: Path, count: int) -> dict:
+    profiles = {}
+    for number, profile in enumerate(generate_profiles(count)):
+        profile = dict(profile, user_id="user-%d" % number, email="user%d@example.com" % number)
+        profiles[profile['user_id']] = profile
+    with open(directory / 'profiles.json', 'w', encoding='utf-8') as f:
+        json.dump(profiles, f)
+    return profiles
+
+def migrate_worker(backend: str, directory: str, start, results) -> None:
+    """Open the store, wait for the others, then import profiles.json"""
+    logging.getLogger('app').setLevel(logging.WARNING)
+    store = STORES[backend](Path(directory))
+    try:
+        start.wait()
+        results.put(store.migrate_json(Path(directory) / 'profiles.json'))
+    finally:
+        store.close()
+
+@pytest.mark.parametrize('backend', sorted(STORES))
+def test_migration_imports_once(tmp_path, backend):
+    store = STORES[backend](tmp_path)
+    try:
+        assert store.migrate_json(tmp_path / 'profiles.json') == 0
+        profiles = _write_json(tmp_path, 20)
+        assert store.migrate_json(tmp_path / 'profiles.json') == 20
+        assert {profile['user_id']: profile for profile in store.values()} == profiles
+        assert not (tmp_path / 'profiles.json').exists()
+        assert (tmp_path / 'profiles.json.migrated').exists()
+        # A new profiles.json next to a populated store is left alone
+        _write_json(tmp_path, 30)
+        assert store.migrate_json(tmp_path / 'profiles.json') == 0
+        assert len(store) == 20
+    finally:
+        store.close()
+
+@pytest.mark.parametrize('backend', sorted(STORES))
+def test_processes_opening_at_once_import_once(tmp_path, backend):
+    _write_json(tmp_path, 20)
+    context = multiprocessing.get_context('spawn')
+    start = context.Event()
+    results = context.Queue()
+    processes = [context.Process(target=migrate_worker, args=(backend, str(tmp_path), start, results))
+                 for _ in range(4)]
+    for process in processes:
+        process.start()
+    start.set()
+    for process in processes:
+        process.join(60)
+    assert [process.exitcode for process in processes] == [0] * 4
+    assert sorted(results.get(timeout=1) for _ in processes) == [0, 0, 0, 20]
+    assert (tmp_path / 'profiles.json.migrated').exists()
+    store = STORES[backend](tmp_path)
+    try:
+        assert len(store) == 20
+    finally:
+        store.close()
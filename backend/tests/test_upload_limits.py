@@ -0,0 +1,28 @@
+"""
+Tests for read_upload: the magic-byte check on the first chunk and the
+per-file size limit.
+"""
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from app.upload_limits import UPLOAD_CHUNK_BYTES, InvalidUploadContent, UploadTooLarge, read_upload
+
+def _read(content: bytes, filename: str, max_bytes: int = 10 * UPLOAD_CHUNK_BYTES):
+    return asyncio.run(read_upload(UploadFile(io.BytesIO(content), filename=filename), max_bytes))
+
+def test_reads_the_whole_file():
+    content = b'%PDF-1.4' + b'x' * (3 * UPLOAD_CHUNK_BYTES)
+    assert _read(content, 'cv.pdf') == (content, hashlib.sha256(content).hexdigest())
+
+@pytest.mark.parametrize('content, filename, error', [
+    (b'PK\x03\x04 not a pdf', 'cv.pdf', InvalidUploadContent),
+    (b'', 'cv.pdf', InvalidUploadContent),
+    (b'%PDF-' + b'x' * (2 * UPLOAD_CHUNK_BYTES), 'cv.pdf', UploadTooLarge),
+])
+def test_rejects(content, filename, error):
+    with pytest.raises(error):
+        _read(content, filename, max_bytes=UPLOAD_CHUNK_BYTES)
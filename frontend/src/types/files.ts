@@ -13,6 +13,8 @@ export interface CVParseResponse {
     certifications: string[];
     education: string[];
   };
+  truncated?: boolean;
+  truncated_by?: string[];
 }
 
 export interface JobMatch {